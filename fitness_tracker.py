@@ -6,6 +6,8 @@ import sys
 import json
 import uuid
 import math
+import bisect
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from PySide6.QtWidgets import (
@@ -14,10 +16,14 @@ from PySide6.QtWidgets import (
     QTableWidgetItem, QGroupBox, QFormLayout, QHeaderView, QMessageBox,
     QGridLayout, QComboBox, QScrollArea, QFrame, QProgressBar, QTextEdit, QTreeWidgetItemIterator, 
     QDialog, QListWidget, QListWidgetItem, QInputDialog, QCheckBox, QFileDialog, QSizePolicy,
-    QTreeWidget, QTreeWidgetItem, QLineEdit, QTextBrowser, QAbstractItemView, QRadioButton, QTimeEdit
+    QTreeWidget, QTreeWidgetItem, QLineEdit, QTextBrowser, QAbstractItemView, QRadioButton, QTimeEdit,
+    QToolTip, QTreeView
 )
-from PySide6.QtCore import Qt, QDate, QTime, QTimer, QSize
-from PySide6.QtGui import QColor, QAction, QBrush
+from PySide6.QtCore import (
+    Qt, QDate, QTime, QTimer, QSize, QRect, QEvent, QAbstractItemModel, QAbstractTableModel, QModelIndex, QObject,
+    Signal
+)
+from PySide6.QtGui import QColor, QAction, QBrush, QPainter, QPen, QFont, QImage
 
 # Matplotlib imports
 import matplotlib
@@ -28,6 +34,7 @@ except ImportError:
     # fallback pro starší Matplotlib/back-end
     from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.collections import LineCollection
 import matplotlib.pyplot as plt
 
@@ -35,6 +42,31 @@ TITLE = "Fitness Tracker"
 VERSION = "4.7.1"
 APP_VERSION = VERSION
 VERSION_DATE = "22.12.2025"
+# Verze schématu uloženého dokumentu (data["schema_version"]), viz DataMigrator
+SCHEMA_VERSION = 4
+
+# BMI kategorie: (horní mez, název, krátký název do grafů, barva); poslední bez horní meze
+BMI_CATEGORIES = (
+    (18.5, "Podváha", "Podváha", "#4ea5ff"),
+    (25.0, "Normální hmotnost", "Normální", "#32c766"),
+    (30.0, "Nadváha", "Nadváha", "#ffc107"),
+    (35.0, "Obezita I", "Obezita I", "#ff7043"),
+    (None, "Obezita II+", "Obezita II+", "#ff1744"),
+)
+BMI_UNDEFINED = ("Nedefinováno", "#e0e0e0")
+BMI_THRESHOLDS = [upper for upper, *_rest in BMI_CATEGORIES if upper is not None]
+
+
+def bmi_zones(low, high):
+    """Pásy BMI kategorií v rozsahu low..high: [(od, do, krátký název, barva)]."""
+    zones = []
+    start = low
+    for upper, _name, label, color in BMI_CATEGORIES:
+        end = high if upper is None else min(upper, high)
+        if end > start:
+            zones.append((start, end, label, color))
+        start = max(start, end)
+    return zones
 
 # Dark Theme Stylesheet
 DARK_THEME = """
@@ -472,8 +504,10 @@ class SmartGoalCalculator:
         "endurance": {"name": "💪 Síla a kondice", "multiplier": 1.1}
     }
     
-    def __init__(self, data):
+    def __init__(self, data, store=None):
         self.data = data
+        # Volitelné sloupcové úložiště (WorkoutStore) pro rychlé roční součty
+        self.store = store
     
     def analyze_previous_year(self, year, exercise_id):
         """Analyzuje předchozí rok a vrátí statistiky"""
@@ -496,27 +530,38 @@ class SmartGoalCalculator:
         days_count = 0
         last_3_months_performed = []
         
-        for date_str, workouts in self.data.get("workouts", {}).items():
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-            
-            if date_obj.year != year:
-                continue
-            
-            if exercise_id in workouts:
-                records = workouts[exercise_id]
-                if isinstance(records, list):
-                    perf = sum(r["value"] for r in records)
-                elif isinstance(records, dict):
-                    perf = records.get("value", 0)
-                else:
-                    perf = 0
+        if self.store is not None:
+            # Sloupcové úložiště: denní součty roku jedním řezem
+            year_start = datetime(year, 1, 1).date()
+            year_end = datetime(year, 12, 31).date()
+            ordinals, day_sums = self.store.day_totals_by_day(exercise_id, year_start, year_end)
+            total_performed = WorkoutStore.as_number(day_sums.sum())
+            days_count = len(day_sums)
+            last_3_months_performed = day_sums[ordinals >= datetime(year, 10, 1).date().toordinal()].tolist()
+        else:
+            all_workouts = self.data.get("workouts", {})
+            for date_str in YearPartitionedDict.keys_in_year(all_workouts, year):
+                workouts = all_workouts[date_str]
+                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
                 
-                total_performed += perf
-                days_count += 1
+                if date_obj.year != year:
+                    continue
                 
-                # Poslední 3 měsíce
-                if date_obj >= datetime(year, 10, 1).date():
-                    last_3_months_performed.append(perf)
+                if exercise_id in workouts:
+                    records = workouts[exercise_id]
+                    if isinstance(records, list):
+                        perf = sum(r["value"] for r in records)
+                    elif isinstance(records, dict):
+                        perf = records.get("value", 0)
+                    else:
+                        perf = 0
+                    
+                    total_performed += perf
+                    days_count += 1
+                    
+                    # Poslední 3 měsíce
+                    if date_obj >= datetime(year, 10, 1).date():
+                        last_3_months_performed.append(perf)
         
         avg_daily = total_performed / days_count if days_count > 0 else 0
         avg_last_3_months = sum(last_3_months_performed) / len(last_3_months_performed) if last_3_months_performed else 0
@@ -586,7 +631,7 @@ class NewYearWizardDialog(QDialog):
         self.year = year
         self.parent_app = parent
         self.current_page = 0
-        self.calculator = SmartGoalCalculator(parent.data)
+        self.calculator = SmartGoalCalculator(parent.data, getattr(parent, "workout_store", None))
         
         # Uložení odpovědí
         self.answers = {
@@ -690,7 +735,7 @@ class NewYearWizardDialog(QDialog):
                 first_date = None
                 last_date = None
     
-                for date_str in sorted(self.parent_app.data.get("workouts", {}).keys()):
+                for date_str in sorted(YearPartitionedDict.keys_in_year(self.parent_app.data.get("workouts", {}), previous_year)):
                     date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
                     if date_obj.year != previous_year:
                         continue
@@ -846,7 +891,7 @@ class NewYearWizardDialog(QDialog):
                 first_date = None
                 last_date = None
                 
-                for date_str in sorted(self.parent_app.data.get("workouts", {}).keys()):
+                for date_str in sorted(YearPartitionedDict.keys_in_year(self.parent_app.data.get("workouts", {}), previous_year)):
                     date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
                     if date_obj.year != previous_year:
                         continue
@@ -1636,129 +1681,4159 @@ class EditWorkoutDialog(QDialog):
         self.accept()
 
 
-class FitnessTrackerApp(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle(f"{TITLE} v{VERSION} - Sledování cvičení")
-        
-        # macOS/HiDPI & FullHD fix:
-        # Původně 1680x1000, což je na FullHD (1080p) s taskbarem moc.
-        # Snižuji minimum, aby šlo okno zmenšit/přizpůsobit.
-        self.setMinimumSize(1280, 800)
-        self.resize(1440, 900)
+class YearHeatmapWidget(QWidget):
+    """
+    Roční kalendář (heatmapa) kreslený jedním paintEvent.
 
-        self.data_file = Path("fitness_data.json")
-        self.exercise_year_selectors = {}
-        self.exercise_calendar_widgets = {}
-        self.current_settings_year = datetime.now().year
+    Nahrazuje 12 QGroupBoxů s ~365 QLabely: barvy dnů jsou předpočítané
+    pole, klik se řeší hit-testem a tooltip se počítá až při najetí myší
+    (tooltip_provider(date_str) -> HTML).
+    """
 
-        self.load_data()
-        self.ensure_app_state()
-        self.migrate_data()
-        self.migrate_to_year_settings()
-        self.migrate_to_exercises()
-        self.migrate_exercise_keys()  # migrace klíčů (bez zásahu)
-        self.ensure_body_metrics()
+    MONTHS = ['Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen',
+              'Červenec', 'Srpen', 'Září', 'Říjen', 'Listopad', 'Prosinec']
 
-        self.setup_ui()
-        self.restore_app_state()
+    MONTH_COLS = 4
+    MONTH_SPACING = 10
+    MARGIN = 5
+    TITLE_HEIGHT = 30
+    CELL_SPACING = 6
+    CELL_HEIGHT = 36
+    CELL_MIN_WIDTH = 30
+    CELL_PREF_WIDTH = 42
+    BOX_PADDING = 8
 
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.auto_refresh)
-        self.update_timer.start(5000)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.year = None
+        self.first_day = None
+        self.colors = []        # barva pozadí pro každý den roku (index = den od 1.1.)
+        self.text_colors = []   # barva čísla dne (kontrast k pozadí)
+        self.today_index = -1
+        self.day_clicked = None       # callback(date_str)
+        self.tooltip_provider = None  # callback(date_str) -> str
+        self._day_rects = []    # QRect pro každý den roku
+        self._month_rects = []  # (QRect boxu, název)
+        self.setMouseTracking(True)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setMinimumSize(self._width_for_cell(self.CELL_MIN_WIDTH), self._total_height())
+
+    def _month_width(self, cell_w):
+        return 7 * cell_w + 6 * self.CELL_SPACING + 2 * self.BOX_PADDING
+
+    def _width_for_cell(self, cell_w):
+        cols = self.MONTH_COLS
+        return cols * self._month_width(cell_w) + (cols - 1) * self.MONTH_SPACING + 2 * self.MARGIN
+
+    def _month_height(self):
+        return self.TITLE_HEIGHT + 6 * self.CELL_HEIGHT + 5 * self.CELL_SPACING + self.BOX_PADDING
+
+    def _total_height(self):
+        rows = (12 + self.MONTH_COLS - 1) // self.MONTH_COLS
+        return rows * self._month_height() + (rows - 1) * self.MONTH_SPACING + 2 * self.MARGIN
+
+    def sizeHint(self):
+        return QSize(self._width_for_cell(self.CELL_PREF_WIDTH), self._total_height())
+
+    def set_days(self, year, colors, text_colors, today_index=-1):
+        """Nastaví data roku; překreslí jen při skutečné změně."""
+        colors = list(colors)
+        text_colors = list(text_colors)
+        if (year == self.year and colors == self.colors and text_colors == self.text_colors
+                and today_index == self.today_index):
+            return False
+        if year != self.year:
+            self.year = year
+            self.first_day = datetime(year, 1, 1).date()
+            self._layout_cells()
+        self.colors = colors
+        self.text_colors = text_colors
+        self.today_index = today_index
+        self.update()
+        return True
+
+    def date_str_at(self, index):
+        return (self.first_day + timedelta(days=index)).strftime('%Y-%m-%d')
+
+    def _layout_cells(self):
+        """Spočítá obdélníky měsíců a dnů pro aktuální šířku widgetu."""
+        self._day_rects = []
+        self._month_rects = []
+        if self.year is None:
+            return
+        cols = self.MONTH_COLS
+        avail = max(self.width(), self.minimumWidth()) - 2 * self.MARGIN - (cols - 1) * self.MONTH_SPACING
+        month_w = avail // cols
+        cell_w = max(self.CELL_MIN_WIDTH, (month_w - 2 * self.BOX_PADDING - 6 * self.CELL_SPACING) // 7)
+        month_h = self._month_height()
+
+        for month in range(1, 13):
+            mx = self.MARGIN + ((month - 1) % cols) * (month_w + self.MONTH_SPACING)
+            my = self.MARGIN + ((month - 1) // cols) * (month_h + self.MONTH_SPACING)
+            self._month_rects.append((QRect(mx, my, month_w, month_h), self.MONTHS[month - 1]))
+
+            first = datetime(self.year, month, 1).date()
+            days_in_month = ((first + timedelta(days=32)).replace(day=1) - first).days
+            row, col = 0, first.weekday()
+            for _day in range(days_in_month):
+                x = mx + self.BOX_PADDING + col * (cell_w + self.CELL_SPACING)
+                y = my + self.TITLE_HEIGHT + row * (self.CELL_HEIGHT + self.CELL_SPACING)
+                self._day_rects.append(QRect(x, y, cell_w, self.CELL_HEIGHT))
+                col += 1
+                if col > 6:
+                    col = 0
+                    row += 1
+
+    def resizeEvent(self, event):
+        self._layout_cells()
+        super().resizeEvent(event)
+
+    def index_at(self, pos):
+        """Hit-test: index dne pod bodem, jinak -1."""
+        for rect, _name in self._month_rects:
+            if rect.contains(pos):
+                break
+        else:
+            return -1
+        for i, rect in enumerate(self._day_rects):
+            if rect.contains(pos):
+                return i
+        return -1
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        try:
+            painter.setRenderHint(QPainter.Antialiasing, True)
+            painter.fillRect(self.rect(), QColor("#1e1e1e"))
+
+            font = QFont(self.font())
+            font.setBold(True)
+            font.setPixelSize(16)
+            painter.setFont(font)
+
+            for rect, name in self._month_rects:
+                painter.setPen(QPen(QColor("#0d7377"), 2))
+                painter.setBrush(QColor("#1e1e1e"))
+                painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 5, 5)
+                painter.setPen(QColor("#e0e0e0"))
+                painter.drawText(rect.x(), rect.y() + 4, rect.width(), self.TITLE_HEIGHT - 6,
+                                 Qt.AlignHCenter | Qt.AlignVCenter, name)
+
+            painter.setRenderHint(QPainter.Antialiasing, False)
+            today_pen = QPen(QColor("#87CEEB"), 2)
+            cell_pen = QPen(QColor("#3d3d3d"), 1)
+            for i, rect in enumerate(self._day_rects):
+                if i >= len(self.colors):
+                    break
+                painter.fillRect(rect, QColor(self.colors[i]))
+                painter.setPen(today_pen if i == self.today_index else cell_pen)
+                painter.setBrush(Qt.NoBrush)
+                painter.drawRect(rect.adjusted(0, 0, -1, -1))
+                painter.setPen(QColor(self.text_colors[i]))
+                day = (self.first_day + timedelta(days=i)).day
+                painter.drawText(rect, Qt.AlignCenter, str(day))
+        finally:
+            painter.end()
+
+    def mouseMoveEvent(self, event):
+        index = self.index_at(event.position().toPoint())
+        self.setCursor(Qt.PointingHandCursor if index >= 0 else Qt.ArrowCursor)
+        super().mouseMoveEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.day_clicked is not None:
+            index = self.index_at(event.position().toPoint())
+            if 0 <= index < len(self.colors):
+                self.day_clicked(self.date_str_at(index))
+                return
+        super().mousePressEvent(event)
 
-        
-    def ensure_body_metrics(self):
-        """Zajistí existenci sekce body_metrics pro BMI/váhu."""
-        if "body_metrics" not in self.data or not isinstance(self.data["body_metrics"], dict):
-            self.data["body_metrics"] = {}
-        body = self.data["body_metrics"]
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            index = self.index_at(event.pos())
+            if 0 <= index < len(self.colors) and self.tooltip_provider is not None:
+                try:
+                    text = self.tooltip_provider(self.date_str_at(index))
+                except Exception as e:
+                    print(f"Chyba při tvorbě tooltipu: {e}")
+                    text = ""
+                if text:
+                    QToolTip.showText(event.globalPos(), text, self, self._day_rects[index])
+                    return True
+            QToolTip.hideText()
+            event.ignore()
+            return True
+        return super().event(event)
+
+
+class RecordTreeNode:
+    """Uzel stromu záznamů: měsíc -> týden -> den -> záznam."""
+
+    __slots__ = ("kind", "key", "parent", "children", "texts", "payload",
+                 "fonts", "backgrounds", "foregrounds", "aligned", "has_children")
+
+    def __init__(self, kind, key, parent=None):
+        self.kind = kind
+        self.key = key
+        self.parent = parent
+        self.children = None    # None = děti zatím nenačtené (fetchMore)
+        self.texts = ["", "", "", ""]
+        self.payload = None
+        self.fonts = {}
+        self.backgrounds = {}
+        self.foregrounds = {}
+        self.aligned = ()
+        self.has_children = False
+
+    def row(self):
+        return self.parent.children.index(self) if self.parent is not None else 0
+
+    def copy_display(self, other):
+        self.texts = other.texts
+        self.payload = other.payload
+        self.fonts = other.fonts
+        self.backgrounds = other.backgrounds
+        self.foregrounds = other.foregrounds
+        self.aligned = other.aligned
+        self.has_children = other.has_children
+
+
+class RecordTreeModel(QAbstractItemModel):
+    """
+    Model přehledu záznamů jednoho cvičení pro vybraný rok.
+
+    Měsíce se sestaví při načtení roku, týdny, dny a záznamy až při rozbalení
+    (canFetchMore/fetchMore). Změna jednoho dne se do modelu promítne
+    cíleně (refresh_day) přes rowsInserted/rowsRemoved/dataChanged, takže
+    rozbalení i výběr ve view zůstávají.
+    """
+
+    HEADERS = ["📅 Den", "⏱️ Čas", "💪 Hodnota", "Poznámka"]
+
+    CZ_MONTHS = {
+        "01": "Leden", "02": "Únor", "03": "Březen", "04": "Duben", "05": "Květen", "06": "Červen",
+        "07": "Červenec", "08": "Srpen", "09": "Září", "10": "Říjen", "11": "Listopad", "12": "Prosinec"
+    }
 
-        # Výchozí výška (cm)
-        height = body.get("height_cm")
-        if not isinstance(height, (int, float)) or height <= 0:
-            body["height_cm"] = 180
+    def __init__(self, exercise_type, workouts_func, goal_func, base_font=None, parent=None):
+        super().__init__(parent)
+        self.exercise_type = exercise_type
+        self.workouts_func = workouts_func
+        self.goal_func = goal_func
+        self.year = None
+        self.stale = True
+        self.ever_populated = False
+        self.root = RecordTreeNode("root", None)
+        self.root.children = []
+        self._days = {}   # date_str -> [záznamy] pro vybraný rok
+        self._init_fonts(base_font)
+
+    def _init_fonts(self, base_font):
+        try:
+            self.child_val_font = QFont()
+            self.child_val_font.setBold(True)
+            self.child_time_font = QFont("Menlo")
+            base_size = base_font.pointSize() if base_font is not None and base_font.pointSize() > 0 else 11
+            self.child_time_font.setPointSize(max(base_size - 1, 9))
+
+            self.month_font = QFont()
+            self.month_font.setBold(True)
+            self.month_font.setPointSize(base_size + 1)
+
+            self.week_font = QFont()
+            self.week_font.setBold(True)
+        except Exception:
+            self.child_val_font = None
+            self.child_time_font = None
+            self.month_font = None
+            self.week_font = None
+
+    # ---------- data roku ----------
+    def _day_records(self, workouts, date_str):
+        perday = workouts.get(date_str)
+        if not isinstance(perday, dict) or self.exercise_type not in perday:
+            return None
+        recs = perday[self.exercise_type]
+        if isinstance(recs, list):
+            return list(recs)
+        elif isinstance(recs, dict):
+            return [recs]
+        return None
+
+    def reload(self, year):
+        """Znovu načte celý rok (reset modelu); děti se dotáhnou až při rozbalení."""
+        self.beginResetModel()
+        self.year = year
+        self._days = {}
+        workouts = self.workouts_func() or {}
+        # U dat po rocích se načte jen zobrazený rok
+        for ds in YearPartitionedDict.keys_in_year(workouts, year):
+            year_here = int(ds.split("-")[0]) if "-" in ds else None
+            if year_here != year:
+                continue
+            records = self._day_records(workouts, ds)
+            if records is not None:
+                self._days.setdefault(ds, []).extend(records)
+        self.root = RecordTreeNode("root", None)
+        self.root.children = self._month_nodes(self.root)
+        self.stale = False
+        self.endResetModel()
+
+    def _month_dates(self, m_key):
+        return sorted((d for d in self._days if d[:7] == m_key), reverse=True)
+
+    def _week_map(self, m_key):
+        week_map = {}
+        for date_str in self._month_dates(m_key):
+            try:
+                wno = int(datetime.strptime(date_str, "%Y-%m-%d").date().isocalendar().week)
+            except Exception:
+                continue
+            week_map.setdefault(wno, []).append(date_str)
+        return week_map
 
-        # Historie měření váhy
-        history = body.get("weight_history")
-        if not isinstance(history, list):
-            body["weight_history"] = []
+    @staticmethod
+    def _sum_values(records):
+        try:
+            return sum(r.get("value", 0) for r in records)
+        except Exception:
+            return 0
+
+    @staticmethod
+    def pct_color(p):
+        if p >= 200:
+            return QColor("#006400")
+        elif p > 100:
+            intensity = min((p / 100.0) - 1.0, 1.0)
+            green_val = int(144 + (100 - 144) * intensity)
+            return QColor(0, green_val, 0)
+        elif p == 100:
+            return QColor("#FFD700")
+        elif p >= 50:
+            intensity = (1.0 - (p / 100.0)) * 2.0
+            val = int(107 + (255 - 107) * (1.0 - intensity))
+            return QColor(255, val, val)
+        else:
+            return QColor("#8B0000")
+
+    def _goal(self, date_str):
+        goal = self.goal_func(self.exercise_type, date_str)
+        if not isinstance(goal, int):
+            goal = int(goal) if goal else 0
+        return goal
+
+    # ---------- sestavení uzlů ----------
+    def _month_nodes(self, parent):
+        nodes = []
+        for m_key in sorted({d[:7] for d in self._days}, reverse=True):
+            y_str, m_str = m_key.split("-")
+            total = 0
+            for date_str in self._month_dates(m_key):
+                total += self._sum_values(self._days.get(date_str, []))
+            node = RecordTreeNode("month", m_key, parent)
+            node.texts = [f"{self.CZ_MONTHS.get(m_str, m_str)} {y_str}", f"Σ {total}", "", ""]
+            node.payload = {"type": "month", "key": m_key}
+            if self.month_font:
+                node.fonts = {0: self.month_font, 1: self.month_font}
+            month_bg = QColor(36, 52, 71)  # odlišené od týdnů
+            node.backgrounds = {c: month_bg for c in range(4)}
+            node.aligned = (1,)
+            node.has_children = True
+            nodes.append(node)
+        return nodes
+
+    def _week_nodes(self, parent):
+        m_key = parent.key
+        nodes = []
+        for wno, dates in self._week_map(m_key).items():
+            total = 0
+            for date_str in dates:
+                total += self._sum_values(self._days.get(date_str, []))
+            node = RecordTreeNode("week", (m_key, wno), parent)
+            node.texts = [f"📆 Týden {wno}", f"Σ {total}", "", ""]
+            node.payload = {"type": "week", "month_key": m_key, "week": wno}
+            if self.week_font:
+                node.fonts = {0: self.week_font, 1: self.week_font}
+            week_bg = QColor(43, 43, 43)  # odlišené od měsíců
+            node.backgrounds = {c: week_bg for c in range(4)}
+            node.aligned = (1,)
+            node.has_children = True
+            nodes.append(node)
+        return nodes
+
+    def _day_nodes(self, parent):
+        m_key, wno = parent.key
+        return [self._day_node(date_str, parent) for date_str in self._week_map(m_key).get(wno, [])]
+
+    def _day_node(self, date_str, parent):
+        records = self._days.get(date_str, [])
+        total_day_value = sum(r.get("value", 0) for r in records)
+        goal = self._goal(date_str)
+        percent = (total_day_value / goal * 100) if goal > 0 else 0
+
+        if percent >= 100:
+            status_icon = "✅"
+        elif percent >= 50:
+            status_icon = "⏳"
+        else:
+            status_icon = "❌"
+
+        node = RecordTreeNode("day", date_str, parent)
+        node.texts = [f"{status_icon} {date_str}", f"{total_day_value} ({len(records)}×)", f"{percent:.0f}%", ""]
+        node.payload = {"type": "day", "date": date_str}
+
+        # Kontrastní text pro barevný sloupec (2): zlatá a světle červená -> tmavý text
+        is_light = percent == 100 or 50 <= percent < 100
+        node.foregrounds = {
+            0: QColor(255, 255, 255),
+            1: QColor(200, 200, 200),
+            2: QColor(0, 0, 0) if is_light else QColor(255, 255, 255),
+        }
+        node.backgrounds = {2: self.pct_color(int(percent))}
+        node.aligned = (1, 2)
+        node.has_children = bool(records)
+        return node
+
+    def _record_nodes(self, parent):
+        date_str = parent.key
+        records = self._days.get(date_str, [])
+        goal = self._goal(date_str)
+
+        def _time_key(rec):
+            ts = rec.get("timestamp", "")
+            if " " in ts:
+                return ts.split(" ", 1)[1]
+            return ts
+
+        cumulative_pairs = []
+        running_total = 0
+        for rec in sorted(records, key=_time_key):
+            running_total += rec.get("value", 0)
+            cumulative_pairs.append((rec, running_total))
+
+        nodes = []
+        for idx, (record, running_total) in enumerate(reversed(cumulative_pairs)):
+            value = record.get("value", 0)
+            timestamp = record.get("timestamp", "N/A")
+            time_only = timestamp.split(" ")[1] if " " in timestamp else timestamp
+            record_id = record.get("id", "")
+
+            if goal > 0:
+                rec_cum_pct = int(round((running_total / goal) * 100))
+                pct_text = f"{rec_cum_pct} %"
+            else:
+                rec_cum_pct = None
+                pct_text = "—"
+
+            node = RecordTreeNode("record", record_id, parent)
+            node.texts = [pct_text, str(value), time_only, record_id]
+            node.payload = {
+                "type": "record",
+                "date": date_str,
+                "record_id": record_id,
+                "exercise": self.exercise_type,
+            }
+            node.foregrounds = {
+                # Barva TEXTU procent u záznamu (pozadí ne)
+                0: QColor(200, 200, 200) if rec_cum_pct is None else self.pct_color(rec_cum_pct),
+                1: QColor(240, 240, 240),
+                2: QColor(180, 180, 180),
+            }
+            node.fonts = {}
+            if self.child_val_font:
+                node.fonts[1] = self.child_val_font
+            if self.child_time_font:
+                node.fonts[2] = self.child_time_font
+            if idx % 2 == 1:
+                shade = QColor(255, 255, 255, 14)
+                node.backgrounds = {0: shade, 1: shade, 2: shade}
+            node.aligned = (0, 1, 2)
+            nodes.append(node)
+        return nodes
+
+    def _build_children(self, node):
+        if node.kind == "month":
+            return self._week_nodes(node)
+        elif node.kind == "week":
+            return self._day_nodes(node)
+        elif node.kind == "day":
+            return self._record_nodes(node)
+        return []
+
+    # ---------- Qt API ----------
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.children is None or not (0 <= row < len(node.children)) or not (0 <= column < 4):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row(), 0, parent)
+
+    def index_of(self, node, column=0):
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row(), column, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() and parent.column() != 0:
+            return 0
+        children = self.node(parent).children
+        return len(children) if children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 4
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.children is None:
+            return node.has_children
+        return bool(node.children)
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node is not self.root and node.children is None and node.has_children
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.children is not None:
+            return
+        children = self._build_children(node)
+        if not children:
+            node.children = []
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < 4:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        col = index.column()
+        if role == Qt.DisplayRole:
+            return node.texts[col]
+        elif role == Qt.UserRole:
+            return node.payload
+        elif role == Qt.FontRole:
+            return node.fonts.get(col)
+        elif role == Qt.BackgroundRole:
+            return node.backgrounds.get(col)
+        elif role == Qt.ForegroundRole:
+            return node.foregrounds.get(col)
+        elif role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter) if col in node.aligned else None
+        return None
+
+    # ---------- navigace ----------
+    def payload(self, index):
+        return index.data(Qt.UserRole) if index.isValid() else None
+
+    def find_child(self, node, key, fetch=True):
+        if node.children is None:
+            if not fetch:
+                return None
+            self.fetchMore(self.index_of(node))
+        for child in node.children or []:
+            if child.key == key:
+                return child
+        return None
+
+    def day_node(self, date_str, fetch=True):
+        """Uzel dne (případně dotáhne měsíc a týden), jinak None."""
+        try:
+            wno = int(datetime.strptime(date_str, "%Y-%m-%d").date().isocalendar().week)
+        except Exception:
+            return None
+        month = self.find_child(self.root, date_str[:7], fetch)
+        week = self.find_child(month, (date_str[:7], wno), fetch) if month else None
+        return self.find_child(week, date_str, fetch) if week else None
+
+    def record_node(self, date_str, record_id, fetch=True):
+        day = self.day_node(date_str, fetch)
+        return self.find_child(day, record_id, fetch) if day else None
+
+    def record_keys(self, index):
+        """(date, record_id) pro záznam, u dne pro všechny jeho záznamy (i nenačtené)."""
+        payload = self.payload(index)
+        if not isinstance(payload, dict):
+            return []
+        if payload.get("type") == "record":
+            return [(payload["date"], payload["record_id"])]
+        if payload.get("type") == "day":
+            date_str = payload["date"]
+            return [(date_str, r.get("id", "")) for r in self._days.get(date_str, [])]
+        return []
+
+    def expansion_keys(self, view):
+        """Klíče rozbalených (načtených) uzlů – pro obnovu po resetu modelu."""
+        keys = []
+        stack = list(self.root.children or [])
+        while stack:
+            node = stack.pop()
+            if node.children is not None and view.isExpanded(self.index_of(node)):
+                keys.append((node.kind, node.key))
+                stack.extend(node.children)
+        return keys
+
+    # ---------- cílené změny ----------
+    def refresh_day(self, date_str):
+        """Promítne aktuální záznamy jednoho dne do stromu bez resetu modelu."""
+        if self.stale or self.year is None or not date_str.startswith(f"{self.year}-"):
+            return
+        records = self._day_records(self.workouts_func() or {}, date_str)
+        if records is None:
+            self._days.pop(date_str, None)
+        else:
+            self._days[date_str] = records
 
-    def backup_data_file(self):
-        """Vytvoří časovou zálohu JSON dat (do složky backup, udržuje max. 10 posledních)."""
         try:
-            if not self.data_file.exists():
+            wno = int(datetime.strptime(date_str, "%Y-%m-%d").date().isocalendar().week)
+        except Exception:
+            return
+        self._sync_children(self.root, self._month_nodes(self.root))
+        month = self.find_child(self.root, date_str[:7], fetch=False)
+        if month is None or month.children is None:
+            return
+        self._sync_children(month, self._week_nodes(month))
+        week = self.find_child(month, (date_str[:7], wno), fetch=False)
+        if week is None or week.children is None:
+            return
+        self._sync_children(week, self._day_nodes(week))
+        day = self.find_child(week, date_str, fetch=False)
+        if day is None or day.children is None:
+            return
+        self._sync_children(day, self._record_nodes(day))
+
+    def _sync_children(self, node, new_nodes):
+        """Sladí děti uzlu s novým seznamem: smaže/vloží řádky, u zbylých dataChanged."""
+        parent_index = self.index_of(node)
+        old = node.children
+        new_keys = [n.key for n in new_nodes]
+        old_keys = [n.key for n in old]
+
+        if len(set(new_keys)) != len(new_keys) or len(set(old_keys)) != len(old_keys):
+            # Neunikátní klíče (staré záznamy bez id) -> vyměň všechny řádky
+            if old:
+                self.beginRemoveRows(parent_index, 0, len(old) - 1)
+                node.children = []
+                self.endRemoveRows()
+            if new_nodes:
+                self.beginInsertRows(parent_index, 0, len(new_nodes) - 1)
+                for n in new_nodes:
+                    n.parent = node
+                node.children = list(new_nodes)
+                self.endInsertRows()
+            return
+
+        new_set = set(new_keys)
+        for i in range(len(old) - 1, -1, -1):
+            if old[i].key not in new_set:
+                self.beginRemoveRows(parent_index, i, i)
+                del old[i]
+                self.endRemoveRows()
+
+        kept = [n.key for n in old]
+        if kept != [k for k in new_keys if k in set(kept)]:
+            # Změnilo se pořadí (např. úprava času) -> vyměň všechny řádky
+            self._sync_children(node, [])
+            self._sync_children(node, new_nodes)
+            return
+
+        for j, new in enumerate(new_nodes):
+            if j < len(old) and old[j].key == new.key:
+                current = old[j]
+                current.copy_display(new)
+                if current.children and not current.has_children:
+                    # Den bez záznamů – odeber načtené děti
+                    self._sync_children(current, [])
+                self.dataChanged.emit(self.index_of(current, 0), self.index_of(current, 3))
+            else:
+                self.beginInsertRows(parent_index, j, j)
+                new.parent = node
+                old.insert(j, new)
+                self.endInsertRows()
+
+
+class WeightHistoryModel(QAbstractTableModel):
+    """
+    Tabulka historie vážení nad WeightSeries (řádek 0 = nejnovější měření).
+
+    Texty, BMI a barva kategorie se počítají v data() až pro řádky, které
+    view kreslí. Vložení/úprava/smazání jednoho měření jde přes upsert()/remove()
+    a do view se promítne cíleně (rowsInserted/rowsRemoved/dataChanged), takže
+    výběr i posun zůstávají; po výměně celé historie (import) se model resetuje.
+    Do resetu model drží původní WeightSeries, view tak nikdy nečte novou
+    historii se starým počtem řádků.
+    """
+
+    HEADERS = ["Datum", "Čas", "Váha [kg]", "BMI", "Kategorie"]
+    # Kolik řádků projde header při ResizeToContents (viditelné + vzorek)
+    RESIZE_SAMPLE_ROWS = 50
+
+    def __init__(self, series_func, height_func, bmi_func, category_func, parent=None):
+        super().__init__(parent)
+        self.series_func = series_func
+        self.height_func = height_func
+        self.bmi_func = bmi_func
+        self.category_func = category_func
+        self._current = None
+        self._reset_pending = False
+
+    def _series(self):
+        series = self.series_func()
+        if self._current is None:
+            self._current = series
+        elif series is not self._current and not self._reset_pending:
+            # Historie se vyměnila mimo model -> reset až mimo právě běžící dotaz view,
+            # do té doby se čte dál původní historie
+            self._reset_pending = True
+            QTimer.singleShot(0, self._reload_if_pending)
+        return self._current
+
+    def _reload_if_pending(self):
+        # Mezitím mohl model resetovat už volající (commit_bulk_change)
+        if self._reset_pending:
+            self.reload()
+
+    def _live_series(self):
+        """Aktuální historie pro cílenou změnu (po výměně historie nejdřív reset)."""
+        series = self._series()
+        if self._reset_pending:
+            self.reload()
+            series = self._current
+        return series
+
+    def reload(self):
+        """Celá historie znovu (např. po importu dat)."""
+        self.beginResetModel()
+        self._current = self.series_func()
+        self._reset_pending = False
+        self.endResetModel()
+
+    def _row(self, series, position):
+        return len(series) - 1 - position
+
+    def values_changed(self):
+        """Přepočet BMI všech řádků (změna výšky) – view překreslí jen viditelné."""
+        rows = len(self._series())
+        if rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, len(self.HEADERS) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._series())
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or not 0 <= section < len(self.HEADERS):
+            return None
+        if role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        return None
+
+    # flags() zůstává z QAbstractTableModel (navíc ItemNeverHasChildren -> view nezkoumá potomky)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        if role != Qt.DisplayRole and role != Qt.ForegroundRole and role != Qt.UserRole:
+            return None
+        series = self._series()
+        position = len(series) - 1 - index.row()
+        if not 0 <= position < len(series):
+            return None
+        entry = series.entries[position]
+        if role == Qt.UserRole:
+            return entry.get("id")
+
+        weight = float(entry.get("value", 0.0))
+        height_cm = self.height_func()
+        bmi = self.bmi_func(weight, height_cm) if height_cm > 0 else 0.0
+        col = index.column()
+        if role == Qt.ForegroundRole:
+            return QBrush(QColor(self.category_func(bmi)[1])) if bmi > 0 else None
+
+        if col == 0:
+            return series.times[position].strftime("%d.%m.%Y") if series.timed[position] else entry.get("date", "")
+        if col == 1:
+            return series.times[position].strftime("%H:%M") if series.timed[position] else ""
+        if col == 2:
+            return f"{weight:.1f}" if weight > 0 else "-"
+        if col == 3:
+            return f"{bmi:.1f}" if bmi > 0 else "-"
+        return self.category_func(bmi)[0] if bmi > 0 else "-"
+
+    # ---------- cílené změny ----------
+    def upsert(self, entry):
+        """Zařadí nové/upravené měření do historie a ohlásí jen dotčené řádky."""
+        series = self._live_series()
+        position = series.position(entry)
+        if position is not None:
+            if series.key_for(series.parse(entry)[0]) == series.keys[position]:
+                # Čas beze změny -> stejné místo, jen nové hodnoty
+                series.upsert(entry)
+                row = self._row(series, position)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
                 return
+            row = self._row(series, position)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            series.pop(position)
+            self.endRemoveRows()
+        row = len(series) - series.insert_position(entry)
+        self.beginInsertRows(QModelIndex(), row, row)
+        series.upsert(entry)
+        self.endInsertRows()
+
+    def remove(self, entry_id):
+        """Smaže měření podle id a ohlásí odebraný řádek."""
+        series = self._live_series()
+        entry = series.by_id.get(entry_id)
+        position = series.position(entry) if entry is not None else None
+        if position is None:
+            return None
+        row = self._row(series, position)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        removed = series.pop(position)
+        self.endRemoveRows()
+        return removed
+
+
+class ChartRasterizer(QObject):
+    """
+    Vykreslování matplotlib grafů (Agg) ve vlákně na pozadí.
+
+    submit() předá sestavovací funkci build(fig), která graf postaví do nové
+    Figure – nesmí sahat na widgety ani na živá data (dostane snímek parametrů).
+    Hotový RGBA obrázek přijde jako QImage signálem `rendered` do GUI vlákna
+    spolu s návratovou hodnotou build (např. rozložení os pro najetí myší).
+    Nevyřízený požadavek téhož cíle nahradí novější (poslední vyhrává).
+    """
+
+    rendered = Signal(object, object, object, object)  # cíl (canvas), klíč, QImage, výsledek build
+
+    def __init__(self, parent=None):
+        import threading
+
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._jobs = {}  # id(cíl) -> (cíl, klíč, build, šířka, výška, dpi, dpr, pozadí)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ChartRasterizer", daemon=True)
+        self._thread.start()
+
+    def submit(self, target, key, build, width, height, dpi, device_pixel_ratio=1.0, facecolor="#121212"):
+        with self._cond:
+            self._jobs[id(target)] = (target, key, build, width, height, dpi, device_pixel_ratio, facecolor)
+            self._cond.notify_all()
+
+    def stop(self):
+        """Zahodí čekající požadavky a ukončí vlákno."""
+        with self._cond:
+            self._jobs.clear()
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                _tid, job = self._jobs.popitem()
+            target, key, build, width, height, dpi, dpr, facecolor = job
+            try:
+                image, info = self._rasterize(build, width, height, dpi, facecolor)
+                image.setDevicePixelRatio(dpr)
+                self.rendered.emit(target, key, image, info)
+            except Exception as e:
+                print(f"Chyba při vykreslování grafu na pozadí: {e}")
+
+    @staticmethod
+    def _rasterize(build, width, height, dpi, facecolor):
+        fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=facecolor)
+        agg = FigureCanvasAgg(fig)
+        info = build(fig)
+        agg.draw()
+        buf = agg.buffer_rgba()
+        h, w = buf.shape[0], buf.shape[1]
+        # copy(): QImage nad cizím bufferem by přežil Figure
+        return QImage(buf.tobytes(), w, h, w * 4, QImage.Format_RGBA8888).copy(), info
+
+
+class CachedChartCanvas(FigureCanvas):
+    """
+    FigureCanvas s volitelným vykreslováním na pozadí (ChartRasterizer).
+
+    render_chart(klíč, build) graf buď postaví a vykreslí hned (bez rasterizéru),
+    nebo ho nechá vykreslit ve vlákně a zobrazí výsledný QImage. Posledních
+    CACHE_SIZE obrázků se pamatuje podle (klíč, velikost v pixelech), takže
+    návrat k předchozímu pohledu (období, režim) je okamžitý. Návratová
+    hodnota build zobrazeného grafu je v `chart_info` (např. pro najetí myší).
+
+    Builder volí úroveň detailu podle šířky figury, proto se graf po změně
+    šířky postaví znovu (na pozadí hned, synchronně až po RELAYOUT_DELAY_MS).
+    """
+
+    CACHE_SIZE = 12
+    RELAYOUT_DELAY_MS = 150
+
+    def __init__(self, figure, rasterizer=None):
+        from collections import OrderedDict
+
+        super().__init__(figure)
+        self.rasterizer = rasterizer
+        self._images = OrderedDict()
+        self._image = None
+        self.chart_info = None
+        self._wanted = None
+        self._last_request = None
+        self._built_width = None
+        self._relayout_timer = QTimer(self)
+        self._relayout_timer.setSingleShot(True)
+        self._relayout_timer.setInterval(self.RELAYOUT_DELAY_MS)
+        self._relayout_timer.timeout.connect(self._rebuild)
+        if rasterizer is not None:
+            rasterizer.rendered.connect(self._on_rendered)
+
+    def render_chart(self, key, build):
+        """Zobrazí graf daný klíčem; build(fig) ho umí postavit do libovolné Figure."""
+        self._last_request = (key, build)
+        width, height = (int(round(v)) for v in self.figure.bbox.size)
+        if self.rasterizer is None:
+            self._built_width = width
+            self.chart_info = build(self.figure)
+            self.draw()
+            return
+
+        full_key = (key, width, height)
+        self._wanted = full_key
+        cached = self._images.get(full_key)
+        if cached is not None:
+            self._images.move_to_end(full_key)
+            self._image, self.chart_info = cached
+            self.update()
+            return
+        # Do doby, než přijde výsledek, zůstává zobrazený předchozí obrázek
+        self.rasterizer.submit(
+            self, full_key, build, max(width, 1), max(height, 1), self.figure.dpi,
+            self.device_pixel_ratio, self.figure.get_facecolor(),
+        )
+
+    def _on_rendered(self, target, key, image, info):
+        if target is not self:
+            return
+        self._images[key] = (image, info)
+        self._images.move_to_end(key)
+        while len(self._images) > self.CACHE_SIZE:
+            self._images.popitem(last=False)
+        if key == self._wanted:
+            self._image, self.chart_info = image, info
+            self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._last_request is None:
+            return
+        if self.rasterizer is not None:
+            self.render_chart(*self._last_request)
+        elif int(round(self.figure.bbox.width)) != self._built_width:
+            self._relayout_timer.start()
+
+    def _rebuild(self):
+        if self._last_request is not None:
+            self.render_chart(*self._last_request)
+
+    def paintEvent(self, event):
+        if self.rasterizer is None or self._image is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(matplotlib.colors.to_hex(self.figure.get_facecolor())))
+        painter.drawImage(self.rect(), self._image)
+        painter.end()
+
+
+class CurveSmoothing:
+    """
+    Vyhlazování křivek grafů – vše vektorově v NumPy, x zůstává v datenum.
+
+    catmull_rom(): Catmull-Rom spline přes body (krajní body se zdvojí);
+    každý úsek má points_per_segment vzorků, poslední včetně koncového bodu.
+
+    monotone_cubic(): monotónní kubická Hermitova interpolace (Fritsch–Carlson,
+    vnitřní směrnice jako PCHIP) – křivka bez smyček a překmitů. Hustý výstup
+    se s cache_key (klíč obsahující revizi dat) drží v malé LRU cache.
+    """
+
+    CACHE_SIZE = 32
+    _cache = {}
+    # Grafy se mohou sestavovat i ve vlákně ChartRasterizer
+    _cache_lock = threading.Lock()
+
+    # Bázová matice Catmull-Rom: bod(t) = 0.5 * [1, t, t², t³] · M · [P0, P1, P2, P3]
+    CATMULL_ROM_BASIS = (
+        (0.0, 2.0, 0.0, 0.0),
+        (-1.0, 0.0, 1.0, 0.0),
+        (2.0, -5.0, 4.0, -1.0),
+        (-1.0, 3.0, -3.0, 1.0),
+    )
+
+    @classmethod
+    def catmull_rom(cls, xs, ys, points_per_segment=20):
+        """Vrátí (xs, ys) zahuštěné hladké křivky; při méně než 3 bodech původní data."""
+        import numpy as np
+
+        xs_arr = np.asarray(xs, dtype=float)
+        ys_arr = np.asarray(ys, dtype=float)
+        n = len(xs_arr)
+        if n < 3:
+            return xs_arr, ys_arr
+
+        P = np.stack([xs_arr, ys_arr], axis=1)
+        # Řídicí body všech úseků najednou: (úsek, 4, xy)
+        padded = np.concatenate([P[:1], P, P[-1:]])
+        control = np.stack([padded[:-3], padded[1:-2], padded[2:-1], padded[3:]], axis=1)
+        coeffs = np.einsum("kj,sjd->skd", np.asarray(cls.CATMULL_ROM_BASIS), control)
+
+        # Vnitřní úseky bez koncového bodu, poslední úsek včetně něj (t = 1)
+        inner = np.linspace(0.0, 1.0, points_per_segment, endpoint=False)
+        ts = np.tile(inner, (len(coeffs), 1))
+        ts[-1] = np.linspace(0.0, 1.0, points_per_segment, endpoint=True)
+        ts = ts[:, :, None]
+        t2 = ts * ts
+        t3 = t2 * ts
+        c = coeffs[:, None, :, :]
+        points = 0.5 * (c[:, :, 0] + c[:, :, 1] * ts + c[:, :, 2] * t2 + c[:, :, 3] * t3)
+        points = points.reshape(-1, 2)
+        return points[:, 0], points[:, 1]
+
+    @staticmethod
+    def monotone_slopes(x, y, ends="secant"):
+        """
+        Směrnice v uzlech pro monotónní Hermitovu interpolaci (alespoň 3 uzly).
+
+        Vnitřní uzly: vážený harmonický průměr sousedních sečen, 0 v lokálním
+        extrému. Krajní uzly: ends="secant" = sečna krajního úseku,
+        ends="pchip" = třibodový odhad jako scipy PchipInterpolator.
+        Nakonec Fritsch–Carlsonovo omezení (α² + β² ≤ 9) po úsecích.
+        """
+        import numpy as np
+
+        h = np.diff(x)
+        d = np.diff(y) / h
+
+        m = np.empty(len(x), dtype=float)
+        d0, d1 = d[:-1], d[1:]
+        w1 = 2.0 * h[1:] + h[:-1]
+        w2 = h[1:] + 2.0 * h[:-1]
+        flat = (d0 == 0.0) | (d1 == 0.0) | ((d0 > 0) & (d1 < 0)) | ((d0 < 0) & (d1 > 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m[1:-1] = np.where(flat, 0.0, (w1 + w2) / (w1 / d0 + w2 / d1))
+
+        if ends == "pchip":
+            for end, (h_a, h_b, d_a, d_b) in ((0, (h[0], h[1], d[0], d[1])), (-1, (h[-1], h[-2], d[-1], d[-2]))):
+                slope = ((2.0 * h_a + h_b) * d_a - h_a * d_b) / (h_a + h_b)
+                if np.sign(slope) != np.sign(d_a):
+                    slope = 0.0
+                elif np.sign(d_a) != np.sign(d_b) and abs(slope) > abs(3.0 * d_a):
+                    slope = 3.0 * d_a
+                m[end] = slope
+        else:
+            m[0] = d[0]
+            m[-1] = d[-1]
+
+        # Omezení se projeví jen na úsecích, které jsou mimo kruh už na začátku;
+        # úprava m[i + 1] se přenáší do dalšího úseku, proto postupně zleva.
+        m[:-1][d == 0.0] = 0.0
+        m[1:][d == 0.0] = 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = np.where(d == 0.0, 0.0, m[:-1] / d)
+            b = np.where(d == 0.0, 0.0, m[1:] / d)
+        for i in np.flatnonzero((a < 0.0) | (b < 0.0) | (a * a + b * b > 9.0)):
+            a_i = max(m[i] / d[i], 0.0)
+            b_i = max(m[i + 1] / d[i], 0.0)
+            m[i] = a_i * d[i]
+            m[i + 1] = b_i * d[i]
+            s = a_i * a_i + b_i * b_i
+            if s > 9.0:
+                t = 3.0 / np.sqrt(s)
+                m[i] = t * a_i * d[i]
+                m[i + 1] = t * b_i * d[i]
+        return m
+
+    @classmethod
+    def monotone_cubic(cls, xs, ys, points_per_segment=30, x_new=None, ends="secant", cache_key=None):
+        """
+        Vrátí (xs, ys) hladké monotónní křivky.
+
+        Bez x_new: každý úsek points_per_segment vzorků (poslední včetně konce);
+        s x_new: hodnoty v zadaných bodech. Shodná X se sloučí (platí poslední Y);
+        při méně než 3 uzlech se vrátí původní data (resp. lineární průběh).
+        """
+        import numpy as np
+
+        if cache_key is not None:
+            key = (cache_key, points_per_segment, ends, None if x_new is None else len(x_new))
+            with cls._cache_lock:
+                cached = cls._cache.pop(key, None)
+                if cached is not None:
+                    cls._cache[key] = cached
+                    return cached
+
+        x = np.array(xs, dtype=float)
+        y = np.array(ys, dtype=float)
+        if len(x) >= 3 or x_new is not None:
+            keep = np.append(x[1:] != x[:-1], True)
+            # Z běhu shodných X zůstane poslední Y
+            x, y = x[keep], y[keep]
+        n = len(x)
+
+        if n < 2 or (n < 3 and x_new is None):
+            result = (x, y)
+        else:
+            m = cls.monotone_slopes(x, y, ends) if n >= 3 else np.diff(y) / np.diff(x)
+            if n < 3:
+                m = np.append(m, m)
+            h = np.diff(x)
+            if x_new is None:
+                inner = np.linspace(0.0, 1.0, points_per_segment, endpoint=False)
+                t = np.tile(inner, (n - 1, 1))
+                t[-1] = np.linspace(0.0, 1.0, points_per_segment, endpoint=True)
+                idx = np.repeat(np.arange(n - 1), points_per_segment)
+                t = t.ravel()
+            else:
+                x_q = np.asarray(x_new, dtype=float)
+                idx = np.clip(np.searchsorted(x, x_q, side="right") - 1, 0, n - 2)
+                t = (x_q - x[idx]) / h[idx]
+            hi = h[idx]
+            t2 = t * t
+            t3 = t2 * t
+            h00 = 2 * t3 - 3 * t2 + 1
+            h10 = t3 - 2 * t2 + t
+            h01 = -2 * t3 + 3 * t2
+            h11 = t3 - t2
+            xs_out = x[idx] + t * hi if x_new is None else x_q
+            ys_out = h00 * y[idx] + h10 * hi * m[idx] + h01 * y[idx + 1] + h11 * hi * m[idx + 1]
+            result = (xs_out, ys_out)
+
+        if cache_key is not None:
+            with cls._cache_lock:
+                cls._cache[key] = result
+                while len(cls._cache) > cls.CACHE_SIZE:
+                    cls._cache.pop(next(iter(cls._cache)))
+        return result
+
+
+class SeriesDownsampler:
+    """
+    Úroveň detailu časových řad podle šířky grafu v pixelech zařízení.
+
+    Graf nemá smysl kreslit s více vrcholy/artisty, než kolik má osa pixelů:
+    lttb() vybere reprezentativní body (Largest-Triangle-Three-Buckets),
+    bucket_argmax()/min_max_indices() vybírají po skupinách sousedních hodnot
+    (obálka sloupců, resp. čáry) a points_per_segment() omezí zahuštění křivek.
+    Vše vrací indexy do původních polí, aby šly vybrat i barvy a popisky.
+    """
+
+    # Kolik vrcholů lomené čáry připadá na jeden pixel šířky osy
+    VERTICES_PER_PIXEL = 2
+    # Minimální šířka jednoho sloupce v pixelech
+    PIXELS_PER_BAR = 2.0
+
+    @staticmethod
+    def axes_pixels(fig, adjust=None):
+        """Šířka kreslicí plochy v pixelech (fig.bbox je v pixelech zařízení, včetně HiDPI)."""
+        if adjust is not None:
+            fraction = adjust.get("right", fig.subplotpars.right) - adjust.get("left", fig.subplotpars.left)
+        else:
+            fraction = fig.subplotpars.right - fig.subplotpars.left
+        return max(1.0, float(fig.bbox.width) * fraction)
+
+    @classmethod
+    def bucket_size(cls, count, pixels):
+        """Po kolika sousedních položkách seskupit sloupce, aby měl každý aspoň PIXELS_PER_BAR."""
+        max_bars = max(1, int(pixels / cls.PIXELS_PER_BAR))
+        return max(1, -(-int(count) // max_bars))
+
+    @classmethod
+    def points_per_segment(cls, count, pixels, limit):
+        """Zahuštění křivky přes `count` bodů tak, aby celkem nepřesáhla rozpočet vrcholů."""
+        if count < 2:
+            return limit
+        budget = int(pixels * cls.VERTICES_PER_PIXEL)
+        return max(1, min(limit, budget // (count - 1)))
+
+    @staticmethod
+    def _buckets(values, size):
+        """Hodnoty rozložené do řádků po `size` (poslední řádek doplněný NaN)."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=float)
+        rows = -(-len(values) // size)
+        padded = np.full(rows * size, np.nan)
+        padded[:len(values)] = values
+        return padded.reshape(rows, size)
+
+    @classmethod
+    def bucket_argmax(cls, values, size):
+        """Index maxima v každé skupině `size` sousedních hodnot."""
+        import numpy as np
 
-            backup_dir = self.data_file.parent / "backup"
-            backup_dir.mkdir(parents=True, exist_ok=True)
+        buckets = cls._buckets(values, size)
+        return np.nanargmax(buckets, axis=1) + np.arange(len(buckets)) * size
 
-            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-            backup_path = backup_dir / f"{self.data_file.stem}-{ts}{self.data_file.suffix}"
+    @classmethod
+    def min_max_indices(cls, values, size):
+        """Indexy minima a maxima každé skupiny v původním pořadí (zachová tvar čáry)."""
+        import numpy as np
+
+        buckets = cls._buckets(values, size)
+        offsets = np.arange(len(buckets)) * size
+        picks = np.concatenate([np.nanargmin(buckets, axis=1) + offsets, np.nanargmax(buckets, axis=1) + offsets])
+        return np.unique(np.concatenate([picks, [0, len(values) - 1]]))
+
+    @staticmethod
+    def lttb(x, y, n_out):
+        """
+        Indexy `n_out` bodů vybraných metodou Largest-Triangle-Three-Buckets.
+
+        První a poslední bod zůstávají; z každé skupiny se vezme bod, který
+        s předchozím vybraným bodem a průměrem další skupiny tvoří největší
+        trojúhelník – zachová špičky i trend.
+        """
+        import numpy as np
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = len(x)
+        if n_out >= n or n_out < 3:
+            return np.arange(n)
+
+        # Hranice n_out - 2 vnitřních skupin (první a poslední bod jsou samostatně)
+        edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(int) + 1
+        edges[-1] = n - 1
+        picked = np.empty(n_out, dtype=int)
+        picked[0] = 0
+        picked[-1] = n - 1
+        a = 0
+        for i in range(n_out - 2):
+            lo, hi = edges[i], edges[i + 1]
+            if i + 2 < len(edges):
+                nx, ny = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+            else:
+                nx, ny = x[-1], y[-1]
+            area = np.abs((x[a] - nx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ny - y[a]))
+            a = lo + int(np.argmax(area))
+            picked[i + 1] = a
+        return picked
+
+
+class GoalSchedule:
+    """
+    Denní cíle jednoho cvičení pro celý rok.
+
+    Pravidlo stejné jako dřív v calculate_goal: před startem 0, v prvním
+    („zlomeném“) týdnu base_goal, pak každý další týden + weekly_increment.
+    Pole `goals` je indexované dnem v roce (0 = 1.1.), součty přes úseky
+    se počítají v uzavřeném tvaru z base_goal a weekly_increment.
+    """
 
-            with open(self.data_file, "rb") as src, open(backup_path, "wb") as dst:
-                dst.write(src.read())
+    def __init__(self, year, start_date=None, base_goal=0, weekly_increment=0, constant=None):
+        import numpy as np
 
-            # ponechat max 10 posledních záloh pro tento soubor
-            backups = sorted(
-                backup_dir.glob(f"{self.data_file.stem}-*{self.data_file.suffix}"),
-                key=lambda p: p.stat().st_mtime,
-                reverse=True
+        self.year = year
+        self.first_day = datetime(year, 1, 1).date()
+        self.days = (datetime(year, 12, 31).date() - self.first_day).days + 1
+        self.start_date = start_date
+        self.base_goal = base_goal
+        self.weekly_increment = weekly_increment
+        # constant != None -> stejný cíl pro každý den (fallback pro chybějící nastavení)
+        self.constant = constant
+
+        d = np.arange(self.days, dtype=np.int64)
+        if constant is not None:
+            self.goals = np.full(self.days, constant)
+        else:
+            self._start_offset = (start_date - self.first_day).days
+            self._first_week_days = 7 - start_date.weekday()
+            d = d - self._start_offset
+            weeks = (d - self._first_week_days) // 7 + 1
+            self.goals = np.where(
+                d < 0, 0,
+                np.where(d < self._first_week_days, base_goal, base_goal + weeks * weekly_increment)
             )
-            for old in backups[10:]:
-                try:
-                    old.unlink()
-                except Exception:
-                    pass
 
-            print(f"Záloha dat vytvořena: {backup_path}")
-        except Exception as e:
-            print(f"Záloha dat selhala: {e}")
-            
-    def migrate_exercise_start_dates(self):
-        """Doplní year_settings[year].exercise_start_dates pro všechna cvičení, pokud chybí.
-        Vytvoří zálohu JSON před první změnou.
+    def goal_at(self, date):
+        """Cíl pro jeden den roku (Python int/float)."""
+        return self.goals[(date - self.first_day).days].item()
+
+    @staticmethod
+    def _floor_week_sum(n):
+        """Součet floor(j / 7) pro j = 0..n-1."""
+        if n <= 0:
+            return 0
+        q, r = divmod(n, 7)
+        return 7 * q * (q - 1) // 2 + r * q
+
+    def sum_range(self, from_date, to_date):
+        """Součet cílů za dny from_date..to_date (včetně), oříznuto na daný rok."""
+        a = max((from_date - self.first_day).days, 0)
+        b = min((to_date - self.first_day).days, self.days - 1)
+        if b < a:
+            return 0
+        if self.constant is not None:
+            return self.constant * (b - a + 1)
+
+        # Převod na dny od startu; před startem je cíl 0
+        lo = max(a - self._start_offset, 0)
+        hi = b - self._start_offset
+        if hi < lo:
+            return 0
+
+        f = self._first_week_days
+        total = 0
+
+        # První (zlomený) týden -> base_goal
+        first_hi = min(hi, f - 1)
+        if first_hi >= lo:
+            total += (first_hi - lo + 1) * self.base_goal
+
+        # Další týdny: base + inc * (floor((d - f) / 7) + 1)
+        j0 = max(lo, f) - f
+        j1 = hi - f
+        if j1 >= j0:
+            count = j1 - j0 + 1
+            weeks = self._floor_week_sum(j1 + 1) - self._floor_week_sum(j0)
+            total += count * (self.base_goal + self.weekly_increment) + weeks * self.weekly_increment
+        return total
+
+    def total(self):
+        """Celkový roční cíl."""
+        return self.sum_range(self.first_day, datetime(self.year, 12, 31).date())
+
+
+class DataMigrator:
+    """
+    Registr migrací dokumentu dat podle data["schema_version"] (chybí = 0).
+
+    Každý krok má cílovou verzi, úpravu struktury dokumentu a/nebo úpravu
+    jednoho dne ve workouts. Dokument v aktuální verzi se vůbec neprochází;
+    zastaralý se dotáhne jedním průchodem přes dny, ve kterém se pro každý
+    den zavolají denní kroky všech chybějících verzí v pořadí registru.
+    """
+
+    # (verze, popis, úprava dokumentu, úprava dne) – názvy metod nebo None
+    STEPS = [
+        (1, "záznamy jako seznamy s id", None, "_day_record_lists"),
+        (2, "settings → year_settings", "_doc_year_settings", None),
+        (3, "struktura exercises", "_doc_exercises", None),
+        (4, "klíče cvičení bez diakritiky", "_doc_exercise_keys", "_day_exercise_keys"),
+    ]
+
+    EXERCISE_KEY_MAPPING = {"dřepy": "drepy", "skrčky": "skrcky"}
+
+    @staticmethod
+    def version_of(data):
+        try:
+            return int(data.get("schema_version", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    @classmethod
+    def upgrade(cls, data):
+        """
+        Dotáhne dokument na SCHEMA_VERSION a nastaví schema_version.
+
+        Vrací popisy kroků, které data skutečně změnily (prázdný seznam =
+        jen razítko verze), nebo None, pokud je dokument už aktuální.
         """
+        steps = [step for step in cls.STEPS if step[0] > cls.version_of(data)]
+        if not steps:
+            return None
+
+        changed = set()
+        # Struktura dokumentu (year_settings, exercises, app_state) – bez záznamů
+        for _version, label, doc_step, _day_step in steps:
+            if doc_step and getattr(cls, doc_step)(data):
+                changed.add(label)
+
+        # Jediný průchod přes dny pro všechny denní kroky
+        day_steps = [(label, getattr(cls, day_step)) for _v, label, _d, day_step in steps if day_step]
+        workouts = data.get("workouts")
+        if day_steps and isinstance(workouts, dict):
+            for date_str, day in workouts.items():
+                if not isinstance(day, dict):
+                    continue
+                for label, day_step in day_steps:
+                    if day_step(date_str, day):
+                        changed.add(label)
+
+        data["schema_version"] = SCHEMA_VERSION
+        return [label for _v, label, _d, _day in steps if label in changed]
+
+    # ---------- v1: záznamy dne jako seznam s id ----------
+    @staticmethod
+    def _day_record_lists(date_str, day):
         changed = False
-        # Pro každý rok v year_settings
-        for year_str, ys in self.data.get("year_settings", {}).items():
-            if not isinstance(ys, dict):
-                continue
-            ex_map = ys.get("exercise_start_dates")
-            if ex_map is None:
-                ys["exercise_start_dates"] = {}
-                ex_map = ys["exercise_start_dates"]
+        for exercise, value in list(day.items()):
+            # Migrace z single value na dict
+            if isinstance(value, (int, float)):
+                day[exercise] = [{
+                    "value": int(value),
+                    "timestamp": f"{date_str} 12:00:00",
+                    "id": str(uuid.uuid4())
+                }]
                 changed = True
-            # Pro všechna cvičení (i případně neaktivní kvůli historii)
-            for ex_id, ex_conf in self.data.get("exercises", {}).items():
-                if ex_id in ex_map and ex_map[ex_id]:
-                    continue
-                # 1) pokud je v exercises.start_dates[year], použij
-                sd_map = ex_conf.get("start_dates", {}) if isinstance(ex_conf, dict) else {}
-                if isinstance(sd_map, dict) and year_str in sd_map and sd_map[year_str]:
-                    ex_map[ex_id] = sd_map[year_str]
+            # Migrace z single dict na list
+            elif isinstance(value, dict) and "value" in value:
+                day[exercise] = [{
+                    "value": value["value"],
+                    "timestamp": value.get("timestamp", f"{date_str} 12:00:00"),
+                    "id": str(uuid.uuid4())
+                }]
+                changed = True
+            # Už je list - zkontroluj že mají všechny záznamy ID
+            elif isinstance(value, list):
+                for record in value:
+                    if isinstance(record, dict) and "id" not in record:
+                        record["id"] = str(uuid.uuid4())
+                        changed = True
+        return changed
+
+    # ---------- v2: year_settings ----------
+    @staticmethod
+    def _doc_year_settings(data):
+        if "year_settings" in data:
+            return False
+        data["year_settings"] = {}
+        old_settings = data.pop("settings", None)
+        if isinstance(old_settings, dict):
+            start_year = int(old_settings["start_date"].split("-")[0])
+            data["year_settings"][str(start_year)] = {
+                "start_date": old_settings["start_date"],
+                "base_goals": old_settings["base_goals"].copy(),
+                "weekly_increment": old_settings["weekly_increment"].copy()
+            }
+        return True
+
+    # ---------- v3: exercises ----------
+    @staticmethod
+    def _doc_exercises(data):
+        if "exercises" in data:
+            return False
+        # Výchozí cvičení (verze 2.0)
+        data["exercises"] = {
+            "kliky": {"name": "Kliky", "icon": "💪", "order": 0, "active": True, "quick_buttons": [10, 15, 20]},
+            "drepy": {"name": "Dřepy", "icon": "🦵", "order": 1, "active": True, "quick_buttons": [5, 10, 15, 20]},
+            "skrcky": {"name": "Skrčky", "icon": "🧘", "order": 2, "active": True, "quick_buttons": [10, 15, 20, 30, 40]}
+        }
+        return True
+
+    # ---------- v4: klíče cvičení bez diakritiky ----------
+    @classmethod
+    def _rename_keys(cls, mapping):
+        changed = False
+        if isinstance(mapping, dict):
+            for old_key, new_key in cls.EXERCISE_KEY_MAPPING.items():
+                if old_key in mapping:
+                    mapping[new_key] = mapping.pop(old_key)
                     changed = True
+        return changed
+
+    @classmethod
+    def _doc_exercise_keys(cls, data):
+        changed = False
+        for year_settings in data.get("year_settings", {}).values():
+            if isinstance(year_settings, dict):
+                changed |= cls._rename_keys(year_settings.get("base_goals"))
+                changed |= cls._rename_keys(year_settings.get("weekly_increment"))
+        app_state = data.get("app_state")
+        if isinstance(app_state, dict):
+            changed |= cls._rename_keys(app_state.get("exercise_years"))
+        return changed
+
+    @classmethod
+    def _day_exercise_keys(cls, date_str, day):
+        return cls._rename_keys(day)
+
+
+class JsonStreamReader:
+    """
+    Postupné čtení JSON ze souboru po blocích (bez načtení celého souboru).
+
+    members() prochází klíče objektu a hodnotu si volající přečte sám –
+    buď celou přes value(), nebo po částech dalším members() (např. dny
+    ve workouts). V paměti je vždy jen rozpracovaný blok textu.
+    """
+
+    CHUNK = 1 << 20
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, f):
+        import codecs
+        import re
+
+        self.file = f
+        self.bytes_read = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._number_tail = re.compile(r"[0-9.eE+-]*\Z")
+        # Nedokončený token na konci bufferu (číslo, true/false/null, \uXXXX escape)
+        self._token_tail = re.compile(r"[\w.+-]*\Z")
+        self._buf = ""
+        self._pos = 0
+
+    def _fill(self):
+        """Přidá do bufferu další blok; False na konci souboru."""
+        if self.eof:
+            return False
+        data = self.file.read(self.CHUNK)
+        self.bytes_read += len(data)
+        if not data:
+            self.eof = True
+        text = self._utf8.decode(data, final=self.eof)
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        return bool(data)
+
+    def peek(self):
+        """První znak za mezerami ("" na konci souboru)."""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in self.WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Neplatný JSON: očekáváno '{char}', nalezeno '{found or 'konec souboru'}'")
+        self._pos += 1
+
+    def value(self):
+        """Přečte jednu celou hodnotu JSON."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Hodnota pokračuje v dalším bloku, jen pokud chyba leží v neúplném konci
+                # bufferu; chyba uprostřed je neplatný JSON (bez čtení dalších bloků)
+                if self._truncated(e) and self._fill():
                     continue
-                # 2) fallback na year_settings.start_date nebo 1.1.
-                fallback = ys.get("start_date", f"{year_str}-01-01")
-                ex_map[ex_id] = fallback
-                changed = True
-        if changed:
-            # vytvoř zálohu a ulož
-            self.backup_data_file()
-            self.save_data()
-            print("Migrace: doplněny exercise_start_dates pro roky v year_settings.")
-            
-    def get_exercise_start_date(self, exercise_id: str, year: int):
-        """
-        Vrátí startovní datum pro dané cvičení a rok (date).
-        Priorita: year_settings[year].exercise_start_dates[exercise] → exercises[exercise].start_dates[year]
-                  → year_settings[year].start_date → YYYY-01-01
-        """
+                raise
+            # Číslo až do konce bufferu může pokračovat v dalším bloku ("1." + "5e3")
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and self._number_tail.match(self._buf, end) and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def _truncated(self, error):
+        """True, pokud chyba dekódování může být jen useknutý konec bufferu."""
+        if error.msg.startswith("Unterminated string"):
+            # Řetězec bez konce běží až do konce bufferu
+            return True
+        return self._token_tail.match(self._buf, error.pos) is not None
+
+    def members(self):
+        """Klíče objektu; hodnotu každého klíče musí volající přečíst před dalším krokem."""
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Neplatný JSON: klíč objektu není řetězec")
+            self._expect(":")
+            yield key
+            found = self.peek()
+            self._pos += 1
+            if found == "}":
+                return
+            if found != ",":
+                raise ValueError(f"Neplatný JSON: očekáváno ',' nebo '}}', nalezeno '{found or 'konec souboru'}'")
+
+
+class WorkoutImporter(QObject):
+    """
+    Import dat z JSON souboru ve vlákně na pozadí.
+
+    Soubor se čte postupně (JsonStreamReader), dny ve workouts se po dávkách
+    ověří a převedou na seznamy záznamů; zbytek dokumentu projde migracemi
+    (DataMigrator). Vlákno na živá data nesahá – výsledek si převezme GUI
+    vlákno po signálu `finished` a sloučí ho přes merge() jedním průchodem.
+    """
+
+    progress = Signal(int)  # procenta přečteného souboru
+    finished = Signal()     # hotovo – viz result / error / cancelled
+
+    BATCH_DAYS = 500
+
+    class Cancelled(Exception):
+        pass
+
+    def __init__(self, path, parent=None):
+        import threading
+
+        super().__init__(parent)
+        self.path = Path(path)
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._percent = -1
+        self._thread = None
+
+    def start(self):
+        import threading
+
+        self._thread = threading.Thread(target=self._run, name="WorkoutImporter", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
         try:
-            ys = self.get_year_settings(year)
-            # 1) Per-exercise v year_settings
-            ex_map = ys.get("exercise_start_dates", {})
+            self.result = self.parse()
+        except self.Cancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = str(e)
+        self.finished.emit()
+
+    def _step(self, reader, total):
+        """Průběh + kontrola zrušení (mezi dávkami)."""
+        if self._cancel.is_set():
+            raise self.Cancelled()
+        percent = min(99, reader.bytes_read * 100 // total)
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+    def parse(self):
+        """Přečte soubor; vrátí {"document", "workouts", "records", "invalid"} nebo None při neplatném formátu."""
+        import os
+
+        total = max(1, os.path.getsize(self.path))
+        document, workouts = {}, {}
+        records = invalid = 0
+        has_workouts = False
+        with open(self.path, "rb") as f:
+            reader = JsonStreamReader(f)
+            for key in reader.members():
+                if key != "workouts":
+                    document[key] = reader.value()
+                    continue
+                if reader.peek() != "{":
+                    # Neplatná hodnota workouts – přečti a nech rozhodnout kontrolu formátu
+                    reader.value()
+                    continue
+                has_workouts = True
+                batch = []
+                for date_str in reader.members():
+                    batch.append((date_str, reader.value()))
+                    if len(batch) >= self.BATCH_DAYS:
+                        added, skipped = self.validate_days(batch, workouts)
+                        records, invalid = records + added, invalid + skipped
+                        batch = []
+                        self._step(reader, total)
+                added, skipped = self.validate_days(batch, workouts)
+                records, invalid = records + added, invalid + skipped
+                self._step(reader, total)
+
+        if not has_workouts or "year_settings" not in document:
+            return None
+        # Starší export -> stejné migrace dokumentu jako při načtení (dny převedla validate_days)
+        DataMigrator.upgrade(document)
+        self.progress.emit(100)
+        return {"document": document, "workouts": workouts, "records": records, "invalid": invalid}
+
+    @staticmethod
+    def validate_days(batch, workouts):
+        """Ověří dávku (den, hodnota) a platné záznamy přidá do workouts; vrátí (platné, neplatné)."""
+        valid = invalid = 0
+        for date_str, day in batch:
+            try:
+                datetime.strptime(date_str, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                invalid += 1
+                continue
+            if not isinstance(day, dict):
+                invalid += 1
+                continue
+            DataMigrator._day_exercise_keys(date_str, day)
+            target = workouts.setdefault(date_str, {})
+            for exercise, value in day.items():
+                # Tvary jako DataMigrator._day_record_lists: číslo, jeden záznam, seznam
+                if isinstance(value, list):
+                    candidates = value
+                elif isinstance(value, dict) and "value" in value:
+                    candidates = [value]
+                else:
+                    candidates = [{"value": value}]
+                for record in candidates:
+                    number = record.get("value") if isinstance(record, dict) else None
+                    if not isinstance(number, (int, float)) or isinstance(number, bool) or not math.isfinite(number):
+                        invalid += 1
+                        continue
+                    record = dict(record)
+                    if not isinstance(record.get("timestamp"), str):
+                        record["timestamp"] = f"{date_str} 12:00:00"
+                    if not isinstance(record.get("id"), str) or not record["id"]:
+                        record.pop("id", None)
+                    target.setdefault(exercise, []).append(record)
+                    valid += 1
+            if not target:
+                del workouts[date_str]
+        return valid, invalid
+
+    @staticmethod
+    def content_key(exercise, record):
+        """Otisk obsahu záznamu bez id (pro deduplikaci starších záznamů bez id)."""
+        body = {k: v for k, v in record.items() if k != "id"}
+        if isinstance(body.get("value"), (int, float)):
+            body["value"] = float(body["value"])
+        return exercise + "\0" + json.dumps(body, ensure_ascii=False, sort_keys=True)
+
+    @classmethod
+    def merge(cls, workouts, imported):
+        """
+        Sloučí importované dny do workouts jedním průchodem.
+
+        Záznam s id se přeskočí, pokud totéž id v daném dni už je; záznam
+        bez id, pokud v datech před importem je záznam se stejným obsahem
+        (každý jen pro jeden importovaný – stejné série ze souboru zůstanou).
+        Nové záznamy bez id dostanou nové id. Vrátí (nové dny, nové záznamy, duplicity).
+        """
+        new_days = new_records = duplicates = 0
+        for date_str, day in imported.items():
+            existing = workouts.get(date_str)
+            if not isinstance(existing, dict):
+                existing = {}
+                workouts[date_str] = existing
+                new_days += 1
+            # Sada id dne; počty otisků obsahu jen pro dny se záznamy bez id
+            legacy = any(not record.get("id") for records in day.values() for record in records)
+            ids, contents = set(), {}
+            for exercise, records in existing.items():
+                if not isinstance(records, list):
+                    continue
+                for record in records:
+                    if isinstance(record, dict):
+                        if record.get("id"):
+                            ids.add(record["id"])
+                        if legacy:
+                            key = cls.content_key(exercise, record)
+                            contents[key] = contents.get(key, 0) + 1
+            for exercise, records in day.items():
+                added = []
+                for record in records:
+                    record_id = record.get("id")
+                    if record_id:
+                        if record_id in ids:
+                            duplicates += 1
+                            continue
+                    else:
+                        key = cls.content_key(exercise, record)
+                        if contents.get(key):
+                            # Spáruje se s jedním dřívějším záznamem, další stejný se přidá
+                            contents[key] -= 1
+                            duplicates += 1
+                            continue
+                        record["id"] = str(uuid.uuid4())
+                    ids.add(record["id"])
+                    added.append(record)
+                if not added:
+                    continue
+                target = existing.get(exercise)
+                if isinstance(target, list):
+                    target.extend(added)
+                else:
+                    existing[exercise] = added if target is None else [target, *added]
+                new_records += len(added)
+            if not existing:
+                del workouts[date_str]
+                new_days -= 1
+        return new_days, new_records, duplicates
+
+
+class DataJournal:
+    """
+    Append-only žurnál změn vedle hlavního JSON souboru.
+
+    Každá změna = jeden řádek JSON s operací nad cestou v self.data:
+      {"op": "set", "path": [...], "value": ...}     – nastav hodnotu
+      {"op": "del", "path": [...]}                   – smaž klíč
+      {"op": "put_item", "path": [...], "value": {}} – vlož/nahraď položku seznamu podle "id"
+      {"op": "del_item", "path": [...], "id": "..."} – smaž položku seznamu podle "id"
+    Operace nastavují absolutní stav, takže opakované přehrání je bezpečné.
+    """
+
+    def __init__(self, path):
+        import threading
+
+        self.path = Path(path)
+        self.pending = 0  # počet zápisů od poslední kompakce
+        self.replayed_heads = set()  # první klíče cest přehraných operací (viz JsonStorage.load)
+        # Bajty už odstraněné ze začátku souboru; značky size() jsou logické pozice
+        # od vzniku žurnálu, takže je pozdější zkrácení neposune
+        self._removed = 0
+        # Zápis běží v GUI vlákně, zkracování po uložení snapshotu ve vlákně zapisovače
+        self._lock = threading.Lock()
+
+    def append(self, op):
+        """Zapíše jednu operaci na konec žurnálu."""
+        import os
+
+        line = json.dumps(op, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.pending += 1
+
+    def _file_size(self):
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def size(self):
+        """Logická délka žurnálu (všechny kdy zapsané bajty) – značka pro pozdější zkrácení."""
+        with self._lock:
+            return self._removed + self._file_size()
+
+    def truncate_before(self, marker):
+        """Odstraní změny zapsané před značkou `marker` (ze size()) – už jsou v zapsaném snapshotu.
+
+        Sloučené požadavky na uložení zavolají zkrácení víckrát; značka se
+        přepočítá na pozici v souboru podle už odstraněných bajtů, takže
+        starší či opakovaná značka nic navíc nesmaže.
+        """
+        import os
+
+        with self._lock:
+            offset = marker - self._removed
+            try:
+                if offset <= 0 or not self.path.exists():
+                    return
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    rest = f.read()
+                if not rest:
+                    self.path.unlink()
+                    self._removed = marker
+                    return
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(rest)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._removed = marker
+            except Exception as e:
+                print(f"Chyba při zkracování žurnálu: {e}")
+
+    @staticmethod
+    def _parent(data, path, create):
+        node = data
+        for key in path[:-1]:
+            if not isinstance(node, dict):
+                return None
+            if key not in node:
+                if not create:
+                    return None
+                node[key] = {}
+            node = node[key]
+        return node if isinstance(node, dict) else None
+
+    @classmethod
+    def apply(cls, data, op):
+        """Aplikuje jednu operaci na data (in-place)."""
+        path = op.get("path") or []
+        kind = op.get("op")
+        if not path:
+            return
+
+        if kind == "set":
+            parent = cls._parent(data, path, create=True)
+            if parent is not None:
+                parent[path[-1]] = op.get("value")
+        elif kind == "del":
+            parent = cls._parent(data, path, create=False)
+            if parent is not None:
+                parent.pop(path[-1], None)
+        elif kind in ("put_item", "del_item"):
+            parent = cls._parent(data, path, create=True)
+            if parent is None:
+                return
+            items = parent.get(path[-1])
+            if not isinstance(items, list):
+                items = parent[path[-1]] = []
+            if kind == "del_item":
+                item_id = op.get("id")
+                items[:] = [e for e in items if not (isinstance(e, dict) and e.get("id") == item_id)]
+                return
+            value = op.get("value") or {}
+            for i, e in enumerate(items):
+                if isinstance(e, dict) and e.get("id") == value.get("id"):
+                    items[i] = value
+                    break
+            else:
+                items.append(value)
+
+    def replay(self, data):
+        """Přehraje žurnál nad načteným snapshotem. Vrací počet aplikovaných operací."""
+        if not self.path.exists():
+            return 0
+        applied = 0
+        self.replayed_heads = set()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # Nedopsaný poslední řádek (pád při zápisu) – zbytek ignoruj
+                    break
+                self.apply(data, op)
+                self.replayed_heads.add((op.get("path") or [None])[0])
+                applied += 1
+        self.pending = applied
+        return applied
+
+    def clear(self):
+        """Vyprázdní žurnál (po zapsání úplného snapshotu)."""
+        with self._lock:
+            try:
+                if self.path.exists():
+                    self._removed += self._file_size()
+                    self.path.unlink()
+            except Exception as e:
+                print(f"Chyba při mazání žurnálu: {e}")
+        self.pending = 0
+
+
+class DataSaver:
+    """
+    Zapisovač snapshotu dat ve vlastním vlákně.
+
+    Snapshot se pořídí hned ve volajícím (GUI) vlákně jedním voláním
+    json.dumps, takže ho pozdější úpravy dat nemohou roztrhnout; vlákno
+    zapisovače ho jen naformátuje, zapíše a soubor nahradí atomicky
+    (dočasný soubor + os.replace), takže pád při zápisu nepoškodí poslední
+    platnou verzi. Požadavky v krátkém okně se sloučí do jednoho zápisu.
+    flush() počká na dokončení všech požadavků.
+    """
+
+    def __init__(self, path, delay=0.4, max_delay=2.0, writer=None, snapshot=None):
+        import threading
+
+        self.path = Path(path)
+        # snapshot(data) ve volajícím vlákně -> neměnná kopie pro zapisovač
+        self.snapshot = snapshot or self._snapshot
+        # merge(starší, novější) sloučí nevyřízený snapshot s novým (výchozí: novější vyhrává)
+        self.merge = self._merge
+        # writer(snapshot) zapíše snapshot (výchozí: celý dokument do jednoho souboru)
+        self.writer = writer or self._write
+        self.delay = delay          # debounce okno od posledního požadavku
+        self.max_delay = max_delay  # nejdéle od prvního nevyřízeného požadavku
+        self._cond = threading.Condition()
+        self._data = None
+        self._callbacks = []
+        self._first_request = 0.0
+        self._last_request = 0.0
+        self._writing = False
+        self._flushing = False
+        self._stopping = False
+        # Identita naposledy zapsaného souboru (viz WorkoutIndexCache.source_info)
+        self.written = None
+        self._thread = threading.Thread(target=self._run, name="DataSaver", daemon=True)
+        self._thread.start()
+
+    def request(self, data, on_written=None):
+        """Naplánuje uložení `data`; volitelný callback po úspěšném zápisu."""
+        import time
+
+        snapshot = self.snapshot(data)
+        with self._cond:
+            now = time.monotonic()
+            if self._data is None:
+                self._first_request = now
+                self._data = snapshot
+            else:
+                self._data = self.merge(self._data, snapshot)
+            self._last_request = now
+            if on_written is not None:
+                self._callbacks.append(on_written)
+            self._cond.notify_all()
+
+    def flush(self, timeout=30.0):
+        """Okamžitě zapíše nevyřízený požadavek a počká na dokončení zápisu."""
+        import time
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._data is not None or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    break
+                self._cond.wait(remaining)
+            self._flushing = False
+            return self._data is None and not self._writing
+
+    def stop(self):
+        """Dokončí rozepsané ukládání a ukončí vlákno."""
+        self.flush()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+
+    def _run(self):
+        import time
+
+        while True:
+            with self._cond:
+                while self._data is None and not self._stopping:
+                    self._cond.wait()
+                if self._data is None:
+                    return
+                # Debounce: čekej, dokud chodí další požadavky (max. max_delay)
+                while not self._flushing and not self._stopping:
+                    wake = min(self._last_request + self.delay, self._first_request + self.max_delay)
+                    remaining = wake - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                snapshot, callbacks = self._data, self._callbacks
+                self._data, self._callbacks = None, []
+                self._writing = True
+
+            try:
+                self.writer(snapshot)
+                for callback in callbacks:
+                    callback()
+            except Exception as e:
+                print(f"Chyba při ukládání dat na pozadí: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _merge(previous, snapshot):
+        return snapshot
+
+    @staticmethod
+    def _snapshot(data):
+        # Kompaktní json.dumps běží v C najednou – rychlé a bez roztržení
+        return json.dumps(data, ensure_ascii=False)
+
+    def _write(self, snapshot):
+        import os
+
+        # Soubor zůstává čitelný (indent=2) a řádkový pro bloky záloh
+        raw = json.dumps(json.loads(snapshot), ensure_ascii=False, indent=2).encode("utf-8")
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.written = WorkoutIndexCache.source_info(raw, os.stat(self.path).st_mtime_ns)
+
+
+class YearPartitionedDict(dict):
+    """
+    dict s klíči začínajícími rokem ("YYYY-MM-DD", "YYYY"), jehož roky se
+    načítají až při prvním přístupu (viz ShardedJsonStorage).
+
+    Přístup ke klíči načte jen jeho rok; operace nad celým slovníkem
+    (iterace, len, items, ...) načtou všechny roky, takže se navenek chová
+    jako běžný dict. Classmethody níže fungují i nad obyčejným dict
+    a umožňují pracovat s jedním rokem bez načítání ostatních.
+    """
+
+    def __init__(self, loader, pending=(), summaries=None):
+        super().__init__()
+        self.loader = loader              # loader(rok) načte shard roku (naplní i sesterský dict)
+        self.pending = set(pending)       # roky na disku, které ještě nejsou v paměti
+        self.summaries = summaries or {}  # rok -> souhrn z indexu (dny, součty, počty)
+        self.listeners = []               # listener(rok, {klíč: hodnota}) po načtení roku
+
+    @staticmethod
+    def year_of(key):
+        year = str(key)[:4]
+        return year if year.isdigit() else "0000"
+
+    def load_year(self, year):
+        year = str(year)
+        if year in self.pending:
+            self.loader(year)
+
+    def load_all(self):
+        for year in sorted(self.pending):
+            self.load_year(year)
+
+    def absorb(self, year, items):
+        """Vloží obsah načteného shardu roku (volá loader)."""
+        self.pending.discard(year)
+        for key, value in items.items():
+            dict.__setitem__(self, key, value)
+        for listener in list(self.listeners):
+            listener(year, items)
+
+    # ---------- přístup ke klíči: jen jeho rok ----------
+    def __getitem__(self, key):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        return dict.get(self, key, default)
+
+    def __setitem__(self, key, value):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        if self.pending:
+            self.load_year(self.year_of(key))
+        return dict.pop(self, key, *default)
+
+    def __bool__(self):
+        return bool(self.pending) or dict.__len__(self) > 0
+
+    # ---------- celý slovník: všechny roky ----------
+    def __iter__(self):
+        self.load_all()
+        return dict.__iter__(self)
+
+    def __reversed__(self):
+        self.load_all()
+        return dict.__reversed__(self)
+
+    def __len__(self):
+        self.load_all()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+    def update(self, *args, **kwargs):
+        self.load_all()
+        dict.update(self, *args, **kwargs)
+
+    def popitem(self):
+        self.load_all()
+        return dict.popitem(self)
+
+    def clear(self):
+        self.pending.clear()
+        dict.clear(self)
+
+    def copy(self):
+        self.load_all()
+        return dict(dict.items(self))
+
+    def __eq__(self, other):
+        self.load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self.load_all()
+        return dict.__ne__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.load_all()
+        return dict.__repr__(self)
+
+    # ---------- práce po rocích (i nad obyčejným dict) ----------
+    @classmethod
+    def years(cls, mapping):
+        """Roky (str) všech klíčů – bez načítání."""
+        if isinstance(mapping, cls):
+            return {cls.year_of(k) for k in dict.keys(mapping)} | mapping.pending
+        return {cls.year_of(k) for k in (mapping or {})}
+
+    @classmethod
+    def keys_in_year(cls, mapping, year):
+        """Klíče jednoho roku (načte jen tento rok)."""
+        year = str(year)
+        if isinstance(mapping, cls):
+            mapping.load_year(year)
+            keys = dict.keys(mapping)
+        else:
+            keys = mapping or {}
+        return [k for k in keys if cls.year_of(k) == year]
+
+    @classmethod
+    def count_in_year(cls, mapping, year):
+        """Počet klíčů (dnů) roku; nenačtený rok se vezme ze souhrnu v indexu."""
+        if isinstance(mapping, cls) and str(year) in mapping.pending:
+            summary = mapping.summaries.get(str(year)) or {}
+            if "days" in summary:
+                return int(summary["days"])
+        return len(cls.keys_in_year(mapping, year))
+
+    @classmethod
+    def day_counts(cls, mapping):
+        """Počty klíčů (dnů) po rocích jedním průchodem; nenačtené roky ze souhrnu v indexu."""
+        counts = {}
+        keys = dict.keys(mapping) if isinstance(mapping, cls) else (mapping or {})
+        for key in keys:
+            year = cls.year_of(key)
+            counts[year] = counts.get(year, 0) + 1
+        if isinstance(mapping, cls):
+            for year in list(mapping.pending):
+                counts[year] = cls.count_in_year(mapping, year)
+        return counts
+
+    @classmethod
+    def loaded_items(cls, mapping):
+        """Položky už načtených roků."""
+        if isinstance(mapping, cls):
+            return list(dict.items(mapping))
+        return list((mapping or {}).items())
+
+    @classmethod
+    def pending_years(cls, mapping):
+        """Roky (int) na disku, které ještě nejsou načtené."""
+        if isinstance(mapping, cls):
+            return sorted(int(y) for y in mapping.pending)
+        return []
+
+    @classmethod
+    def load_range(cls, mapping, first_year, last_year):
+        """Načte nenačtené roky first_year..last_year (včetně)."""
+        for year in cls.pending_years(mapping):
+            if first_year <= year <= last_year:
+                mapping.load_year(f"{year:04d}")
+
+    @classmethod
+    def listen(cls, mapping, listener):
+        """Zaregistruje listener(rok, položky) pro načtení roku (obyčejný dict nic nenačítá)."""
+        if isinstance(mapping, cls) and listener not in mapping.listeners:
+            mapping.listeners.append(listener)
+
+
+class JsonStorage:
+    """
+    Úložiště v jednom JSON souboru (výchozí).
+
+    Plný snapshot zapisuje DataSaver na pozadí, drobné změny jdou do
+    DataJournal a při načtení se přehrají nad snapshotem. K zapsanému
+    snapshotu se na pozadí udržuje binární cache indexu (WorkoutIndexCache).
+    """
+
+    # Po kolika zápisech do žurnálu se zapíše plný snapshot
+    JOURNAL_COMPACT_EVERY = 200
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.journal = DataJournal(self.path.with_suffix(".journal"))
+        self.saver = DataSaver(self.path)
+        self.index_cache = WorkoutIndexCache(self.path.with_suffix(".cache"))
+        # Identita načteného JSON, dokud data v paměti odpovídají souboru (jinak None)
+        self.loaded_source = None
+        # Index, jehož pole se při zavření uloží do cache (viz restore_workout_index)
+        self.workout_store = None
+
+    def load(self):
+        """Načte snapshot + žurnál; None pokud soubor neexistuje."""
+        import os
+
+        if not self.path.exists():
+            return None
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        data = json.loads(raw)
+        self.loaded_source = self.index_cache.identify(raw, mtime_ns)
+        self._replay(data)
+        return data
+
+    def _replay(self, data):
+        # Dohraj změny zapsané do žurnálu od poslední kompakce
+        try:
+            replayed = self.journal.replay(data)
+            if replayed:
+                # Cache indexu platí dál, pokud žurnál nesahal na záznamy
+                if self.journal.replayed_heads - {"app_state", "body_metrics", "year_settings", "exercises"}:
+                    self.loaded_source = None
+                print(f"Žurnál: přehráno {replayed} změn")
+            return replayed
+        except Exception as e:
+            self.loaded_source = None
+            print(f"Chyba při přehrávání žurnálu: {e}")
+            return 0
+
+    def save(self, data):
+        """Naplánuje zápis plného snapshotu; po zápisu zkrátí žurnál (kompakce)."""
+        self.loaded_source = None
+        # Změny zapsané do žurnálu až sem budou obsaženy ve snapshotu
+        marker = self.journal.size()
+        self.journal.pending = 0
+        self.saver.request(data, lambda: self._snapshot_written(marker))
+
+    def _snapshot_written(self, marker):
+        # Vlákno zapisovače: kompakce žurnálu k novému snapshotu
+        self.journal.truncate_before(marker)
+
+    def restore_workout_index(self, store):
+        """Naplní store z binární cache, pokud patří k načteným datům (jinak False – postaví ho volající).
+
+        Pole store se při zavření uloží do cache k poslednímu zapsanému snapshotu.
+        """
+        self.workout_store = store
+        columns = self.index_cache.load(self.loaded_source) if self.loaded_source else None
+        self.loaded_source = None
+        if columns is None:
+            return False
+        store.restore(columns)
+        return True
+
+    def _write_index_cache(self):
+        """Zapíše cache indexu z polí v paměti, pokud soubor na disku odpovídá datům v paměti."""
+        info = self.saver.written
+        if self.workout_store is None or info is None:
+            return
+        try:
+            st = self.path.stat()
+            if st.st_size != info["size"] or st.st_mtime_ns != info["mtime_ns"]:
+                return
+            # Nezkompaktovaný žurnál -> JSON sám data v paměti nepopisuje
+            if self.journal.path.exists() and self.journal.path.stat().st_size:
+                return
+            self.index_cache.write(info, self.workout_store)
+        except Exception as e:
+            print(f"Chyba při zápisu cache indexu: {e}")
+
+    def record_change(self, data, path):
+        """Zapíše do žurnálu aktuální hodnotu na cestě v data (nebo její smazání)."""
+        node = data
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                op = {"op": "del", "path": list(path)}
+                break
+            node = node[key]
+        else:
+            op = {"op": "set", "path": list(path), "value": node}
+        self._append(data, op)
+
+    def record_list_item(self, data, path, item_id):
+        """Zapíše do žurnálu vložení/úpravu/smazání položky seznamu (podle "id")."""
+        node = data
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        item = None
+        if isinstance(node, list):
+            item = next((e for e in node if isinstance(e, dict) and e.get("id") == item_id), None)
+        if item is not None:
+            op = {"op": "put_item", "path": list(path), "value": item}
+        else:
+            op = {"op": "del_item", "path": list(path), "id": item_id}
+        self._append(data, op)
+
+    def _append(self, data, op):
+        if op["path"][:1] == ["workouts"]:
+            self.loaded_source = None
+        try:
+            self.journal.append(op)
+        except Exception as e:
+            # Žurnál nejde zapsat -> bezpečný fallback na plný zápis
+            print(f"Chyba při zápisu do žurnálu: {e}")
+            self.save(data)
+            return
+        if self.journal.pending >= self.JOURNAL_COMPACT_EVERY:
+            self.save(data)
+
+    def flush(self):
+        return self.saver.flush()
+
+    def backup_files(self):
+        """Soubory, které tvoří uložená data (pro BackupStore)."""
+        return [self.path, self.journal.path]
+
+    def load_copy(self, directory):
+        """Načte data ze souborů obnovených ze zálohy do složky `directory`."""
+        copy = JsonStorage(Path(directory) / self.path.name)
+        try:
+            return copy.load()
+        finally:
+            copy.close()
+
+    def close(self):
+        self.saver.stop()
+        self._write_index_cache()
+
+    def create_workout_index(self):
+        """Index pro součty přes období – sloupcové pole v paměti."""
+        return WorkoutStore()
+
+
+class ShardedJsonStorage(JsonStorage):
+    """
+    Data rozdělená po rocích ve složce (FITNESS_TRACKER_STORAGE=shards).
+
+    index.json drží zbytek dokumentu (exercises, app_state, body_metrics, ...)
+    a seznam roků se souhrny (dny, součty a počty záznamů po cvičeních),
+    year-YYYY.json pak workouts a year_settings jednoho roku. Aktuální rok
+    se načte hned, starší až při přístupu (YearPartitionedDict). Drobné změny
+    jdou jako u JSON do žurnálu; snapshot přepíše jen roky, jejichž obsah
+    se změnil, a nenačtené roky vůbec nečte ani nepřepisuje.
+    """
+
+    PARTITIONED = ("workouts", "year_settings")
+    FORMAT = 1
+
+    def __init__(self, directory, json_source=None):
+        import threading
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.json_source = Path(json_source) if json_source else None
+        super().__init__(self.directory / "index.json")
+        self.saver.snapshot = self._snapshot
+        self.saver.merge = self._merge_snapshots
+        self.saver.writer = self._write_snapshot
+        self._lock = threading.Lock()
+        self._dirty = set()    # roky (str), "index" nebo "*" (vše načtené) čekající na zápis
+        self._written = {}     # název souboru -> hash naposledy zapsaného/načteného obsahu
+        self._on_disk = set()  # roky, které mají shard na disku
+        self.summaries = {}    # rok -> souhrn z indexu
+
+    def shard_path(self, year):
+        return self.directory / f"year-{year}.json"
+
+    def load(self):
+        """Načte index a aktuální rok (+ žurnál); None pokud data neexistují."""
+        if not self.path.exists():
+            # První spuštění: převezmi jednosouborový JSON (jako SqliteStorage)
+            if self.json_source is None or not self.json_source.exists():
+                return None
+            source = JsonStorage(self.json_source)
+            try:
+                data = source.load()
+            finally:
+                source.close()
+            self.save(data)
+            print(f"Data rozdělena po rocích z {self.json_source.name}")
+            return data
+
+        raw = self.path.read_bytes()
+        index = json.loads(raw)
+        self._written[self.path.name] = WorkoutIndexCache.digest(raw)
+        self.summaries = dict(index.get("years") or {})
+        self._on_disk = set(self.summaries)
+
+        data = dict(index.get("document") or {})
+        for name in self.PARTITIONED:
+            data[name] = YearPartitionedDict(self._load_year, self._on_disk, self.summaries)
+        self._partitions = [data[name] for name in self.PARTITIONED]
+        self._load_year(str(datetime.now().year))
+
+        if self._replay(data):
+            # Přehrané změny se zapíšou při nejbližším uložení
+            self._mark_dirty("*")
+        return data
+
+    def _load_year(self, year):
+        """Načte shard roku do všech rozdělených slovníků (GUI vlákno)."""
+        if not any(year in partition.pending for partition in self._partitions):
+            return
+        shard = {}
+        path = self.shard_path(year)
+        if path.exists():
+            try:
+                raw = path.read_bytes()
+                shard = json.loads(raw)
+                self._written[path.name] = WorkoutIndexCache.digest(raw)
+            except Exception as e:
+                print(f"Chyba při načítání roku {year}: {e}")
+                shard = {}
+        for name, partition in zip(self.PARTITIONED, self._partitions):
+            if year in partition.pending:
+                partition.absorb(year, shard.get(name) or {})
+
+    # ---------- zápis ----------
+    def _mark_dirty(self, key):
+        with self._lock:
+            self._dirty.add(key)
+
+    def save(self, data):
+        """Plné uložení: projdou se všechny načtené roky, zapíšou se jen změněné."""
+        self._mark_dirty("*")
+        super().save(data)
+
+    def _append(self, data, op):
+        path = op.get("path") or []
+        if path[:1] and path[0] in self.PARTITIONED:
+            self._mark_dirty(YearPartitionedDict.year_of(path[1]) if len(path) >= 2 else "*")
+        else:
+            self._mark_dirty("index")
+        super()._append(data, op)
+
+    def restore_workout_index(self, store):
+        # Index se staví jen z načtených roků, binární cache se nepoužívá
+        return False
+
+    def backup_files(self):
+        return [self.path, self.journal.path] + sorted(self.directory.glob("year-*.json"))
+
+    def load_copy(self, directory):
+        copy = ShardedJsonStorage(directory)
+        try:
+            data = copy.load()
+            # Obnovená data celá do paměti (bez odkazu na dočasnou složku)
+            for name in self.PARTITIONED:
+                part = (data or {}).get(name)
+                if isinstance(part, YearPartitionedDict):
+                    part.load_all()
+                    data[name] = dict(part)
+            return data
+        finally:
+            copy.close()
+
+    def _group_by_year(self, data):
+        groups, pending = {}, set()
+        for name in self.PARTITIONED:
+            mapping = data.get(name) or {}
+            if isinstance(mapping, YearPartitionedDict):
+                pending |= mapping.pending
+            for key, value in YearPartitionedDict.loaded_items(mapping):
+                groups.setdefault(YearPartitionedDict.year_of(key), {n: {} for n in self.PARTITIONED})[name][key] = value
+        return groups, pending
+
+    @staticmethod
+    def _summary(shard):
+        totals, counts = {}, {}
+        for day in shard["workouts"].values():
+            for exercise_id, value, count in WorkoutStore.day_sums(day):
+                totals[exercise_id] = totals.get(exercise_id, 0) + value
+                counts[exercise_id] = counts.get(exercise_id, 0) + count
+        return {"days": len(shard["workouts"]), "totals": totals, "records": counts}
+
+    def _write_file(self, path, text):
+        import os
+
+        raw = text.encode("utf-8")
+        digest = WorkoutIndexCache.digest(raw)
+        if self._written.get(path.name) == digest:
+            return False
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._written[path.name] = digest
+        return True
+
+    def _snapshot(self, data):
+        """GUI vlákno: snapshot změněných roků a indexu (kompaktní JSON) pro zapisovač."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        groups, pending = self._group_by_year(data)
+        document = {k: v for k, v in data.items() if k not in self.PARTITIONED}
+        return {
+            "shards": {
+                year: json.dumps(groups[year], ensure_ascii=False)
+                for year in groups if "*" in dirty or year in dirty or year not in self.summaries
+            },
+            "years": set(groups),
+            "pending": set(pending),
+            "document": json.dumps(document, ensure_ascii=False),
+        }
+
+    @staticmethod
+    def _merge_snapshots(previous, snapshot):
+        # Nezapsané roky staršího snapshotu se zapíšou s novějším (pokud rok mezitím nezmizel)
+        shards = {year: text for year, text in previous["shards"].items() if year in snapshot["years"]}
+        shards.update(snapshot["shards"])
+        return dict(snapshot, shards=shards)
+
+    def _write_snapshot(self, snapshot):
+        """Vlákno zapisovače: zapíše změněné roky a index."""
+        try:
+            summaries = {}
+            for year, text in snapshot["shards"].items():
+                shard = json.loads(text)
+                summaries[year] = self._summary(shard)
+                self._write_file(self.shard_path(year), json.dumps(shard, ensure_ascii=False, indent=2))
+            # Rok bez dnů i nastavení (smazaný) -> pryč i jeho shard
+            for year in self._on_disk - snapshot["years"] - snapshot["pending"]:
+                try:
+                    self.shard_path(year).unlink()
+                except FileNotFoundError:
+                    pass
+                self._written.pop(self.shard_path(year).name, None)
+
+            self._on_disk = snapshot["years"] | snapshot["pending"]
+            # Nový slovník (ne úprava na místě) – GUI vlákno čte souhrny nenačtených roků
+            self.summaries = {
+                year: summaries[year] if year in summaries else self.summaries[year]
+                for year in sorted(self._on_disk) if year in summaries or year in self.summaries
+            }
+            index = {"format": self.FORMAT, "document": json.loads(snapshot["document"]), "years": self.summaries}
+            self._write_file(self.path, json.dumps(index, ensure_ascii=False, indent=2))
+        except Exception:
+            with self._lock:
+                self._dirty |= set(snapshot["shards"]) | {"index"}
+            raise
+
+
+class SqliteStorage:
+    """
+    Volitelné úložiště v SQLite (fitness_data.db).
+
+    Záznamy a měření váhy jsou v indexovaných tabulkách, cvičení a nastavení
+    roků po řádcích, zbytek dokumentu (app_state, výška, verze…) v tabulce
+    meta jako JSON. Aplikace dál pracuje se stejným slovníkem self.data;
+    změny se zapisují cíleně podle cesty, součty přes období jsou SQL agregace.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workouts (
+            date TEXT NOT NULL,
+            exercise_id TEXT NOT NULL,
+            shape TEXT NOT NULL DEFAULT 'list',
+            id TEXT,
+            value,
+            timestamp TEXT,
+            note TEXT,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_workouts_exercise_date ON workouts (exercise_id, date);
+        CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts (date);
+        CREATE TABLE IF NOT EXISTS weights (
+            id TEXT,
+            timestamp TEXT,
+            date TEXT,
+            value,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_weights_timestamp ON weights (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_weights_id ON weights (id);
+        CREATE TABLE IF NOT EXISTS exercises (
+            id TEXT PRIMARY KEY,
+            position INTEGER,
+            config TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS year_settings (
+            year TEXT PRIMARY KEY,
+            settings TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            position INTEGER,
+            value TEXT
+        );
+    """
+
+    _RECORD_KEYS = ("id", "value", "timestamp", "note")
+    _WEIGHT_KEYS = ("id", "timestamp", "date", "value")
+
+    def __init__(self, path, json_source=None):
+        import sqlite3
+
+        self.path = Path(path)
+        self.json_source = Path(json_source) if json_source else None
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+    # ---------- načtení ----------
+    def load(self):
+        """Sestaví slovník dat z tabulek; prázdnou DB jednorázově naplní z JSON."""
+        if self.conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0:
+            if self.json_source is None or not self.json_source.exists():
+                return None
+            source = JsonStorage(self.json_source)
+            try:
+                data = source.load()
+            finally:
+                source.close()
+            self.save(data)
+            print(f"SQLite: data převzata z {self.json_source.name}")
+            return data
+
+        data = {}
+        for key, _pos, value in self.conn.execute("SELECT key, position, value FROM meta ORDER BY position"):
+            data[key] = json.loads(value) if value is not None else None
+
+        data["exercises"] = {
+            ex_id: json.loads(config)
+            for ex_id, config in self.conn.execute("SELECT id, config FROM exercises ORDER BY position")
+        }
+        data["year_settings"] = {
+            year: json.loads(settings)
+            for year, settings in self.conn.execute("SELECT year, settings FROM year_settings ORDER BY year")
+        }
+
+        workouts = {}
+        rows = self.conn.execute(
+            "SELECT date, exercise_id, shape, id, value, timestamp, note, extra FROM workouts ORDER BY date, rowid"
+        )
+        for date_str, ex_id, shape, rec_id, value, ts, note, extra in rows:
+            day = workouts.setdefault(date_str, {})
+            if shape == "day":
+                continue
+            if shape == "scalar":
+                day[ex_id] = value
+                continue
+            record = self._unpack(self._RECORD_KEYS, (rec_id, value, ts, note), extra)
+            if shape == "dict":
+                day[ex_id] = record
+            else:
+                day.setdefault(ex_id, []).append(record)
+        data["workouts"] = workouts
+
+        body = data.get("body_metrics")
+        if isinstance(body, dict):
+            body["weight_history"] = [
+                self._unpack(self._WEIGHT_KEYS, row[:4], row[4])
+                for row in self.conn.execute("SELECT id, timestamp, date, value, extra FROM weights ORDER BY rowid")
+            ]
+        return data
+
+    @staticmethod
+    def _unpack(keys, values, extra):
+        record = {k: v for k, v in zip(keys, values) if v is not None}
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    @staticmethod
+    def _pack(keys, record):
+        extra = {k: v for k, v in record.items() if k not in keys}
+        return [record.get(k) for k in keys] + [json.dumps(extra, ensure_ascii=False) if extra else None]
+
+    # ---------- zápis ----------
+    def save(self, data):
+        """Plná synchronizace všech tabulek v jedné transakci."""
+        with self.conn:
+            for table in ("workouts", "weights", "exercises", "year_settings", "meta"):
+                self.conn.execute(f"DELETE FROM {table}")
+            for pos, key in enumerate(data.keys()):
+                if key in ("workouts", "exercises", "year_settings"):
+                    continue
+                self._write_meta(data, key, pos)
+            for pos, (ex_id, config) in enumerate((data.get("exercises") or {}).items()):
+                self.conn.execute(
+                    "INSERT INTO exercises (id, position, config) VALUES (?, ?, ?)",
+                    (ex_id, pos, json.dumps(config, ensure_ascii=False)),
+                )
+            for year, settings in (data.get("year_settings") or {}).items():
+                self.conn.execute(
+                    "INSERT INTO year_settings (year, settings) VALUES (?, ?)",
+                    (str(year), json.dumps(settings, ensure_ascii=False)),
+                )
+            for date_str in (data.get("workouts") or {}):
+                self._insert_day(data, date_str)
+            self._write_weights(data)
+
+    def _write_meta(self, data, key, pos=None):
+        value = data.get(key)
+        if key == "body_metrics" and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k != "weight_history"}
+        if pos is None:
+            row = self.conn.execute("SELECT position FROM meta WHERE key = ?", (key,)).fetchone()
+            pos = row[0] if row else len(data)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, position, value) VALUES (?, ?, ?)",
+            (key, pos, json.dumps(value, ensure_ascii=False)),
+        )
+
+    def _insert_day(self, data, date_str):
+        day = (data.get("workouts") or {}).get(date_str)
+        if day is None:
+            return
+        if not day:
+            # Prázdný den (bez cvičení) zachovat jako značku
+            self.conn.execute("INSERT INTO workouts (date, exercise_id, shape) VALUES (?, '', 'day')", (date_str,))
+        for ex_id in day:
+            self._insert_records(data, date_str, ex_id)
+
+    def _insert_records(self, data, date_str, ex_id):
+        records = (data.get("workouts") or {}).get(date_str, {}).get(ex_id)
+        if isinstance(records, dict):
+            rows = [("dict", *self._pack(self._RECORD_KEYS, records))]
+        elif isinstance(records, list):
+            rows = [("list", *self._pack(self._RECORD_KEYS, r)) for r in records if isinstance(r, dict)]
+        elif records is not None:
+            rows = [("scalar", None, records, None, None, None)]
+        else:
+            rows = []
+        self.conn.executemany(
+            "INSERT INTO workouts (date, exercise_id, shape, id, value, timestamp, note, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(date_str, ex_id, *row) for row in rows],
+        )
+
+    def _write_weights(self, data):
+        history = (data.get("body_metrics") or {}).get("weight_history") or []
+        self.conn.execute("DELETE FROM weights")
+        self.conn.executemany(
+            "INSERT INTO weights (id, timestamp, date, value, extra) VALUES (?, ?, ?, ?, ?)",
+            [self._pack(self._WEIGHT_KEYS, e) for e in history if isinstance(e, dict)],
+        )
+
+    def record_change(self, data, path):
+        """Cílený zápis změny na cestě v data."""
+        path = list(path)
+        head = path[0] if path else None
+        with self.conn:
+            if head == "workouts" and len(path) >= 2:
+                date_str = path[1]
+                if len(path) >= 3 and (data.get("workouts") or {}).get(date_str):
+                    self.conn.execute(
+                        "DELETE FROM workouts WHERE date = ? AND (exercise_id = ? OR shape = 'day')", (date_str, path[2])
+                    )
+                    self._insert_records(data, date_str, path[2])
+                else:
+                    self.conn.execute("DELETE FROM workouts WHERE date = ?", (date_str,))
+                    self._insert_day(data, date_str)
+            elif head in ("exercises", "year_settings") and len(path) >= 2:
+                table, key_col, val_col = (
+                    ("exercises", "id", "config") if head == "exercises" else ("year_settings", "year", "settings")
+                )
+                value = (data.get(head) or {}).get(path[1])
+                if value is None:
+                    self.conn.execute(f"DELETE FROM {table} WHERE {key_col} = ?", (path[1],))
+                elif head == "exercises":
+                    row = self.conn.execute("SELECT position FROM exercises WHERE id = ?", (path[1],)).fetchone()
+                    pos = row[0] if row else list(data["exercises"]).index(path[1])
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO exercises (id, position, config) VALUES (?, ?, ?)",
+                        (path[1], pos, json.dumps(value, ensure_ascii=False)),
+                    )
+                else:
+                    self.conn.execute(
+                        f"INSERT OR REPLACE INTO {table} ({key_col}, {val_col}) VALUES (?, ?)",
+                        (str(path[1]), json.dumps(value, ensure_ascii=False)),
+                    )
+            elif head == "body_metrics" and len(path) >= 2 and path[1] == "weight_history":
+                self._write_weights(data)
+            elif head in ("workouts", "exercises", "year_settings") or head is None:
+                # Změna celé sekce -> plná synchronizace
+                self.save(data)
+            else:
+                self._write_meta(data, head)
+
+    def record_list_item(self, data, path, item_id):
+        """Vložení/úprava/smazání jednoho měření váhy podle id."""
+        if list(path) != ["body_metrics", "weight_history"]:
+            self.record_change(data, path)
+            return
+        history = (data.get("body_metrics") or {}).get("weight_history") or []
+        entry = next((e for e in history if isinstance(e, dict) and e.get("id") == item_id), None)
+        with self.conn:
+            if entry is None:
+                self.conn.execute("DELETE FROM weights WHERE id = ?", (item_id,))
+                return
+            packed = self._pack(self._WEIGHT_KEYS, entry)
+            cur = self.conn.execute(
+                "UPDATE weights SET timestamp = ?, date = ?, value = ?, extra = ? WHERE id = ?",
+                (*packed[1:], item_id),
+            )
+            if cur.rowcount == 0:
+                self.conn.execute("INSERT INTO weights (id, timestamp, date, value, extra) VALUES (?, ?, ?, ?, ?)", packed)
+
+    def flush(self):
+        self.conn.commit()
+        return True
+
+    def backup_files(self):
+        return [self.path]
+
+    def load_copy(self, directory):
+        copy = SqliteStorage(Path(directory) / self.path.name)
+        try:
+            return copy.load()
+        finally:
+            copy.close()
+
+    def close(self):
+        try:
+            self.conn.commit()
+            self.conn.close()
+        except Exception as e:
+            print(f"Chyba při zavírání SQLite: {e}")
+
+    def create_workout_index(self):
+        """Index pro součty přes období – SQL agregace nad tabulkou workouts."""
+        return SqliteWorkoutIndex(self.conn)
+
+    def restore_workout_index(self, store):
+        # Index čte přímo z databáze, cache není potřeba
+        return False
+
+
+class SqliteWorkoutIndex:
+    """Stejné rozhraní jako WorkoutStore, ale dotazy jdou přímo do SQLite (index exercise_id, date)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def rebuild(self, workouts):
+        # Zdrojem pravdy je databáze, není co přestavovat
+        pass
+
+    def refresh_day(self, workouts, date_str, exercise_id):
+        # Změnu už zapsal SqliteStorage.record_change
+        pass
+
+    def exercise_ids(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT exercise_id FROM workouts WHERE shape IN ('list', 'dict')")]
+
+    @staticmethod
+    def _d(date):
+        return date.strftime("%Y-%m-%d")
+
+    def _grouped(self, exercise_id, from_date, to_date):
+        return self.conn.execute(
+            "SELECT date, SUM(value) FROM workouts WHERE exercise_id = ? AND shape IN ('list', 'dict') AND date BETWEEN ? AND ? "
+            "GROUP BY date ORDER BY date",
+            (exercise_id, self._d(from_date), self._d(to_date)),
+        ).fetchall()
+
+    def range_sum(self, exercise_id, from_date, to_date):
+        row = self.conn.execute(
+            "SELECT SUM(value) FROM workouts WHERE exercise_id = ? AND shape IN ('list', 'dict') AND date BETWEEN ? AND ?",
+            (exercise_id, self._d(from_date), self._d(to_date)),
+        ).fetchone()
+        return WorkoutStore.as_number(row[0] or 0)
+
+    def daily_totals(self, exercise_id, from_date, to_date):
+        import numpy as np
+
+        days = (to_date - from_date).days + 1
+        totals = np.zeros(max(days, 0), dtype=np.float64)
+        base = from_date.toordinal()
+        for date_str, total in self._grouped(exercise_id, from_date, to_date):
+            totals[datetime.strptime(date_str, "%Y-%m-%d").date().toordinal() - base] = total or 0
+        return totals
+
+    def day_total(self, exercise_id, date):
+        return self.range_sum(exercise_id, date, date)
+
+    def day_count(self, exercise_id, date):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM workouts WHERE exercise_id = ? AND shape IN ('list', 'dict') AND date = ?", (exercise_id, self._d(date))
+        ).fetchone()[0]
+
+    def day_totals_by_day(self, exercise_id, from_date, to_date):
+        import numpy as np
+
+        rows = self._grouped(exercise_id, from_date, to_date)
+        ordinals = np.array([datetime.strptime(d, "%Y-%m-%d").date().toordinal() for d, _t in rows], dtype=np.int64)
+        totals = np.array([t or 0 for _d, t in rows], dtype=np.float64)
+        return ordinals, totals
+
+    def last_ordinal(self, exercise_id=None, up_to=None):
+        sql, args = "SELECT MAX(date) FROM workouts WHERE shape IN ('list', 'dict')", []
+        if exercise_id is not None:
+            sql += " AND exercise_id = ?"
+            args.append(exercise_id)
+        if up_to is not None:
+            sql += " AND date <= ?"
+            args.append(self._d(up_to))
+        row = self.conn.execute(sql, args).fetchone()
+        if not row or not row[0]:
+            return None
+        return datetime.strptime(row[0], "%Y-%m-%d").date().toordinal()
+
+
+class WorkoutStore:
+    """
+    Sloupcové úložiště záznamů postavené nad data["workouts"].
+
+    Pro každé cvičení drží pole seřazená podle (den, čas):
+    ordinals (date.toordinal()), values, timestamps (epoch s, NaN = neznámý)
+    a prefixové součty hodnot. Součty přes období jsou pak řezy polí
+    (searchsorted) místo procházení vnořených slovníků po dnech.
+    """
+
+    def __init__(self):
+        self.codes = {}     # exercise_id -> číselný kód
+        self.columns = {}   # exercise_id -> dict polí
+        # data["workouts"] rozdělená po rocích (ShardedJsonStorage): dotaz na období
+        # si nenačtené roky dotáhne, jejich záznamy se do polí přidají (add_days)
+        self.partitions = None
+
+    @staticmethod
+    def as_number(value):
+        """Celé číslo, pokud je hodnota celá (kvůli zobrazení „150“ místo „150.0“)."""
+        value = float(value)
+        return int(round(value)) if abs(value - round(value)) < 1e-9 else value
+
+    @staticmethod
+    def _record_rows(records):
+        """Normalizuje list/dict tvar záznamů na [(hodnota, timestamp_str)]."""
+        if isinstance(records, list):
+            return [(float(r.get("value", 0) or 0), r.get("timestamp")) for r in records if isinstance(r, dict)]
+        elif isinstance(records, dict):
+            return [(float(records.get("value", 0) or 0), records.get("timestamp"))]
+        return []
+
+    @classmethod
+    def day_sums(cls, day):
+        """[(exercise_id, součet hodnot, počet záznamů)] jednoho dne z data["workouts"]."""
+        if not isinstance(day, dict):
+            return []
+        sums = []
+        for exercise_id, records in day.items():
+            rows = cls._record_rows(records)
+            sums.append((exercise_id, cls.as_number(sum(v for v, _t in rows)), len(rows)))
+        return sums
+
+    @staticmethod
+    def _epoch(ts):
+        try:
+            return datetime.fromisoformat(str(ts)).timestamp()
+        except Exception:
+            return float("nan")
+
+    def _make_column(self, exercise_id, ordinals, values, timestamps):
+        import numpy as np
+
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        order = np.lexsort((timestamps, ordinals))
+        if exercise_id not in self.codes:
+            self.codes[exercise_id] = len(self.codes)
+        column = {
+            "code": self.codes[exercise_id],
+            "ordinals": ordinals[order],
+            "values": values[order],
+            "timestamps": timestamps[order],
+        }
+        column["cum"] = np.concatenate(([0.0], np.cumsum(column["values"])))
+        self.columns[exercise_id] = column
+        return column
+
+    def _collect_rows(self, items):
+        rows = {}
+        for date_str, day in items:
+            try:
+                ordinal = datetime.strptime(str(date_str)[:10], "%Y-%m-%d").date().toordinal()
+            except Exception:
+                continue
+            if not isinstance(day, dict):
+                continue
+            for exercise_id, records in day.items():
+                target = rows.setdefault(exercise_id, ([], [], []))
+                for value, ts in self._record_rows(records):
+                    target[0].append(ordinal)
+                    target[1].append(value)
+                    target[2].append(self._epoch(ts))
+        return rows
+
+    def rebuild(self, workouts):
+        """Postaví všechna pole znovu z data["workouts"] (u rozdělených dat z načtených roků)."""
+        rows = self._collect_rows(YearPartitionedDict.loaded_items(workouts))
+        self.columns = {}
+        for exercise_id, (ordinals, values, timestamps) in rows.items():
+            self._make_column(exercise_id, ordinals, values, timestamps)
+
+        self.partitions = workouts if isinstance(workouts, YearPartitionedDict) else None
+        YearPartitionedDict.listen(self.partitions, self.add_days)
+
+    def add_days(self, _year, days):
+        """Přidá záznamy dnů, které v polích ještě nejsou (načtený rok)."""
+        import numpy as np
+
+        for exercise_id, (ordinals, values, timestamps) in self._collect_rows(days.items()).items():
+            column = self.columns.get(exercise_id)
+            if column is not None:
+                ordinals = np.concatenate((column["ordinals"], ordinals))
+                values = np.concatenate((column["values"], values))
+                timestamps = np.concatenate((column["timestamps"], timestamps))
+            self._make_column(exercise_id, ordinals, values, timestamps)
+
+    def _load_years(self, first_year, last_year):
+        if self.partitions is not None:
+            YearPartitionedDict.load_range(self.partitions, first_year, last_year)
+
+    def restore(self, columns):
+        """Převezme hotová pole [(exercise_id, {ordinals, values, timestamps, cum})] místo rebuild()."""
+        self.columns = {}
+        for exercise_id, arrays in columns:
+            if exercise_id not in self.codes:
+                self.codes[exercise_id] = len(self.codes)
+            column = dict(arrays)
+            column["code"] = self.codes[exercise_id]
+            self.columns[exercise_id] = column
+
+    def refresh_day(self, workouts, date_str, exercise_id):
+        """Nahradí záznamy jednoho dne a cvičení aktuálním stavem z data["workouts"]."""
+        import numpy as np
+
+        ordinal = datetime.strptime(date_str, "%Y-%m-%d").date().toordinal()
+        records = (workouts or {}).get(date_str, {}).get(exercise_id)
+        rows = self._record_rows(records)
+
+        column = self.columns.get(exercise_id)
+        if column is None:
+            if rows:
+                self._make_column(exercise_id, [ordinal] * len(rows),
+                                  [v for v, _t in rows], [self._epoch(t) for _v, t in rows])
+            return
+
+        i, j = np.searchsorted(column["ordinals"], [ordinal, ordinal + 1])
+        new_ts = np.array([self._epoch(t) for _v, t in rows], dtype=np.float64)
+        order = np.argsort(new_ts, kind="stable")
+        column["ordinals"] = np.concatenate((column["ordinals"][:i], np.full(len(rows), ordinal, dtype=np.int64), column["ordinals"][j:]))
+        column["values"] = np.concatenate((column["values"][:i], np.array([v for v, _t in rows], dtype=np.float64)[order], column["values"][j:]))
+        column["timestamps"] = np.concatenate((column["timestamps"][:i], new_ts[order], column["timestamps"][j:]))
+        column["cum"] = np.concatenate(([0.0], np.cumsum(column["values"])))
+
+    def exercise_ids(self):
+        """Cvičení, která mají aspoň jeden záznam (i v nenačtených rocích)."""
+        ids = list(self.columns)
+        if self.partitions is not None:
+            for year in self.partitions.pending:
+                for exercise_id in (self.partitions.summaries.get(year) or {}).get("records", {}):
+                    if exercise_id not in ids:
+                        ids.append(exercise_id)
+        return ids
+
+    def _bounds(self, exercise_id, from_date, to_date):
+        import numpy as np
+
+        if to_date < from_date:
+            return None, 0, 0
+        self._load_years(from_date.year, to_date.year)
+        column = self.columns.get(exercise_id)
+        if column is None:
+            return None, 0, 0
+        i, j = np.searchsorted(column["ordinals"], [from_date.toordinal(), to_date.toordinal() + 1])
+        return column, int(i), int(j)
+
+    def range_sum(self, exercise_id, from_date, to_date):
+        """Součet hodnot za from_date..to_date (včetně)."""
+        column, i, j = self._bounds(exercise_id, from_date, to_date)
+        if column is None:
+            return 0
+        return self.as_number(column["cum"][j] - column["cum"][i])
+
+    def daily_totals(self, exercise_id, from_date, to_date):
+        """Pole denních součtů (float64) pro každý den from_date..to_date."""
+        import numpy as np
+
+        days = (to_date - from_date).days + 1
+        if days <= 0:
+            return np.zeros(0, dtype=np.float64)
+        column, i, j = self._bounds(exercise_id, from_date, to_date)
+        if column is None or i == j:
+            return np.zeros(days, dtype=np.float64)
+        return np.bincount(
+            column["ordinals"][i:j] - from_date.toordinal(),
+            weights=column["values"][i:j],
+            minlength=days,
+        )
+
+    def day_total(self, exercise_id, date):
+        """Součet hodnot jednoho dne."""
+        return self.range_sum(exercise_id, date, date)
+
+    def day_count(self, exercise_id, date):
+        """Počet záznamů jednoho dne."""
+        column, i, j = self._bounds(exercise_id, date, date)
+        return j - i if column is not None else 0
+
+    def day_totals_by_day(self, exercise_id, from_date, to_date):
+        """(ordinals, součty) pouze pro dny se záznamem v období."""
+        import numpy as np
+
+        column, i, j = self._bounds(exercise_id, from_date, to_date)
+        if column is None or i == j:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        ordinals = column["ordinals"][i:j]
+        starts = np.flatnonzero(np.r_[True, ordinals[1:] != ordinals[:-1]])
+        return ordinals[starts], np.add.reduceat(column["values"][i:j], starts)
+
+    def last_ordinal(self, exercise_id=None, up_to=None):
+        """Poslední den se záznamem (volitelně do data up_to), jinak None."""
+        best = self._last_loaded_ordinal(exercise_id, up_to)
+        # Pozdější záznam může být jen v nenačteném roce mezi nalezeným a up_to
+        first_year = datetime.fromordinal(best).year if best is not None else 0
+        last_year = up_to.year if up_to is not None else 9999
+        if any(first_year <= y <= last_year for y in YearPartitionedDict.pending_years(self.partitions)):
+            self._load_years(first_year, last_year)
+            best = self._last_loaded_ordinal(exercise_id, up_to)
+        return best
+
+    def _last_loaded_ordinal(self, exercise_id, up_to):
+        import numpy as np
+
+        best = None
+        ids = [exercise_id] if exercise_id is not None else list(self.columns)
+        for ex_id in ids:
+            column = self.columns.get(ex_id)
+            if column is None or not len(column["ordinals"]):
+                continue
+            ordinals = column["ordinals"]
+            if up_to is not None:
+                k = int(np.searchsorted(ordinals, up_to.toordinal() + 1))
+                if k == 0:
+                    continue
+                last = int(ordinals[k - 1])
+            else:
+                last = int(ordinals[-1])
+            best = last if best is None else max(best, last)
+        return best
+
+
+class WorkoutIndexCache:
+    """
+    Binární cache sloupcového indexu (WorkoutStore) vedle fitness_data.json.
+
+    Soubor = hlavička (velikost, mtime a blake2b zdrojového JSON + rozložení
+    polí) a za ní surová pole ordinals/values/timestamps/cum všech cvičení.
+    Když hlavička odpovídá načtenému JSON, pole se při startu jen namapují
+    (np.memmap) místo stavění z data["workouts"]. Zapisuje se při zavření
+    z polí v paměti k poslednímu zapsanému snapshotu; JSON zůstává jediným
+    zdrojem pravdy, neplatná nebo chybějící cache jen znamená stavbu indexu.
+    """
+
+    MAGIC = b"FTWIDX01"
+    FORMAT = 1
+    FIELDS = (("ordinals", "<i8"), ("values", "<f8"), ("timestamps", "<f8"), ("cum", "<f8"))
+    ALIGN = 64
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @staticmethod
+    def digest(raw):
+        import hashlib
+
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    @classmethod
+    def source_info(cls, raw, mtime_ns):
+        """Identita zdrojového JSON: velikost, mtime a hash přečtených bajtů."""
+        return {"size": len(raw), "mtime_ns": int(mtime_ns), "blake2b": cls.digest(raw)}
+
+    def identify(self, raw, mtime_ns):
+        """Identita načteného JSON pro load(); hash se počítá, jen když cache sedí velikostí i mtime."""
+        header, _start = self.read_header()
+        source = (header or {}).get("source") or {}
+        if source.get("size") != len(raw) or source.get("mtime_ns") != int(mtime_ns):
+            return None
+        return self.source_info(raw, mtime_ns)
+
+    def _data_start(self, header_length):
+        return -(-(16 + header_length) // self.ALIGN) * self.ALIGN
+
+    def read_header(self):
+        """(hlavička, začátek polí) nebo (None, 0), pokud cache chybí nebo je cizí."""
+        try:
+            with open(self.path, "rb") as f:
+                head = f.read(16)
+                if len(head) < 16 or head[:8] != self.MAGIC:
+                    return None, 0
+                length = int.from_bytes(head[8:16], "little")
+                header = json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None, 0
+        if not isinstance(header, dict) or header.get("format") != self.FORMAT:
+            return None, 0
+        return header, self._data_start(length)
+
+    def load(self, info):
+        """Namapovaná pole pro WorkoutStore.restore(), pokud cache patří k JSON s identitou `info`; jinak None."""
+        import numpy as np
+
+        header, start = self.read_header()
+        if header is None or header.get("source") != info:
+            return None
+        try:
+            buf = np.memmap(self.path, dtype=np.uint8, mode="r")
+            columns = []
+            for entry in header["columns"]:
+                arrays = {}
+                for name, dtype in self.FIELDS:
+                    count = entry["count"] + (1 if name == "cum" else 0)
+                    offset = start + entry[name]
+                    arrays[name] = buf[offset:offset + count * 8].view(dtype)
+                    if len(arrays[name]) != count:
+                        return None
+                columns.append((entry["id"], arrays))
+        except Exception as e:
+            print(f"Chyba při čtení cache indexu: {e}")
+            return None
+        return columns
+
+    def write(self, info, store):
+        """Zapíše pole ze store s hlavičkou `info` (atomicky přes dočasný soubor)."""
+        import os
+        import numpy as np
+
+        entries, blocks, offset = [], [], 0
+        for exercise_id, column in store.columns.items():
+            entry = {"id": exercise_id, "count": int(len(column["ordinals"]))}
+            for name, dtype in self.FIELDS:
+                block = np.ascontiguousarray(column[name], dtype=dtype)
+                entry[name] = offset
+                offset += block.nbytes
+                blocks.append(block)
+            entries.append(entry)
+
+        header = json.dumps({"format": self.FORMAT, "source": info, "columns": entries},
+                            ensure_ascii=False).encode("utf-8")
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self.MAGIC + len(header).to_bytes(8, "little") + header)
+            f.write(b"\0" * (self._data_start(len(header)) - 16 - len(header)))
+            for block in blocks:
+                f.write(block.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class BackupStore:
+    """
+    Inkrementální zálohy souborů dat ve složce backup/.
+
+    Soubor se dělí na bloky podle obsahu (hranice na řádcích, jejichž hash
+    vyjde na masku), takže změna jednoho záznamu změní jen blok nebo dva.
+    Bloky leží komprimované (xz) v objects/ pod svým hashem a sdílí se mezi
+    zálohami; záloha sama je jen manifest se seznamem bloků každého souboru
+    (snapshots/<čas>.json). Ve volajícím vlákně se čtou jen soubory změněné
+    od poslední zálohy, dělení, komprese, zápis a retence běží na pozadí.
+    """
+
+    FORMAT = 1
+    # Hranice bloku: řádek s crc32 & BOUNDARY_MASK == 0, blok v rozmezí MIN_CHUNK..MAX_CHUNK
+    MIN_CHUNK = 16 * 1024
+    MAX_CHUNK = 256 * 1024
+    BOUNDARY_MASK = 0x1FF
+    # Retence: posledních N záloh + nejnovější záloha z každé z posledních N hodin / dnů / týdnů,
+    # ve kterých nějaká vznikla
+    RETENTION = (("last", 10), ("hour", 24), ("day", 14), ("week", 8))
+
+    def __init__(self, directory):
+        import threading
+
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.snapshots_dir = self.directory / "snapshots"
+        self._cond = threading.Condition()
+        self._jobs = []
+        self._busy = False
+        self._stopping = False
+        self._thread = None
+        self._known = None  # hashe bloků na disku (načtou se líně ve vlákně)
+        self._last = None   # soubory poslední zálohy: název -> záznam z manifestu
+
+    @staticmethod
+    def digest(chunk):
+        import hashlib
+
+        return hashlib.blake2b(chunk, digest_size=20).hexdigest()
+
+    @classmethod
+    def split(cls, raw):
+        """Rozdělí bajty na bloky; hranice závisí jen na obsahu řádků, po vložení se znovu srovnají."""
+        import zlib
+
+        view = memoryview(raw)
+        chunks = []
+        start = pos = 0
+        size = len(raw)
+        while pos < size:
+            end = raw.find(b"\n", pos)
+            end = size if end < 0 else end + 1
+            if end - start > cls.MAX_CHUNK:
+                # Příliš dlouhý úsek bez vhodné hranice -> pevný řez
+                end = start + cls.MAX_CHUNK
+                chunks.append(raw[start:end])
+                start = pos = end
+                continue
+            line_start, pos = pos, end
+            if pos - start >= cls.MIN_CHUNK and not zlib.crc32(view[line_start:pos]) & cls.BOUNDARY_MASK:
+                chunks.append(raw[start:pos])
+                start = pos
+        if start < size:
+            chunks.append(raw[start:])
+        return chunks
+
+    @classmethod
+    def compress(cls, chunk):
+        import lzma
+
+        # Malý slovník stačí (blok je nejvýš MAX_CHUNK) a je řádově rychlejší než výchozí
+        filters = [{"id": lzma.FILTER_LZMA2, "preset": 6, "dict_size": cls.MAX_CHUNK}]
+        return lzma.compress(chunk, format=lzma.FORMAT_XZ, check=lzma.CHECK_NONE, filters=filters)
+
+    def object_path(self, digest):
+        return self.objects / digest[:2] / digest
+
+    # ---------- zálohování ----------
+    def backup(self, paths, reason=""):
+        """Zazálohuje soubory `paths` (chybějící přeskočí); zápis proběhne na pozadí.
+
+        Bajty se čtou hned, aby záloha odpovídala stavu v okamžiku volání
+        (např. před migrací). Soubor se stejnou velikostí a mtime jako
+        v poslední záloze se nečte, převezme se jeho seznam bloků.
+        """
+        import threading
+
+        created = datetime.now()
+        with self._cond:
+            last = self._last
+        files = []
+        for path in paths:
+            path = Path(path)
+            try:
+                st = path.stat()
+                entry = {"name": path.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                previous = (last or {}).get(path.name)
+                if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+                    entry["chunks"] = previous["chunks"]
+                else:
+                    entry["raw"] = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            files.append(entry)
+        if not files:
+            return
+        with self._cond:
+            self._jobs.append((created, reason, files))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="BackupStore", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._jobs:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                created, reason, files = self._jobs.pop(0)
+                self._busy = True
+            try:
+                if self._write_snapshot(created, reason, files):
+                    self.prune()
+            except Exception as e:
+                print(f"Záloha dat selhala: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _load_known(self):
+        import os
+
+        if self._known is None:
+            self._known = set()
+            if self.objects.exists():
+                for sub in os.scandir(self.objects):
+                    if sub.is_dir():
+                        self._known.update(e.name for e in os.scandir(sub.path) if not e.name.endswith(".tmp"))
+        return self._known
+
+    def _write_atomic(self, path, payload):
+        import os
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _write_snapshot(self, created, reason, files):
+        """Uloží nové bloky a manifest; False, pokud se od poslední zálohy nic nezměnilo."""
+        known = self._load_known()
+        if self._last is None:
+            latest = self.snapshots()
+            manifest = self.read_manifest(latest[-1]) if latest else None
+            self._last = {f["name"]: f for f in (manifest or {}).get("files", [])}
+
+        stored = 0
+        for entry in files:
+            raw = entry.pop("raw", None)
+            if raw is None:
+                continue
+            chunks = []
+            for chunk in self.split(raw):
+                digest = self.digest(chunk)
+                if digest not in known:
+                    self._write_atomic(self.object_path(digest), self.compress(chunk))
+                    known.add(digest)
+                    stored += 1
+                chunks.append(digest)
+            entry["chunks"] = chunks
+
+        current = {f["name"]: f for f in files}
+        unchanged = {n: f["chunks"] for n, f in current.items()} == {n: f["chunks"] for n, f in self._last.items()}
+        with self._cond:
+            self._last = current
+        if unchanged:
+            return False
+
+        snapshot_id = created.strftime("%Y%m%d-%H%M%S-%f")
+        manifest = {
+            "format": self.FORMAT,
+            "created": created.strftime("%Y-%m-%d %H:%M:%S"),
+            "reason": reason,
+            "files": files,
+        }
+        self._write_atomic(
+            self.snapshots_dir / f"{snapshot_id}.json",
+            json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        )
+        print(f"Záloha dat vytvořena: {snapshot_id} ({stored} nových bloků)")
+        return True
+
+    def flush(self, timeout=60.0):
+        """Počká na dokončení naplánovaných záloh."""
+        import time
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._jobs or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    break
+                self._cond.wait(remaining)
+            return not self._jobs and not self._busy
+
+    # ---------- seznam, obnova ----------
+    def snapshots(self):
+        """Id záloh od nejstarší (název souboru = čas, řadí se bez stat)."""
+        import os
+
+        try:
+            names = os.listdir(self.snapshots_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-5] for n in names if n.endswith(".json"))
+
+    def read_manifest(self, snapshot_id):
+        try:
+            with open(self.snapshots_dir / f"{snapshot_id}.json", "rb") as f:
+                manifest = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Chyba při čtení zálohy {snapshot_id}: {e}")
+            return None
+        if not isinstance(manifest, dict) or manifest.get("format") != self.FORMAT:
+            return None
+        return manifest
+
+    def restore(self, snapshot_id, directory):
+        """Složí soubory zálohy do složky `directory`; vrátí jejich cesty."""
+        import lzma
+
+        manifest = self.read_manifest(snapshot_id)
+        if manifest is None:
+            raise ValueError(f"Záloha {snapshot_id} neexistuje nebo je poškozená")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        restored = []
+        for entry in manifest["files"]:
+            target = directory / Path(entry["name"]).name
+            with open(target, "wb") as out:
+                for digest in entry["chunks"]:
+                    with open(self.object_path(digest), "rb") as f:
+                        chunk = lzma.decompress(f.read())
+                    if self.digest(chunk) != digest:
+                        raise ValueError(f"Poškozený blok zálohy {digest}")
+                    out.write(chunk)
+            restored.append(target)
+        return restored
+
+    # ---------- retence ----------
+    @staticmethod
+    def _bucket(kind, snapshot_id):
+        if kind == "last":
+            return snapshot_id
+        if kind == "hour":
+            return snapshot_id[:11]
+        if kind == "day":
+            return snapshot_id[:8]
+        return datetime.strptime(snapshot_id[:8], "%Y%m%d").isocalendar()[:2]
+
+    @classmethod
+    def retained(cls, snapshot_ids):
+        """Id záloh, které retence ponechá (vždy i nejnovější)."""
+        ordered = sorted(snapshot_ids, reverse=True)
+        keep = set(ordered[:1])
+        for kind, count in cls.RETENTION:
+            buckets = set()
+            for snapshot_id in ordered:
+                bucket = cls._bucket(kind, snapshot_id)
+                if bucket in buckets:
+                    continue
+                if len(buckets) >= count:
+                    break
+                buckets.add(bucket)
+                keep.add(snapshot_id)
+        return keep
+
+    def prune(self):
+        """Smaže zálohy mimo retenci a bloky, na které už žádná záloha neodkazuje."""
+        import os
+
+        snapshot_ids = self.snapshots()
+        keep = self.retained(snapshot_ids)
+        for snapshot_id in snapshot_ids:
+            if snapshot_id not in keep:
+                try:
+                    (self.snapshots_dir / f"{snapshot_id}.json").unlink()
+                except OSError:
+                    pass
+
+        referenced = set()
+        for snapshot_id in sorted(keep):
+            manifest = self.read_manifest(snapshot_id)
+            if manifest is None:
+                # Nečitelný manifest -> nevíme, co drží; bloky raději nemaž
+                return
+            for entry in manifest["files"]:
+                referenced.update(entry["chunks"])
+
+        known = self._load_known()
+        for digest in list(known - referenced):
+            try:
+                os.remove(self.object_path(digest))
+            except OSError:
+                pass
+            known.discard(digest)
+
+
+class WeightSeries:
+    """
+    Historie vážení (body_metrics.weight_history) seřazená podle času měření.
+
+    rebuild() seznam v datech jednou setřídí na místě a dál se drží seřazený;
+    vedle něj běží klíče (sekundy od 1.1.1970 v naivním čase, bez skoků letního
+    času) a rozparsované časy. Poslední měření je poslední prvek, období jsou
+    řezy přes bisect a vložení/úprava/smazání měření najde pozici také bisectem.
+    """
+
+    _EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self):
+        self.entries = None  # tentýž list jako data["body_metrics"]["weight_history"]
+        self.keys = []
+        self.times = []      # datetime měření (None = neplatné datum)
+        self.timed = []      # True = čas z timestampu, False = jen datum
+        self.by_id = {}
+        self._key_of = {}    # id(entry) -> klíč, pod kterým je měření zařazené
+
+    @staticmethod
+    def parse(entry):
+        """(datetime, má_čas): timestamp, jinak datum o půlnoci, jinak (None, False)."""
+        if not isinstance(entry, dict):
+            return None, False
+        ts = entry.get("timestamp")
+        if ts:
+            try:
+                return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S"), True
+            except Exception:
+                pass
+        try:
+            return datetime.strptime(entry.get("date", ""), "%Y-%m-%d"), False
+        except Exception:
+            return None, False
+
+    @classmethod
+    def key_for(cls, dt):
+        return (dt - cls._EPOCH).total_seconds() if dt is not None else float("-inf")
+
+    def rebuild(self, history):
+        """Převezme seznam měření, setřídí ho na místě a postaví klíče."""
+        parsed = [(self.parse(e), e) for e in history]
+        parsed.sort(key=lambda p: self.key_for(p[0][0]))
+        history[:] = [e for _p, e in parsed]
+        self.entries = history
+        self.times = [dt for (dt, _timed), _e in parsed]
+        self.timed = [timed for (_dt, timed), _e in parsed]
+        self.keys = [self.key_for(dt) for dt in self.times]
+        self._key_of = {id(e): k for e, k in zip(history, self.keys)}
+        self.by_id = {e["id"]: e for e in history if isinstance(e, dict) and e.get("id")}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def latest(self):
+        """Poslední měření (nebo None)."""
+        return self.entries[-1] if self.entries else None
+
+    def span(self, start_dt, end_dt):
+        """Rozsah indexů (lo, hi) měření v intervalu start_dt..end_dt (včetně obou mezí)."""
+        lo = bisect.bisect_left(self.keys, self.key_for(start_dt))
+        hi = bisect.bisect_right(self.keys, self.key_for(end_dt))
+        return lo, max(lo, hi)
+
+    def between(self, start_dt, end_dt):
+        """[(datetime, entry)] měření v intervalu, od nejstaršího."""
+        lo, hi = self.span(start_dt, end_dt)
+        return list(zip(self.times[lo:hi], self.entries[lo:hi]))
+
+    def on_date(self, date_str):
+        """Měření se záznamem "date" == date_str (hledá se v rámci daného dne)."""
+        try:
+            day = datetime.strptime(date_str, "%Y-%m-%d")
+        except Exception:
+            return None
+        for _dt, entry in self.between(day, day.replace(hour=23, minute=59, second=59)):
+            if entry.get("date") == date_str:
+                return entry
+        return None
+
+    def position(self, entry):
+        """Index zařazeného měření (podle klíče, pod kterým bylo zařazeno), jinak None."""
+        key = self._key_of.get(id(entry))
+        if key is None:
+            return None
+        i = bisect.bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.entries[i] is entry:
+                return i
+            i += 1
+        return None
+
+    def insert_position(self, entry):
+        """Index, na který by upsert() měření nově zařadil (za měření se stejným časem)."""
+        return bisect.bisect_right(self.keys, self.key_for(self.parse(entry)[0]))
+
+    def pop(self, i):
+        """Odebere měření na indexu i a vrátí ho."""
+        entry = self.entries.pop(i)
+        del self.keys[i]
+        del self.times[i]
+        del self.timed[i]
+        self._key_of.pop(id(entry), None)
+        if self.by_id.get(entry.get("id")) is entry:
+            del self.by_id[entry["id"]]
+        return entry
+
+    def upsert(self, entry):
+        """Zařadí nové měření, případně přeřadí upravené (i po změně času)."""
+        dt, timed = self.parse(entry)
+        key = self.key_for(dt)
+        i = self.position(entry)
+        if i is not None:
+            if self.keys[i] == key:
+                # Čas beze změny -> měření zůstává na svém místě
+                self.times[i] = dt
+                self.timed[i] = timed
+                return
+            self.pop(i)
+        j = bisect.bisect_right(self.keys, key)
+        self.entries.insert(j, entry)
+        self.keys.insert(j, key)
+        self.times.insert(j, dt)
+        self.timed.insert(j, timed)
+        self._key_of[id(entry)] = key
+        if entry.get("id"):
+            self.by_id[entry["id"]] = entry
+
+    def remove(self, entry_id):
+        """Smaže měření podle id; vrátí smazaný záznam nebo None."""
+        entry = self.by_id.get(entry_id)
+        i = self.position(entry) if entry is not None else None
+        return self.pop(i) if i is not None else None
+
+
+class RunningBalanceIndex:
+    """
+    Prefix-sum index kumulativního cíle a výkonu pro (cvičení, rok).
+
+    goal_cum[i] / perf_cum[i] = součet za dny 0..i-1 daného roku, takže
+    náskok/skluz přes libovolný úsek roku je rozdíl dvou prefixů v O(1).
+    """
+
+    def __init__(self, schedule_func, totals_func):
+        # schedule_func(exercise_type, year) -> GoalSchedule
+        # totals_func(exercise_type, from_date, to_date) -> pole denních výkonů
+        self._schedule_func = schedule_func
+        self._totals_func = totals_func
+        self._entries = {}
+
+    def invalidate(self, exercise_type=None, year=None):
+        """Zahodí index (vše / jedno cvičení / jeden rok)."""
+        if exercise_type is None and year is None:
+            self._entries.clear()
+            return
+        for key in list(self._entries):
+            if exercise_type is not None and key[0] != exercise_type:
+                continue
+            if year is not None and key[1] != year:
+                continue
+            del self._entries[key]
+
+    def _build(self, exercise_type, year):
+        import numpy as np
+
+        first_day = datetime(year, 1, 1).date()
+
+        # Cíle jako celá čísla (stejně jako dřívější smyčka přes calculate_goal)
+        goals = self._schedule_func(exercise_type, year).goals.astype(np.int64)
+        performed = np.array(self._totals_func(exercise_type, first_day, datetime(year, 12, 31).date()), dtype=np.float64)
+
+        entry = {
+            "first_day": first_day,
+            "performed": performed,
+            "goal_cum": np.concatenate(([0], np.cumsum(goals))),
+            "perf_cum": np.concatenate(([0.0], np.cumsum(performed))),
+        }
+        self._entries[(exercise_type, year)] = entry
+        return entry
+
+    def _entry(self, exercise_type, year):
+        entry = self._entries.get((exercise_type, year))
+        if entry is None:
+            entry = self._build(exercise_type, year)
+        return entry
+
+    def update_day(self, exercise_type, date_str):
+        """Inkrementálně přepočítá výkon jednoho dne (po přidání/úpravě/smazání)."""
+        try:
+            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except Exception:
+            return
+        entry = self._entries.get((exercise_type, date.year))
+        if entry is None:
+            return  # index pro rok ještě neexistuje, postaví se při prvním dotazu
+
+        i = (date - entry["first_day"]).days
+        value = float(self._totals_func(exercise_type, date, date)[0])
+        delta = value - entry["performed"][i]
+        if delta:
+            entry["performed"][i] = value
+            entry["perf_cum"][i + 1:] += delta
+
+    def difference(self, exercise_type, from_date, to_date, today):
+        """
+        Výkon - cíl za dny from_date..to_date (včetně), výkon jen do dneška.
+        Vrací None, pokud úsek nespadá do jednoho roku.
+        """
+        if from_date.year != to_date.year:
+            return None
+        if to_date < from_date:
+            return 0
+
+        entry = self._entry(exercise_type, from_date.year)
+        first_day = entry["first_day"]
+        a = (from_date - first_day).days
+        b = (to_date - first_day).days + 1
+
+        total_goal = int(entry["goal_cum"][b] - entry["goal_cum"][a])
+
+        perf_end = min(b, (today - first_day).days + 1)
+        if perf_end > a:
+            total_performed = float(entry["perf_cum"][perf_end] - entry["perf_cum"][a])
+        else:
+            total_performed = 0.0
+
+        diff = total_performed - total_goal
+        return int(round(diff)) if abs(diff - round(diff)) < 1e-9 else diff
+
+
+class DataChangeBus(QObject):
+    """
+    Centrální oznámení o změně dat: (druh, cvičení, od, do).
+
+    druh: "workouts" (záznamy), "settings" (cíle/starty roku) nebo "all" (import apod.);
+    cvičení: id, seznam id nebo None = všechna; od/do None = neomezeně. Pohledy se přihlásí ke
+    `changed` a překreslí se jen tehdy, když změna zasáhne jejich cvičení a období.
+    """
+
+    changed = Signal(str, object, object, object)
+
+    @staticmethod
+    def _as_date(value):
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        return value
+
+    def notify(self, kind, exercise_type=None, date_from=None, date_to=None):
+        """Rozešle změnu; data lze předat jako date nebo 'YYYY-MM-DD', samotné od = jeden den."""
+        date_from = self._as_date(date_from)
+        date_to = self._as_date(date_to) if date_to is not None else date_from
+        self.changed.emit(kind, exercise_type, date_from, date_to)
+
+    @staticmethod
+    def intersects(date_from, date_to, start, end):
+        """Zasahuje změna (od..do, None = neomezeně) do období start..end?"""
+        if date_from is not None and date_from > end:
+            return False
+        if date_to is not None and date_to < start:
+            return False
+        return True
+
+
+class FitnessTrackerApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle(f"{TITLE} v{VERSION} - Sledování cvičení")
+        
+        # macOS/HiDPI & FullHD fix:
+        # Původně 1680x1000, což je na FullHD (1080p) s taskbarem moc.
+        # Snižuji minimum, aby šlo okno zmenšit/přizpůsobit.
+        self.setMinimumSize(1280, 800)
+        self.resize(1440, 900)
+
+        self.data_file = Path("fitness_data.json")
+        # Úložiště dat: JSON (výchozí) nebo SQLite
+        self.storage = self.create_storage()
+        # Inkrementální zálohy (bloky sdílené mezi zálohami, zápis na pozadí)
+        self.backups = BackupStore(self.data_file.parent / "backup")
+        self.exercise_year_selectors = {}
+        self.exercise_calendar_widgets = {}
+        # Modely stromu záznamů: exercise_id -> RecordTreeModel
+        self.exercise_tree_models = {}
+        # Roční heatmapy kalendáře: exercise_id -> YearHeatmapWidget
+        self.exercise_calendar_heatmaps = {}
+        # Tooltipy kalendáře počítané až při najetí: exercise_id -> {date_str: (dnes, html)}
+        self.calendar_tooltip_cache = {}
+        self.current_settings_year = datetime.now().year
+
+        # Prefix-sum index náskoku/skluzu pro kalendář (cvičení, rok)
+        self.goal_schedules = {}
+        self.workout_store = self.storage.create_workout_index()
+        self.balance_index = RunningBalanceIndex(self.get_goal_schedule, self.workout_store.daily_totals)
+        # Seřazená historie vážení (viz get_weight_series)
+        self.weight_series = WeightSeries()
+
+        # Revize dat pro auto_refresh: záložka se překreslí jen při změně
+        # svého cvičení, vybraného roku nebo dne
+        self.data_revision = 0
+        self.all_exercises_revision = 0
+        self.exercise_revisions = {}
+        self.body_metrics_revision = 0
+        self.exercise_tab_rendered = {}
+        self.last_refresh_day = datetime.now().date()
+
+        # Skryté záložky cvičení se při změně dat nepřekreslují, jen se označí
+        # a vykreslí se až při zobrazení (on_tab_changed)
+        self.exercise_tab_pages = {}
+        self.stale_exercise_views = set()
+
+        # Volitelné vykreslování grafů ve vlákně na pozadí (+ cache obrázků)
+        self.chart_rasterizer = self.create_chart_rasterizer()
+
+        # Změny dat -> jen dotčené pohledy (pořadí odběratelů = pořadí překreslení)
+        self.change_bus = DataChangeBus(self)
+        self.change_bus.changed.connect(self.on_data_changed_exercise_views)
+        self.change_bus.changed.connect(self.on_data_changed_add_tab)
+
+        self.load_data()
+        self.ensure_app_state()
+        # Migrace podle schema_version: aktuální soubor se neprochází
+        self.migrate_schema()
+        self.ensure_body_metrics()
+
+        # Sloupcový index záznamů (po migracích, před prvním vykreslením);
+        # JSON beze změn od posledního uložení -> pole z binární cache
+        if not self.storage.restore_workout_index(self.workout_store):
+            self.workout_store.rebuild(self.data.get("workouts", {}))
+        # Data po rocích: starší rok se načte až při prvním přístupu
+        YearPartitionedDict.listen(self.data.get("workouts"), self.on_workout_year_loaded)
+
+        self.setup_ui()
+        self.restore_app_state()
+
+        self.update_timer = QTimer()
+        self.update_timer.timeout.connect(self.auto_refresh)
+        self.update_timer.start(5000)
+
+        
+    def get_weight_series(self):
+        """Seřazená historie vážení; po výměně seznamu v datech (načtení, import) se postaví nová."""
+        body = self.data.get("body_metrics")
+        history = body.get("weight_history") if isinstance(body, dict) else None
+        if not isinstance(history, list):
+            self.ensure_body_metrics()
+            history = self.data["body_metrics"]["weight_history"]
+        if self.weight_series.entries is not history:
+            # Nový objekt: model historie do svého resetu čte dál ten původní
+            self.weight_series = WeightSeries()
+            self.weight_series.rebuild(history)
+        return self.weight_series
+
+    def ensure_body_metrics(self):
+        """Zajistí existenci sekce body_metrics pro BMI/váhu."""
+        if "body_metrics" not in self.data or not isinstance(self.data["body_metrics"], dict):
+            self.data["body_metrics"] = {}
+        body = self.data["body_metrics"]
+
+        # Výchozí výška (cm)
+        height = body.get("height_cm")
+        if not isinstance(height, (int, float)) or height <= 0:
+            body["height_cm"] = 180
+
+        # Historie měření váhy
+        history = body.get("weight_history")
+        if not isinstance(history, list):
+            body["weight_history"] = []
+
+    def wait_for_backups(self, timeout=60.0):
+        """Počká na dopsání záloh; trvá-li to déle, ukáže okno průběhu s možností nečekat."""
+        import time
+        from PySide6.QtWidgets import QProgressDialog
+
+        # Běžná záloha je hotová do vteřiny -> bez okna a bez zpracování událostí
+        if self.backups.flush(1.0):
+            return True
+        dialog = QProgressDialog("Dokončuji zálohu dat…", "Nečekat", 0, 0, self)
+        dialog.setWindowTitle("Záloha dat")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.show()
+        deadline = time.monotonic() + timeout - 1.0
+        done = False
+        while not dialog.wasCanceled() and time.monotonic() < deadline:
+            QApplication.processEvents()
+            if self.backups.flush(0.05):
+                done = True
+                break
+        dialog.close()
+        dialog.deleteLater()
+        if not done:
+            print("Záloha dat nebyla dokončena")
+        return done
+
+    def backup_data_file(self, reason=""):
+        """Naplánuje inkrementální zálohu souborů dat do složky backup (BackupStore, zápis na pozadí)."""
+        try:
+            # Nejdřív dopsat rozpracovaná uložení – soubory (např. roky a index) pak patří k jedné verzi
+            self.flush_data()
+            self.backups.backup(self.storage.backup_files(), reason)
+        except Exception as e:
+            print(f"Záloha dat selhala: {e}")
+
+    def migrate_exercise_start_dates(self):
+        """Doplní year_settings[year].exercise_start_dates pro všechna cvičení, pokud chybí.
+        Vytvoří zálohu JSON před první změnou.
+        """
+        changed = False
+        # Pro každý rok v year_settings
+        for year_str, ys in self.data.get("year_settings", {}).items():
+            if not isinstance(ys, dict):
+                continue
+            ex_map = ys.get("exercise_start_dates")
+            if ex_map is None:
+                ys["exercise_start_dates"] = {}
+                ex_map = ys["exercise_start_dates"]
+                changed = True
+            # Pro všechna cvičení (i případně neaktivní kvůli historii)
+            for ex_id, ex_conf in self.data.get("exercises", {}).items():
+                if ex_id in ex_map and ex_map[ex_id]:
+                    continue
+                # 1) pokud je v exercises.start_dates[year], použij
+                sd_map = ex_conf.get("start_dates", {}) if isinstance(ex_conf, dict) else {}
+                if isinstance(sd_map, dict) and year_str in sd_map and sd_map[year_str]:
+                    ex_map[ex_id] = sd_map[year_str]
+                    changed = True
+                    continue
+                # 2) fallback na year_settings.start_date nebo 1.1.
+                fallback = ys.get("start_date", f"{year_str}-01-01")
+                ex_map[ex_id] = fallback
+                changed = True
+        if changed:
+            # vytvoř zálohu a ulož
+            self.flush_data()
+            self.backup_data_file("před migrací")
+            self.save_data()
+            print("Migrace: doplněny exercise_start_dates pro roky v year_settings.")
+            
+    def get_exercise_start_date(self, exercise_id: str, year: int):
+        """
+        Vrátí startovní datum pro dané cvičení a rok (date).
+        Priorita: year_settings[year].exercise_start_dates[exercise] → exercises[exercise].start_dates[year]
+                  → year_settings[year].start_date → YYYY-01-01
+        """
+        try:
+            ys = self.get_year_settings(year)
+            # 1) Per-exercise v year_settings
+            ex_map = ys.get("exercise_start_dates", {})
             if isinstance(ex_map, dict) and exercise_id in ex_map and ex_map[exercise_id]:
                 ds = ex_map[exercise_id]
             else:
@@ -1805,6 +5880,7 @@ class FitnessTrackerApp(QMainWindow):
             if "app_state" in self.data and "exercise_years" in self.data["app_state"]:
                 self.data["app_state"]["exercise_years"][exercise_id] = datetime.now().year
             
+            self.invalidate_goal_schedules()
             self.save_data()
             
             self.show_message("Úspěch", f"Cvičení '{exercise_data['name']}' bylo přidáno!\n\nZákladní cíl: {base_goal}\nTýdenní přírůstek: {weekly_increment}\n\nRestartuj aplikaci pro zobrazení nové záložky.", QMessageBox.Information)
@@ -1823,7 +5899,8 @@ class FitnessTrackerApp(QMainWindow):
             
             # Aktualizuj data
             self.data["exercises"][exercise_id].update(updated_data)
-            self.save_data()
+            self.invalidate_goal_schedules()
+            self.record_change("exercises", exercise_id)
             
             self.show_message("Úspěch", f"Cvičení bylo aktualizováno!\n\nRestartuj aplikaci pro aplikování změn.", QMessageBox.Information)
     
@@ -1868,6 +5945,8 @@ class FitnessTrackerApp(QMainWindow):
                 if exercise_id in self.data["app_state"]["exercise_years"]:
                     del self.data["app_state"]["exercise_years"][exercise_id]
             
+            self.invalidate_goal_schedules()
+            self.invalidate_workout_indexes()
             self.save_data()
             
             self.show_message("Smazáno", f"Cvičení '{config['name']}' bylo smazáno.\n\nRestartuj aplikaci.", QMessageBox.Information)
@@ -1883,9 +5962,21 @@ class FitnessTrackerApp(QMainWindow):
         except Exception as e:
             print(f"Chyba při ukládání dat: {e}")
 
+        # Záloha do složky backup/: soubory se přečtou po dopsání uložení, ještě před zavřením úložiště
+        self.backup_data_file("při zavření")
+
         try:
-            # Úplně na závěr: záloha do složky backup/
-            self.backup_data_file()
+            self.storage.close()
+        except Exception as e:
+            print(f"Chyba při ukládání dat: {e}")
+
+        if self.chart_rasterizer is not None:
+            self.chart_rasterizer.stop()
+        self.update_timer.stop()
+
+        try:
+            # Úplně na závěr počkat na dopsání zálohy (déle s oknem průběhu)
+            self.wait_for_backups()
         except Exception as e:
             print(f"Chyba při zálohování dat: {e}")
 
@@ -1899,150 +5990,40 @@ class FitnessTrackerApp(QMainWindow):
                 'window_geometry': None,
                 'exercise_years': {
                     'kliky': datetime.now().year,
-                    'dřepy': datetime.now().year,
-                    'skrčky': datetime.now().year
+                    'drepy': datetime.now().year,
+                    'skrcky': datetime.now().year
                 }
             }
         
         if 'exercise_years' not in self.data['app_state']:
             self.data['app_state']['exercise_years'] = {
                 'kliky': datetime.now().year,
-                'dřepy': datetime.now().year,
-                'skrčky': datetime.now().year
+                'drepy': datetime.now().year,
+                'skrcky': datetime.now().year
             }
     
-    def migrate_data(self):
-        """Migrace starých dat na nový formát s timestampy a lists"""
-        migrated = False
-        
-        for date_str, workouts in self.data['workouts'].items():
-            for exercise, value in list(workouts.items()):
-                # Migrace z single value na dict
-                if isinstance(value, (int, float)):
-                    workouts[exercise] = [{
-                        'value': int(value),
-                        'timestamp': f"{date_str} 12:00:00",
-                        'id': str(uuid.uuid4())
-                    }]
-                    migrated = True
-                # Migrace z single dict na list
-                elif isinstance(value, dict) and 'value' in value:
-                    workouts[exercise] = [{
-                        'value': value['value'],
-                        'timestamp': value.get('timestamp', f"{date_str} 12:00:00"),
-                        'id': str(uuid.uuid4())
-                    }]
-                    migrated = True
-                # Už je list - zkontroluj že má všechny záznamy ID
-                elif isinstance(value, list):
-                    for record in value:
-                        if 'id' not in record:
-                            record['id'] = str(uuid.uuid4())
-                            migrated = True
-        
-        if migrated:
-            self.save_data()
-            print("Data byla migrována na nový formát s multiple records")
+    def migrate_schema(self):
+        """
+        Dotáhne načtená data na SCHEMA_VERSION (viz DataMigrator).
+
+        Soubor v aktuální verzi se neprochází; zastaralý se upraví jedním
+        průchodem, před změnou se jednou zazálohuje a na konci jednou uloží.
+        """
+        if DataMigrator.version_of(self.data) >= SCHEMA_VERSION:
+            return
+        try:
+            # Záloha souboru ještě ve staré verzi
+            self.flush_data()
+            self.backup_data_file(f"před migrací na schéma {SCHEMA_VERSION}")
+            applied = DataMigrator.upgrade(self.data)
+        except Exception as e:
+            print(f"Chyba při migraci dat: {e}")
+            return
+        for label in applied or []:
+            print(f"Migrace dat: {label}")
+        self.save_data()
+        print(f"Data převedena na schéma verze {SCHEMA_VERSION}")
 
-    def migrate_to_year_settings(self):
-        """Migrace starého formátu settings na year_settings"""
-        if 'year_settings' not in self.data:
-            self.data['year_settings'] = {}
-            
-            if 'settings' in self.data:
-                old_settings = self.data['settings']
-                start_year = int(old_settings['start_date'].split('-')[0])
-                
-                self.data['year_settings'][str(start_year)] = {
-                    'start_date': old_settings['start_date'],
-                    'base_goals': old_settings['base_goals'].copy(),
-                    'weekly_increment': old_settings['weekly_increment'].copy()
-                }
-                
-                del self.data['settings']
-                
-                self.save_data()
-                print(f"Data migrována na nový formát year_settings pro rok {start_year}")
-                
-    def migrate_to_exercises(self):
-        """Migrace na nový formát s exercises (verze 2.0)"""
-        if "exercises" not in self.data:
-            print("Migrace na verze 2.0: Vytváření struktury 'exercises'...")
-            
-            # Výchozí cvičení
-            self.data["exercises"] = {
-                "kliky": {
-                    "name": "Kliky",
-                    "icon": "💪",
-                    "order": 0,
-                    "active": True,
-                    "quick_buttons": [10, 15, 20]
-                },
-                "drepy": {
-                    "name": "Dřepy",
-                    "icon": "🦵",
-                    "order": 1,
-                    "active": True,
-                    "quick_buttons": [5, 10, 15, 20]
-                },
-                "skrcky": {
-                    "name": "Skrčky",
-                    "icon": "🧘",
-                    "order": 2,
-                    "active": True,
-                    "quick_buttons": [10, 15, 20, 30, 40]
-                }
-            }
-            
-            self.save_data()
-            print("Migrace dokončena: Struktura 'exercises' vytvořena.")
-
-    def migrate_exercise_keys(self):
-        """Migrace klíčů cvičení - sjednocení na verzi bez diakritiky (v2.0)"""
-        # Mapování starých klíčů na nové (bez diakritiky)
-        key_mapping = {
-            "dřepy": "drepy",
-            "skrčky": "skrcky"
-        }
-        
-        changed = False
-        
-        # Migrace v year_settings
-        for year_str in self.data.get("year_settings", {}).keys():
-            year_settings = self.data["year_settings"][year_str]
-            
-            # base_goals
-            if "base_goals" in year_settings:
-                for old_key, new_key in key_mapping.items():
-                    if old_key in year_settings["base_goals"]:
-                        year_settings["base_goals"][new_key] = year_settings["base_goals"].pop(old_key)
-                        changed = True
-            
-            # weekly_increment
-            if "weekly_increment" in year_settings:
-                for old_key, new_key in key_mapping.items():
-                    if old_key in year_settings["weekly_increment"]:
-                        year_settings["weekly_increment"][new_key] = year_settings["weekly_increment"].pop(old_key)
-                        changed = True
-        
-        # Migrace v workouts
-        for date_str in list(self.data.get("workouts", {}).keys()):
-            for old_key, new_key in key_mapping.items():
-                if old_key in self.data["workouts"][date_str]:
-                    self.data["workouts"][date_str][new_key] = self.data["workouts"][date_str].pop(old_key)
-                    changed = True
-        
-        # Migrace v app_state
-        if "app_state" in self.data and "exercise_years" in self.data["app_state"]:
-            for old_key, new_key in key_mapping.items():
-                if old_key in self.data["app_state"]["exercise_years"]:
-                    self.data["app_state"]["exercise_years"][new_key] = self.data["app_state"]["exercise_years"].pop(old_key)
-                    changed = True
-        
-        if changed:
-            print("Migrace klíčů cvičení dokončena: dřepy → drepy, skrčky → skrcky")
-            self.save_data()
-    
     def get_year_settings(self, year):
         """Vrátí nastavení pro daný rok"""
         year_str = str(year)
@@ -2052,16 +6033,16 @@ class FitnessTrackerApp(QMainWindow):
                 'start_date': f'{year}-01-01',
                 'base_goals': {
                     'kliky': 50,
-                    'dřepy': 20,
-                    'skrčky': 20
+                    'drepy': 20,
+                    'skrcky': 20
                 },
                 'weekly_increment': {
                     'kliky': 10,
-                    'dřepy': 5,
-                    'skrčky': 10
+                    'drepy': 5,
+                    'skrcky': 10
                 }
             }
-            self.save_data()
+            self.record_change('year_settings', year_str)
         
         return self.data['year_settings'][year_str]
     
@@ -2103,13 +6084,14 @@ class FitnessTrackerApp(QMainWindow):
 
     def load_data(self):
         """Načte data ze souboru nebo vytvoří výchozí strukturu"""
-        if self.data_file.exists():
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
+        data = self.storage.load()
+        if data is not None:
+            self.data = data
         else:
             current_year = datetime.now().year
             self.data = {
                 "version": VERSION,
+                "schema_version": SCHEMA_VERSION,
                 "exercises": {
                     "kliky": {
                         "name": "Kliky",
@@ -2161,11 +6143,170 @@ class FitnessTrackerApp(QMainWindow):
             }
             self.save_data()
 
+    def create_storage(self):
+        """
+        Vybere úložiště dat.
+
+        SQLite se použije, pokud je FITNESS_TRACKER_STORAGE=sqlite nebo už
+        existuje fitness_data.db; prázdná DB se při prvním spuštění naplní
+        z fitness_data.json. Podobně FITNESS_TRACKER_STORAGE=shards nebo
+        existující fitness_data/index.json zapne data rozdělená po rocích.
+        Jinak zůstává výchozí JSON.
+        """
+        import os
+
+        db_file = self.data_file.with_suffix(".db")
+        shard_dir = self.data_file.with_suffix("")
+        backend = os.environ.get("FITNESS_TRACKER_STORAGE", "").strip().lower()
+        if backend == "sqlite" or (backend != "json" and db_file.exists()):
+            try:
+                return SqliteStorage(db_file, json_source=self.data_file)
+            except Exception as e:
+                print(f"Chyba při otevírání SQLite, používám JSON: {e}")
+        elif backend == "shards" or (backend != "json" and (shard_dir / "index.json").exists()):
+            try:
+                return ShardedJsonStorage(shard_dir, json_source=self.data_file)
+            except Exception as e:
+                print(f"Chyba při otevírání dat po rocích, používám JSON: {e}")
+        return JsonStorage(self.data_file)
+
+    def create_chart_rasterizer(self):
+        """FITNESS_TRACKER_CHART_THREAD=1 zapne vykreslování grafů na pozadí; jinak None (synchronně)."""
+        import os
+
+        if os.environ.get("FITNESS_TRACKER_CHART_THREAD", "").strip().lower() not in ("1", "true", "yes"):
+            return None
+        try:
+            return ChartRasterizer(self)
+        except Exception as e:
+            print(f"Chyba při spuštění vykreslování na pozadí, kreslím synchronně: {e}")
+            return None
+
     def save_data(self):
+        """Uloží celý dokument (JSON: snapshot na pozadí, SQLite: synchronizace tabulek)."""
         self.data['version'] = VERSION
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-    
+        self.storage.save(self.data)
+        # Hromadná změna – nevíme, čeho se týkala
+        self.mark_data_changed()
+
+    def flush_data(self):
+        """Počká, než jsou všechna naplánovaná uložení zapsána na disk."""
+        if not self.storage.flush():
+            print("Uložení dat na pozadí nebylo dokončeno včas")
+
+    def record_change(self, *path):
+        """Uloží změnu hodnoty na cestě v self.data (nebo její smazání)."""
+        self.storage.record_change(self.data, path)
+        self._mark_path_changed(path)
+
+    def record_list_item(self, path, item_id):
+        """Uloží vložení/úpravu/smazání položky seznamu (podle "id")."""
+        self.storage.record_list_item(self.data, path, item_id)
+        self._mark_path_changed(path)
+
+    def _mark_path_changed(self, path):
+        """Převede cestu změny na revizi dotčeného cvičení (app_state a váha záložky cvičení nemění)."""
+        head = path[0] if path else None
+        if head == "body_metrics":
+            self.body_metrics_revision += 1
+            return
+        if head == "app_state":
+            return
+        if head == "workouts" and len(path) >= 3:
+            self.mark_data_changed(path[2])
+        elif head == "exercises" and len(path) >= 2:
+            self.mark_data_changed(path[1])
+        else:
+            self.mark_data_changed()
+
+    def mark_data_changed(self, exercise_type=None):
+        """Zvýší revizi dat; bez exercise_type se změna týká všech cvičení."""
+        self.data_revision += 1
+        if exercise_type is None:
+            self.all_exercises_revision = self.data_revision
+        else:
+            self.exercise_revisions[exercise_type] = self.data_revision
+
+    def exercise_tab_stamp(self, exercise_type, year):
+        """Co určuje obsah záložky cvičení: revize jeho dat, vybraný rok a dnešní den."""
+        revision = max(self.exercise_revisions.get(exercise_type, 0), self.all_exercises_revision)
+        return revision, year, datetime.now().date()
+
+    def notify_data_changed(self, kind, exercise_type=None, date_from=None, date_to=None):
+        """Ohlásí změnu dat pohledům (viz DataChangeBus); volá se jednou po dokončení úpravy."""
+        self.change_bus.notify(kind, exercise_type, date_from, date_to)
+
+    def exercise_view_period(self, exercise_type):
+        """Období zobrazené záložkou cvičení: vybraný rok (+ týden přesahu kvůli týdenním grafům)."""
+        year = datetime.now().year
+        selector = self.exercise_year_selectors.get(exercise_type)
+        if selector and selector.currentText():
+            try:
+                year = int(selector.currentText())
+            except ValueError:
+                pass
+        return (datetime(year, 1, 1).date() - timedelta(days=7),
+                datetime(year, 12, 31).date() + timedelta(days=7))
+
+    def exercise_for_tab(self, index):
+        """Id cvičení zobrazeného na záložce index (None pro ostatní záložky)."""
+        page = self.tabs.widget(index) if hasattr(self, "tabs") else None
+        if page is None:
+            return None
+        for exercise_id, ex_page in self.exercise_tab_pages.items():
+            if ex_page is page:
+                return exercise_id
+        return None
+
+    def on_data_changed_exercise_views(self, kind, exercise_type, date_from, date_to):
+        """Překreslí přehled, strom, kalendář a graf jen u cvičení, jehož období změna zasáhla.
+
+        Viditelná je nejvýš jedna záložka cvičení; ostatní se jen označí jako zastaralé.
+        """
+        if not exercise_type:
+            targets = self.get_active_exercises()
+        elif isinstance(exercise_type, str):
+            targets = [exercise_type]
+        else:
+            targets = list(exercise_type)
+        visible = self.exercise_for_tab(self.tabs.currentIndex()) if hasattr(self, "tabs") else None
+        for ex in targets:
+            try:
+                start, end = self.exercise_view_period(ex)
+                if not DataChangeBus.intersects(date_from, date_to, start, end):
+                    continue
+                if ex != visible:
+                    self.stale_exercise_views.add(ex)
+                    continue
+                self.render_exercise_views(ex)
+            except Exception as e:
+                print(f"Chyba při překreslení záložky {ex}: {e}")
+
+    def render_exercise_views(self, ex):
+        """Vykreslí přehled, strom, kalendář a graf záložky cvičení (zruší příznak zastaralosti)."""
+        self.stale_exercise_views.discard(ex)
+        self.update_exercise_tab(ex)
+        self.refresh_exercise_calendar(ex)
+        mode = self.chart_modes.get(ex, "weekly") if hasattr(self, "chart_modes") else "weekly"
+        self.update_performance_chart(ex, mode)
+
+    def on_data_changed_add_tab(self, kind, exercise_type, date_from, date_to):
+        """Záložka Přidat výkon: cíle jen při zásahu zvoleného data, BMI plán jen při změně záznamů."""
+        try:
+            # (8.0.4) BMI plán se má přepočítat pouze při změně dat (ne při změně data v add tabu)
+            if kind in ("workouts", "all"):
+                self.recompute_bmi_plan()
+
+            if hasattr(self, "add_date_edit"):
+                selected = self.add_date_edit.date().toPython()
+                if DataChangeBus.intersects(date_from, date_to, selected, selected):
+                    self.refresh_add_tab_goals()
+                    self.apply_add_tab_goals_gradient()
+
+            self.apply_weekly_plan_gradient()
+        except Exception as e:
+            print(f"Chyba při překreslení záložky Přidat výkon: {e}")
+
     def save_app_state(self):
         """Bezpečné ukládání stavu"""
         try:
@@ -2188,7 +6329,7 @@ class FitnessTrackerApp(QMainWindow):
                     except ValueError:
                         self.data['app_state']['exercise_years'][exercise] = datetime.now().year
             
-            self.save_data()
+            self.record_change('app_state')
         except Exception as e:
             print(f"Chyba při ukládání app_state: {e}")
     
@@ -2275,6 +6416,7 @@ class FitnessTrackerApp(QMainWindow):
             ex_scroll.setWidget(ex_widget)
     
             self.tabs.addTab(ex_scroll, tab_label)
+            self.exercise_tab_pages[exercise_id] = ex_scroll
     
         # ==================== OSTATNÍ ZÁLOŽKY (beze změny) ====================
         self.tabs.addTab(self.create_bmi_tab(), "BMI + váha")
@@ -2358,24 +6500,27 @@ class FitnessTrackerApp(QMainWindow):
         history_group = QGroupBox("📜 Historie měření")
         history_layout = QVBoxLayout()
     
-        self.bmi_history_tree = QTreeWidget()
-        self.bmi_history_tree.setColumnCount(5)
-        self.bmi_history_tree.setHeaderLabels(["Datum", "Čas", "Váha [kg]", "BMI", "Kategorie"])
+        # Model nad seřazenou historií – řádky se vykreslují jen viditelné
+        self.bmi_history_model = WeightHistoryModel(
+            self.get_weight_series,
+            lambda: float(self.data.get("body_metrics", {}).get("height_cm", 0)),
+            self.calculate_bmi,
+            self.get_bmi_category,
+            self,
+        )
+        self.bmi_history_tree = QTreeView()
+        self.bmi_history_tree.setModel(self.bmi_history_model)
         self.bmi_history_tree.setRootIsDecorated(False)
+        self.bmi_history_tree.setUniformRowHeights(True)
         self.bmi_history_tree.setAlternatingRowColors(True)
         self.bmi_history_tree.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.bmi_history_tree.setEditTriggers(QAbstractItemView.NoEditTriggers)
         header = self.bmi_history_tree.header()
         header.setStretchLastSection(True)
         header.setSectionResizeMode(QHeaderView.ResizeToContents)
-    
-        # (4.7.0) Zarovnání nadpisů sloupců v historii na střed
-        try:
-            hdr_item = self.bmi_history_tree.headerItem()
-            for col in range(self.bmi_history_tree.columnCount()):
-                hdr_item.setTextAlignment(col, Qt.AlignCenter)
-        except Exception:
-            pass
+        # Šířky sloupců jen podle vzorku řádků, ne přes celou historii (jinak data() pro všechny)
+        header.setResizeContentsPrecision(WeightHistoryModel.RESIZE_SAMPLE_ROWS)
+        # (4.7.0) Nadpisy sloupců jsou zarovnané na střed (WeightHistoryModel.headerData)
     
         # Kontextové menu pro editaci / smazání
         self.bmi_history_tree.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -2472,7 +6617,7 @@ class FitnessTrackerApp(QMainWindow):
         year_btn.setChecked(False)
     
         self.bmi_time_fig = Figure(figsize=(8, 3), facecolor="#121212")
-        self.bmi_time_canvas = FigureCanvas(self.bmi_time_fig)
+        self.bmi_time_canvas = CachedChartCanvas(self.bmi_time_fig, self.chart_rasterizer)
         self.bmi_time_canvas.setStyleSheet("background-color: #121212;")
         time_layout.addWidget(self.bmi_time_canvas)
     
@@ -2484,7 +6629,7 @@ class FitnessTrackerApp(QMainWindow):
         zones_layout = QVBoxLayout()\
     
         self.bmi_zones_fig = Figure(figsize=(8, 2), facecolor="#121212")
-        self.bmi_zones_canvas = FigureCanvas(self.bmi_zones_fig)
+        self.bmi_zones_canvas = CachedChartCanvas(self.bmi_zones_fig, self.chart_rasterizer)
         self.bmi_zones_canvas.setStyleSheet("background-color: #121212;")
         zones_layout.addWidget(self.bmi_zones_canvas)
     
@@ -2520,7 +6665,7 @@ class FitnessTrackerApp(QMainWindow):
                 _prev_stretch = None
     
             try:
-                for i in range(self.bmi_history_tree.columnCount()):
+                for i in range(self.bmi_history_model.columnCount()):
                     self.bmi_history_tree.resizeColumnToContents(i)
             except Exception:
                 pass
@@ -2532,7 +6677,7 @@ class FitnessTrackerApp(QMainWindow):
                 try:
                     total += int(header.length())
                 except Exception:
-                    for i in range(self.bmi_history_tree.columnCount()):
+                    for i in range(self.bmi_history_model.columnCount()):
                         try:
                             total += int(header.sectionSize(i))
                         except Exception:
@@ -2667,9 +6812,11 @@ class FitnessTrackerApp(QMainWindow):
             if "body_metrics" not in self.data or not isinstance(self.data["body_metrics"], dict):
                 self.data["body_metrics"] = {}
             self.data["body_metrics"]["height_cm"] = int(value)
-            self.save_data()
+            self.record_change("body_metrics", "height_cm")
         except Exception as e:
             print(f"Chyba při ukládání výšky: {e}")
+        if hasattr(self, "bmi_history_model"):
+            self.bmi_history_model.values_changed()
         self.update_bmi_current_display()
         self.update_bmi_charts()
 
@@ -2699,97 +6846,38 @@ class FitnessTrackerApp(QMainWindow):
         date_str = dt.strftime("%Y-%m-%d")
         timestamp_str = dt.strftime("%Y-%m-%d %H:%M:%S")
 
-        if "body_metrics" not in self.data or not isinstance(self.data["body_metrics"], dict):
-            self.data["body_metrics"] = {}
-        if "weight_history" not in self.data["body_metrics"] or not isinstance(self.data["body_metrics"]["weight_history"], list):
-            self.data["body_metrics"]["weight_history"] = []
-
-        history = self.data["body_metrics"]["weight_history"]
-
-        # Max. jedno měření za den – pokud existuje, přepiš
-        updated = False
-        for entry in history:
-            if entry.get("date") == date_str:
-                entry["timestamp"] = timestamp_str
-                entry["value"] = float(weight)
-                updated = True
-                break
+        series = self.get_weight_series()
 
-        if not updated:
-            new_entry = {
+        # Max. jedno měření za den – pokud existuje, přepiš (a přeřaď podle nového času)
+        entry = series.on_date(date_str)
+        if entry is not None:
+            entry["timestamp"] = timestamp_str
+            entry["value"] = float(weight)
+            entry_id = entry.get("id")
+        else:
+            entry = {
                 "id": str(uuid.uuid4()),
                 "timestamp": timestamp_str,
                 "date": date_str,
                 "value": float(weight),
             }
-            history.append(new_entry)
+            entry_id = entry["id"]
+        self.bmi_history_model.upsert(entry)
 
-        self.save_data()
+        if entry_id:
+            self.record_list_item(("body_metrics", "weight_history"), entry_id)
+        else:
+            self.save_data()
 
-        self.refresh_bmi_history()
         self.update_bmi_current_display()
         self.update_bmi_charts()
 
     def refresh_bmi_history(self):
-        """Obnoví strom historie měření BMI/váhy."""
+        """Obnoví celou historii měření BMI/váhy (reset modelu, řádky se dopočítají při vykreslení)."""
         if not hasattr(self, "bmi_history_tree"):
             return
 
-        self.bmi_history_tree.clear()
-        body = self.data.get("body_metrics", {})
-        history = body.get("weight_history", [])
-        height_cm = float(body.get("height_cm", 0))
-
-        # Setřídit podle timestampu
-        try:
-            sorted_history = sorted(history, key=lambda e: e.get("timestamp", ""), reverse=True)
-        except Exception:
-            sorted_history = history
-
-        from datetime import datetime
-
-        for entry in sorted_history:
-            ts = entry.get("timestamp")
-            try:
-                dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-            except Exception:
-                # Fallback jen na datum
-                dt = None
-
-            if dt:
-                date_str = dt.strftime("%d.%m.%Y")
-                time_str = dt.strftime("%H:%M")
-            else:
-                date_str = entry.get("date", "")
-                time_str = ""
-
-            weight = float(entry.get("value", 0.0))
-            bmi = self.calculate_bmi(weight, height_cm) if height_cm > 0 else 0.0
-            cat_name, color = self.get_bmi_category(bmi) if bmi > 0 else ("-", None)
-
-            item = QTreeWidgetItem([
-                date_str,
-                time_str,
-                f"{weight:.1f}" if weight > 0 else "-",
-                f"{bmi:.1f}" if bmi > 0 else "-",
-                cat_name,
-            ])
-
-            # Ulož ID záznamu do UserRole (pro edit / delete)
-            item.setData(0, Qt.UserRole, entry.get("id"))
-
-            # (4.7.0) Zarovnání všech sloupců na střed
-            for col in range(item.columnCount()):
-                item.setTextAlignment(col, Qt.AlignCenter)
-
-            # Barevné označení podle BMI kategorie
-            if bmi > 0 and color:
-                brush = QBrush(QColor(color))
-                for col in range(item.columnCount()):
-                    item.setForeground(col, brush)
-
-            self.bmi_history_tree.addTopLevelItem(item)
-
+        self.bmi_history_model.reload()
         self.bmi_history_tree.scrollToBottom()
 
     def on_bmi_history_context_menu(self, pos):
@@ -2798,8 +6886,9 @@ class FitnessTrackerApp(QMainWindow):
             return
 
         # Pozice je ve viewport souřadnicích
-        item = self.bmi_history_tree.itemAt(pos)
-        if item is None:
+        index = self.bmi_history_tree.indexAt(pos)
+        entry_id = index.data(Qt.UserRole) if index.isValid() else None
+        if not entry_id:
             return
 
         menu = QMenu(self)
@@ -2809,24 +6898,16 @@ class FitnessTrackerApp(QMainWindow):
         global_pos = self.bmi_history_tree.viewport().mapToGlobal(pos)
         action = menu.exec_(global_pos)
         if action == edit_action:
-            self.edit_weight_measurement(item)
+            self.edit_weight_measurement(entry_id)
         elif action == delete_action:
-            self.delete_weight_measurement(item)
+            self.delete_weight_measurement(entry_id)
 
-    def edit_weight_measurement(self, item: QTreeWidgetItem):
+    def edit_weight_measurement(self, entry_id: str):
         """Upraví hodnotu váhy pro daný záznam."""
-        entry_id = item.data(0, Qt.UserRole)
         if not entry_id:
             return
 
-        body = self.data.get("body_metrics", {})
-        history = body.get("weight_history", [])
-        target = None
-        for entry in history:
-            if entry.get("id") == entry_id:
-                target = entry
-                break
-
+        target = self.get_weight_series().by_id.get(entry_id)
         if target is None:
             return
 
@@ -2844,14 +6925,13 @@ class FitnessTrackerApp(QMainWindow):
             return
 
         target["value"] = float(new_weight)
-        self.save_data()
-        self.refresh_bmi_history()
+        self.bmi_history_model.upsert(target)
+        self.record_list_item(("body_metrics", "weight_history"), entry_id)
         self.update_bmi_charts()
         self.update_bmi_current_display()
 
-    def delete_weight_measurement(self, item: QTreeWidgetItem):
+    def delete_weight_measurement(self, entry_id: str):
         """Smaže vybraný záznam měření váhy."""
-        entry_id = item.data(0, Qt.UserRole)
         if not entry_id:
             return
 
@@ -2865,12 +6945,8 @@ class FitnessTrackerApp(QMainWindow):
         if reply != QMessageBox.Yes:
             return
 
-        body = self.data.get("body_metrics", {})
-        history = body.get("weight_history", [])
-        history = [e for e in history if e.get("id") != entry_id]
-        self.data["body_metrics"]["weight_history"] = history
-        self.save_data()
-        self.refresh_bmi_history()
+        self.bmi_history_model.remove(entry_id)
+        self.record_list_item(("body_metrics", "weight_history"), entry_id)
         self.update_bmi_charts()
         self.update_bmi_current_display()
 
@@ -2905,28 +6981,18 @@ class FitnessTrackerApp(QMainWindow):
     def get_bmi_category(self, bmi: float):
         """Vrátí (název, barva) BMI kategorie pro dané BMI."""
         if bmi <= 0:
-            return "Nedefinováno", "#e0e0e0"
-        if bmi < 18.5:
-            return "Podváha", "#4ea5ff"
-        if bmi < 25.0:
-            return "Normální hmotnost", "#32c766"
-        if bmi < 30.0:
-            return "Nadváha", "#ffc107"
-        if bmi < 35.0:
-            return "Obezita I", "#ff7043"
-        return "Obezita II+", "#ff1744"
+            return BMI_UNDEFINED
+        for upper, name, _label, color in BMI_CATEGORIES:
+            if upper is None or bmi < upper:
+                return name, color
 
     def get_latest_bmi(self) -> float:
         """Vrátí BMI z posledního měření (nebo 0.0, pokud není k dispozici)."""
         body = self.data.get("body_metrics", {})
         height_cm = float(body.get("height_cm", 0))
-        history = body.get("weight_history", [])
-        if height_cm <= 0 or not history:
+        latest = self.get_weight_series().latest()
+        if height_cm <= 0 or latest is None:
             return 0.0
-        try:
-            latest = max(history, key=lambda e: e.get("timestamp", ""))
-        except Exception:
-            latest = history[-1]
         weight = float(latest.get("value", 0.0))
         return self.calculate_bmi(weight, height_cm)
 
@@ -2959,10 +7025,6 @@ class FitnessTrackerApp(QMainWindow):
             mode = self.bmi_chart_mode_combo.currentText()
 
         from datetime import datetime
-        import matplotlib.dates as mdates
-        from matplotlib.collections import LineCollection
-        import numpy as np
-        import matplotlib.pyplot as plt # Potřeba pro Normalize
 
         today = QDate.currentDate()
         period_mode = getattr(self, "bmi_period_mode", "week")
@@ -2994,10 +7056,33 @@ class FitnessTrackerApp(QMainWindow):
         end_dt = datetime(end_q.year(), end_q.month(), end_q.day(), 23, 59, 59)
 
         body = self.data.get("body_metrics", {})
-        history = body.get("weight_history", [])
         height_cm = float(body.get("height_cm", 0))
 
-        fig = self.bmi_time_fig
+        # Sestavení dostane snímek měření období (bez budoucích) – může běžet i ve vlákně na pozadí
+        series = self.get_weight_series()
+        now = datetime.now()
+        measurements = [(dt, float(e.get("value", 0.0))) for dt, e in series.between(start_dt, min(end_dt, now))]
+        has_history = len(series) > 0
+        key = (
+            "bmi_time", mode, period_mode, start_dt, end_dt, height_cm,
+            self.body_metrics_revision, now.date(),
+        )
+        self.bmi_time_canvas.render_chart(
+            key,
+            lambda fig: self.draw_bmi_time_chart(
+                fig, mode, start_dt, end_dt, period_label, measurements, has_history, height_cm
+            ),
+        )
+
+    def draw_bmi_time_chart(self, fig, mode, start_dt, end_dt, period_label, measurements, has_history, height_cm):
+        """
+        Sestaví časový graf váhy/BMI do `fig` (bez widgetů a živých dat, lze volat mimo GUI vlákno).
+
+        measurements = [(datetime, váha)] měření v období, seřazená od nejstaršího.
+        """
+        import matplotlib.dates as mdates
+        import numpy as np
+
         fig.clear()
         fig.patch.set_facecolor("#121212")
 
@@ -3015,52 +7100,21 @@ class FitnessTrackerApp(QMainWindow):
 
         style_axes(ax_weight)
 
-        if not history or height_cm <= 0:
+        if not has_history or height_cm <= 0:
             ax_weight.set_title("Zatím nejsou žádná měření nebo není nastavena výška.")
             ax_weight.set_xlabel("Datum")
             ax_weight.set_ylabel("Hodnota")
-            self.bmi_time_canvas.draw()
             return
 
-        now = datetime.now()
-
-        # Připrav platná měření (bez budoucnosti, pouze v daném období)
-        all_times: list[datetime] = []
-        all_weights: list[float] = []
-        all_bmis: list[float] = []
-
-        for entry in sorted(history, key=lambda e: e.get("timestamp", "") or e.get("date", "")):
-            ts = entry.get("timestamp")
-            dt = None
-            if ts:
-                try:
-                    dt = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    dt = None
-            if dt is None:
-                date_str = entry.get("date", "")
-                try:
-                    dt = datetime.strptime(date_str, "%Y-%m-%d")
-                except Exception:
-                    continue
-
-            if dt > now:
-                continue
-            if dt < start_dt or dt > end_dt:
-                continue
-
-            w = float(entry.get("value", 0.0))
-            bmi_val = self.calculate_bmi(w, height_cm)
-
-            all_times.append(dt)
-            all_weights.append(w)
-            all_bmis.append(bmi_val)
+        # Měření období (vybraná a seřazená už v update_bmi_time_chart)
+        all_times: list[datetime] = [dt for dt, _w in measurements]
+        all_weights: list[float] = [w for _dt, w in measurements]
+        all_bmis: list[float] = [self.calculate_bmi(w, height_cm) for w in all_weights]
 
         if not all_times:
             ax_weight.set_title(f"V období {period_label} nejsou žádná měření.")
             ax_weight.set_xlabel("Datum")
             ax_weight.set_ylabel("Hodnota")
-            self.bmi_time_canvas.draw()
             return
 
         ax_weight.xaxis.set_major_formatter(mdates.DateFormatter("%d.%m.%Y"))
@@ -3076,55 +7130,18 @@ class FitnessTrackerApp(QMainWindow):
         bmis = all_bmis
 
         # Původní x v číslech (datenum) – použijeme pro váhu i BMI
-        xs_raw = [mdates.date2num(t) for t in times]
-
-        # Pomocná funkce pro hladkou křivku (Catmull-Rom spline)
-        def smooth_curve(xs_num: list[float], ys_vals: list[float], points_per_segment: int = 20):
-            """Vrátí zahuštěné (x,y) body hladké křivky přes zadané body."""
-            n = len(xs_num)
-            if n < 3:
-                # Příliš málo bodů – vrať jen původní data (bez vyhlazení)
-                xs_arr = np.array(xs_num, dtype=float)
-                ys_arr = np.array(ys_vals, dtype=float)
-                return xs_arr, ys_arr
-
-            xs_arr = np.array(xs_num, dtype=float)
-            ys_arr = np.array(ys_vals, dtype=float)
-
-            # Body P = (x,y)
-            P = np.stack([xs_arr, ys_arr], axis=1)
-
-            result_points = []
-
-            for i in range(n - 1):
-                # P0,P1,P2,P3 pro segment mezi P1 a P2
-                P1 = P[i]
-                P2 = P[i + 1]
-                P0 = P[i - 1] if i - 1 >= 0 else P1
-                P3 = P[i + 2] if i + 2 < n else P2
-
-                # Parametr t v [0,1]
-                if i < n - 2:
-                    ts = np.linspace(0.0, 1.0, points_per_segment, endpoint=False)
-                else:
-                    # poslední segment včetně konce
-                    ts = np.linspace(0.0, 1.0, points_per_segment, endpoint=True)
-
-                for t in ts:
-                    t2 = t * t
-                    t3 = t2 * t
-                    # Catmull-Rom: 0.5 * (2P1 + (-P0+P2)t + (2P0-5P1+4P2-P3)t^2 + (-P0+3P1-3P2+P3)t^3)
-                    term1 = 2.0 * P1
-                    term2 = (-P0 + P2) * t
-                    term3 = (2.0 * P0 - 5.0 * P1 + 4.0 * P2 - P3) * t2
-                    term4 = (-P0 + 3.0 * P1 - 3.0 * P2 + P3) * t3
-                    point = 0.5 * (term1 + term2 + term3 + term4)
-                    result_points.append(point)
-
-            result_points = np.array(result_points)
-            xs_s = result_points[:, 0]
-            ys_s = result_points[:, 1]
-            return xs_s, ys_s
+        xs_raw = mdates.date2num(times)
+
+        # Úroveň detailu podle šířky osy: víc měření než pixelů se proředí (LTTB)
+        # a zahuštění křivek se omezí na rozpočet vrcholů
+        plot_px = SeriesDownsampler.axes_pixels(fig)
+        if len(times) > plot_px:
+            keep = SeriesDownsampler.lttb(xs_raw, weights, int(plot_px))
+            times = [times[i] for i in keep]
+            weights = [weights[i] for i in keep]
+            bmis = [bmis[i] for i in keep]
+            xs_raw = xs_raw[keep]
+        smooth_pps = SeriesDownsampler.points_per_segment(len(times), plot_px, 20)
 
         weight_line = None
         bmi_line = None
@@ -3132,11 +7149,10 @@ class FitnessTrackerApp(QMainWindow):
 
         # Váha – hladká křivka (modrá)
         if mode in ("Váha", "Obojí"):
-            xs_weight_smooth, weights_smooth = smooth_curve(xs_raw, weights, points_per_segment=20)
-            times_weight_smooth = [mdates.num2date(x) for x in xs_weight_smooth]
+            xs_weight_smooth, weights_smooth = CurveSmoothing.catmull_rom(xs_raw, weights, points_per_segment=smooth_pps)
 
             (weight_line,) = ax_weight.plot(
-                times_weight_smooth,
+                xs_weight_smooth,
                 weights_smooth,
                 linestyle="-",
                 linewidth=1.8,
@@ -3146,8 +7162,8 @@ class FitnessTrackerApp(QMainWindow):
             ax_weight.set_ylabel("Váha [kg]")
             
             # Nastavení limitů osy pro váhu
-            min_w = min(weights)
-            max_w = max(weights)
+            min_w = min(all_weights)
+            max_w = max(all_weights)
             margin_w = max(1.0, (max_w - min_w) * 0.1)
             ax_weight.set_ylim(min_w - margin_w, max_w + margin_w)
 
@@ -3162,26 +7178,42 @@ class FitnessTrackerApp(QMainWindow):
                 ax_for_bmi = ax_weight
 
             # Hladká křivka BMI
-            xs_bmi_smooth, bmis_smooth = smooth_curve(xs_raw, bmis, points_per_segment=20)
+            xs_bmi_smooth, bmis_smooth = CurveSmoothing.catmull_rom(xs_raw, bmis, points_per_segment=smooth_pps)
 
             # Hraniční BMI hodnoty mezi zónami
-            zone_thresholds = [18.5, 25.0, 30.0, 35.0]
-
-            segments: list[list[list[float]]] = []
-            seg_colors: list[str] = []
+            zone_thresholds = BMI_THRESHOLDS
 
             if len(xs_bmi_smooth) > 1:
-                for i in range(len(xs_bmi_smooth) - 1):
+                # Úseky mezi sousedními vzorky; barva podle středu úseku
+                y0s, y1s = bmis_smooth[:-1], bmis_smooth[1:]
+                all_segments = np.stack(
+                    [np.column_stack([xs_bmi_smooth[:-1], y0s]), np.column_stack([xs_bmi_smooth[1:], y1s])],
+                    axis=1,
+                )
+                mids = (y0s + y1s) / 2.0
+                # Stejné kategorie jako get_bmi_category, jen vektorově
+                all_colors = np.select(
+                    [mids <= 0] + [mids < thr for thr in zone_thresholds],
+                    [BMI_UNDEFINED[1]] + [color for _upper, _name, _label, color in BMI_CATEGORIES[:-1]],
+                    BMI_CATEGORIES[-1][3],
+                )
+                lo, hi = np.minimum(y0s, y1s), np.maximum(y0s, y1s)
+                crossing = np.zeros(len(mids), dtype=bool)
+                for thr in zone_thresholds:
+                    crossing |= (lo < thr) & (thr < hi)
+
+                # Úseky přes hranici zóny se rozdělí v průsečících (těch je málo)
+                segments = []
+                seg_colors: list[str] = []
+                prev = 0
+                for i in np.flatnonzero(crossing):
+                    segments.extend(all_segments[prev:i])
+                    seg_colors.extend(all_colors[prev:i])
+                    prev = i + 1
+
                     x0, y0 = float(xs_bmi_smooth[i]), float(bmis_smooth[i])
                     x1, y1 = float(xs_bmi_smooth[i + 1]), float(bmis_smooth[i + 1])
 
-                    if y0 == y1:
-                        mid_bmi = y0
-                        _, col = self.get_bmi_category(mid_bmi)
-                        segments.append([[x0, y0], [x1, y1]])
-                        seg_colors.append(col)
-                        continue
-
                     # Najdi průsečíky s prahy mezi y0 a y1
                     crossings = []
                     for thr in zone_thresholds:
@@ -3204,6 +7236,8 @@ class FitnessTrackerApp(QMainWindow):
                         _, col = self.get_bmi_category(mid_bmi)
                         segments.append([[xa, ya], [xb, yb]])
                         seg_colors.append(col)
+                segments.extend(all_segments[prev:])
+                seg_colors.extend(all_colors[prev:])
 
                 bmi_collection = LineCollection(
                     segments,
@@ -3227,34 +7261,26 @@ class FitnessTrackerApp(QMainWindow):
 
             # Fixní osa Y pro BMI: 20-35 (nebo širší dle dat)
             if len(bmis) > 0:
-                real_min = min(bmis)
-                real_max = max(bmis)
+                real_min = min(all_bmis)
+                real_max = max(all_bmis)
                 target_min = min(20.0, real_min - 0.5)
                 target_max = max(35.0, real_max + 0.5)
                 ax_for_bmi.set_ylim(target_min, target_max)
         else:
             ax_bmi = None
 
-        # Barevné body podle BMI kategorie (na původních měřeních)
-        for t, w, bmi_val in zip(times, weights, bmis):
-            _, color = self.get_bmi_category(bmi_val)
-            if mode in ("Váha", "Obojí") and weight_line is not None:
-                ax_weight.scatter([t], [w], color=color, s=30, zorder=5)
-            if mode in ("BMI", "Obojí") and bmi_line is not None:
-                target_ax = ax_bmi if ax_bmi is not None else ax_weight
-                target_ax.scatter([t], [bmi_val], color=color, s=30, zorder=6)
+        # Barevné body podle BMI kategorie (na původních měřeních) – jedna kolekce na osu
+        point_colors = [self.get_bmi_category(bmi_val)[1] for bmi_val in bmis]
+        if mode in ("Váha", "Obojí") and weight_line is not None:
+            ax_weight.scatter(xs_raw, weights, color=point_colors, s=30, zorder=5)
+        if mode in ("BMI", "Obojí") and bmi_line is not None:
+            target_ax = ax_bmi if ax_bmi is not None else ax_weight
+            target_ax.scatter(xs_raw, bmis, color=point_colors, s=30, zorder=6)
 
         # BMI zóny – horizontální pásy
         if mode in ("BMI", "Obojí"):
             target_ax = ax_bmi if ax_bmi is not None else ax_weight
-            bmi_zones = [
-                (0.0, 18.5, "Podváha", "#4ea5ff"),
-                (18.5, 25.0, "Normální", "#32c766"),
-                (25.0, 30.0, "Nadváha", "#ffc107"),
-                (30.0, 35.0, "Obezita I", "#ff7043"),
-                (35.0, 50.0, "Obezita II+", "#ff1744"),
-            ]
-            for start_b, end_b, label_b, color_b in bmi_zones:
+            for start_b, end_b, label_b, color_b in bmi_zones(0.0, 50.0):
                 target_ax.axhspan(start_b, end_b, alpha=0.08, color=color_b)
 
         # Titulek podle režimu + období
@@ -3300,16 +7326,21 @@ class FitnessTrackerApp(QMainWindow):
             )
             legend.get_frame().set_alpha(0.9)
 
-        # Překreslení
         fig.tight_layout()
-        self.bmi_time_canvas.draw()
 
     def update_bmi_zones_chart(self):
         """„Vědecký“ graf BMI zón s vyznačením aktuálního BMI."""
         if not hasattr(self, "bmi_zones_fig") or not hasattr(self, "bmi_zones_canvas"):
             return
 
-        fig = self.bmi_zones_fig
+        current_bmi = self.get_latest_bmi()
+        self.bmi_zones_canvas.render_chart(
+            ("bmi_zones", current_bmi),
+            lambda fig: self.draw_bmi_zones_chart(fig, current_bmi),
+        )
+
+    def draw_bmi_zones_chart(self, fig, current_bmi):
+        """Sestaví graf BMI zón do `fig` (lze volat mimo GUI vlákno)."""
         fig.clear()
         fig.patch.set_facecolor("#121212")
 
@@ -3328,15 +7359,7 @@ class FitnessTrackerApp(QMainWindow):
         for spine in ax.spines.values():
             spine.set_color("#e0e0e0")
 
-        zones = [
-            (10.0, 18.5, "Podváha", "#4ea5ff"),
-            (18.5, 25.0, "Normální", "#32c766"),
-            (25.0, 30.0, "Nadváha", "#ffc107"),
-            (30.0, 35.0, "Obezita I", "#ff7043"),
-            (35.0, 40.0, "Obezita II+", "#ff1744"),
-        ]
-
-        for start, end, label, color in zones:
+        for start, end, label, color in bmi_zones(min_bmi, max_bmi):
             ax.axvspan(start, end, color=color, alpha=0.4)
             ax.text(
                 (start + end) / 2.0,
@@ -3349,7 +7372,6 @@ class FitnessTrackerApp(QMainWindow):
                 fontweight="bold"
             )
 
-        current_bmi = self.get_latest_bmi()
         if current_bmi > 0:
             category, color = self.get_bmi_category(current_bmi)
             x = max(min(current_bmi, max_bmi), min_bmi)
@@ -3369,8 +7391,6 @@ class FitnessTrackerApp(QMainWindow):
             title = "BMI zóny (zatím žádné měření)"
 
         ax.set_title(title, color="#e0e0e0")
-
-        self.bmi_zones_canvas.draw()
         
     def inject_about_updates(self):
         """
@@ -3443,24 +7463,10 @@ class FitnessTrackerApp(QMainWindow):
             "id": str(uuid.uuid4()),
             "note": ""
         })
+        self.mark_workout_day_changed(exercise_type, selected_date_str)
 
-        self.save_data()
-
-        # Aktualizuj všechny záložky
-        active_exercises = self.get_active_exercises()
-        for exercise in active_exercises:
-            self.update_exercise_tab(exercise)
-            self.refresh_exercise_calendar(exercise)
-            # >>> DOPLNĚNO: hned přegeneruj i graf (zachová aktuální mód)
-            mode = self.chart_modes.get(exercise, "weekly") if hasattr(self, "chart_modes") else "weekly"
-            self.update_performance_chart(exercise, mode)
-
-        # (8.0.4) BMI plán se má přepočítat pouze při změně dat (ne při změně data v add tabu)
-        self.recompute_bmi_plan()
-
-        self.refresh_add_tab_goals()
-        self.apply_add_tab_goals_gradient()
-        self.apply_weekly_plan_gradient()
+        # Překreslí se jen záložka tohoto cvičení (+ Přidat výkon)
+        self.notify_data_changed("workouts", exercise_type, selected_date_str)
 
         config = self.get_exercise_config(exercise_type)
         self.show_message("Přidáno", f"Výkon byl zaznamenán:\n{value}× {config['name']}")
@@ -3502,26 +7508,17 @@ class FitnessTrackerApp(QMainWindow):
                 "id": str(uuid.uuid4()),
                 "note": ""
             })
+            self.mark_workout_day_changed(exercise_id, selected_date_str)
 
             config = self.get_exercise_config(exercise_id)
             added.append(f"{val}× {config['name']}")
 
-        self.save_data()
 
-        # Aktualizuj všechny záložky + GRAFY
-        for exercise in active_exercises:
-            self.update_exercise_tab(exercise)
-            self.refresh_exercise_calendar(exercise)
+        # Překreslí se jen záložky cvičení, do kterých se přidávalo
+        self.notify_data_changed("workouts", list(values), selected_date_str)
+        for exercise in values:
             self.expand_today_in_exercise_tree(exercise)
-            mode = self.chart_modes.get(exercise, "weekly") if hasattr(self, "chart_modes") else "weekly"
-            self.update_performance_chart(exercise, mode)
-
-        # (8.0.4) BMI plán se má přepočítat pouze při změně dat (ne při změně data v add tabu)
-        self.recompute_bmi_plan()
 
-        self.refresh_add_tab_goals()
-        self.apply_add_tab_goals_gradient()
-        self.apply_weekly_plan_gradient()
         self.show_message("Přidáno", f"Výkony zaznamenány:\n" + "\n".join(added))
 
         # Reset všech SpinBoxů
@@ -4005,8 +8002,9 @@ class FitnessTrackerApp(QMainWindow):
     
         # ==================== GRAF (dole přes celou šířku) ====================
         self.bmi_plan_fig = Figure(figsize=(10, 4), facecolor="#121212")
-        self.bmi_plan_canvas = FigureCanvas(self.bmi_plan_fig)
+        self.bmi_plan_canvas = CachedChartCanvas(self.bmi_plan_fig, self.chart_rasterizer)
         self.bmi_plan_canvas.setStyleSheet("background-color: #121212;")
+        self.bmi_plan_canvas.mpl_connect("motion_notify_event", self.on_bmi_plan_hover)
         self.bmi_plan_canvas.setMinimumHeight(350)
         self.bmi_plan_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         layout.addWidget(self.bmi_plan_canvas, 1)
@@ -4074,7 +8072,7 @@ class FitnessTrackerApp(QMainWindow):
                 self.data['app_state'] = {}
             self.data['app_state']['bmi_plan'] = plan
 
-            self.save_data()
+            self.record_change('app_state', 'bmi_plan')
         except Exception as e:
             # Nechceme blokovat UI kvůli perzistenci
             print(f"_persist_bmi_plan_settings: {e}")
@@ -4097,7 +8095,7 @@ class FitnessTrackerApp(QMainWindow):
             if 'app_state' not in self.data or not isinstance(self.data['app_state'], dict):
                 self.data['app_state'] = {}
             self.data['app_state']['plan_start_date'] = ds
-            self.save_data()
+            self.record_change('app_state', 'plan_start_date')
         except Exception as e:
             # Nechceme brzdit UI kvůli perzistenci
             print(f"_persist_plan_start_date: {e}")
@@ -4131,16 +8129,12 @@ class FitnessTrackerApp(QMainWindow):
         if height_cm <= 0:
             return None, None, None
 
-        history = body.get("weight_history", [])
-        if not history:
+        # Poslední záznam podle timestampu (nebo date) = konec seřazené historie
+        latest = self.get_weight_series().latest()
+        if latest is None:
             return None, height_cm, None
 
-        # Najdi poslední záznam podle timestampu (nebo date)
         try:
-            latest = max(
-                history,
-                key=lambda e: e.get("timestamp", "") or e.get("date", ""),
-            )
             weight_raw = latest.get("value", 0.0)
             weight = float(weight_raw)
         except Exception:
@@ -4163,50 +8157,29 @@ class FitnessTrackerApp(QMainWindow):
         if not workouts:
             return {}
     
-        all_dates: list[datetime.date] = []
-        for date_str in workouts.keys():
-            try:
-                d = datetime.strptime(date_str, "%Y-%m-%d").date()
-                all_dates.append(d)
-            except ValueError:
-                continue
-    
-        if not all_dates:
-            return {}
-    
         # (4.6.0) Fix: baseline má reprezentovat "výchozí" historii, ne průběžně růst s přidávanými výkony v plánu.
         # Proto počítáme baseline pouze z dat před začátkem plánu (den před startem).
+        cutoff = None
         try:
             if hasattr(self, "bmi_plan_start_date_edit"):
                 ds = self.bmi_plan_start_date_edit.date().toString("yyyy-MM-dd")
                 plan_start = datetime.strptime(ds, "%Y-%m-%d").date()
                 cutoff = plan_start - timedelta(days=1)
-                all_dates = [d for d in all_dates if d <= cutoff]
         except Exception:
             pass
     
-        if not all_dates:
+        last_ordinal = self.workout_store.last_ordinal(up_to=cutoff)
+        if last_ordinal is None:
             return {}
     
-        max_date = max(all_dates)
+        max_date = datetime.fromordinal(last_ordinal).date()
         min_date = max_date - timedelta(days=weeks * 7 - 1)
     
         totals: dict[str, float] = {}
-    
-        current = min_date
-        while current <= max_date:
-            date_key = current.strftime("%Y-%m-%d")
-            day_data = workouts.get(date_key)
-            if day_data:
-                for exercise_id, records in day_data.items():
-                    value = 0.0
-                    if isinstance(records, list):
-                        value = sum(float(r.get("value", 0.0)) for r in records)
-                    elif isinstance(records, dict):
-                        value = float(records.get("value", 0.0))
-                    if value:
-                        totals[exercise_id] = totals.get(exercise_id, 0.0) + value
-            current += timedelta(days=1)
+        for exercise_id in self.workout_store.exercise_ids():
+            value = float(self.workout_store.range_sum(exercise_id, min_date, max_date))
+            if value:
+                totals[exercise_id] = value
     
         period_days = (max_date - min_date).days + 1
         if period_days <= 0:
@@ -4228,8 +8201,6 @@ class FitnessTrackerApp(QMainWindow):
         self.bmi_plan_tree.clear()
         if hasattr(self, "bmi_plan_weeks_tree"):
             self.bmi_plan_weeks_tree.clear()
-        if hasattr(self, "bmi_plan_fig"):
-            self.bmi_plan_fig.clear()
     
         weight_now, height_cm, bmi_now = self.get_current_weight_and_bmi()
         if height_cm is None or weight_now is None or bmi_now is None:
@@ -4238,7 +8209,7 @@ class FitnessTrackerApp(QMainWindow):
                 "a alespoň jedno měření váhy v záložce „BMI & váha“."
             )
             if hasattr(self, "bmi_plan_canvas"):
-                self.bmi_plan_canvas.draw()
+                self.bmi_plan_canvas.render_chart(("plan_empty",), lambda fig: fig.clear())
             return
     
         target_bmi = float(self.bmi_plan_target_spin.value())
@@ -4383,8 +8354,6 @@ class FitnessTrackerApp(QMainWindow):
             return
     
         from datetime import datetime, timedelta
-        import matplotlib.dates as mdates
-        import matplotlib.pyplot as plt
         from PySide6.QtGui import QColor, QBrush
         from PySide6.QtCore import Qt
         import math
@@ -4499,8 +8468,83 @@ class FitnessTrackerApp(QMainWindow):
     
         if not hasattr(self, "bmi_plan_fig") or not hasattr(self, "bmi_plan_canvas"):
             return
-    
-        fig = self.bmi_plan_fig
+
+        # Denní body grafu (GUI vlákno); sestavení grafu pak může běžet na pozadí
+        horizon_days = max(1, int(horizon_weeks) * 7)
+        xs_days: list[datetime.date] = []
+        ys_days: list[float] = []
+
+        start_d = monday0
+        end_d = monday0 + timedelta(days=horizon_days - 1)
+
+        # Denní součty jen za období plánu (sloupcový index, ne průchod celou historií)
+        daily_totals_by_ex = {
+            exercise_id: self.workout_store.daily_totals(exercise_id, start_d, end_d)
+            for exercise_id in active_exercises
+        }
+
+        current_week_start = start_d
+        while current_week_start <= end_d:
+            current_week_end = min(current_week_start + timedelta(days=6), end_d)
+            running_by_ex = {ex: 0.0 for ex in active_exercises}
+
+            d = current_week_start
+            while d <= current_week_end:
+                day_index = (d - start_d).days
+                for ex in active_exercises:
+                    running_by_ex[ex] += float(daily_totals_by_ex[ex][day_index])
+
+                day_percent_sum = 0.0
+                day_percent_count = 0
+                for ex in active_exercises:
+                    plan_week = float(planned_weekly.get(ex, 0.0) or 0.0)
+                    if plan_week <= 0.0:
+                        percent = 0.0
+                    else:
+                        percent = (running_by_ex[ex] / plan_week) * 100.0
+                    percent = max(0.0, min(200.0, percent))
+                    day_percent_sum += percent
+                    day_percent_count += 1
+
+                avg_percent = (day_percent_sum / day_percent_count) if day_percent_count else 0.0
+                xs_days.append(d)
+                ys_days.append(avg_percent)
+
+                d += timedelta(days=1)
+            current_week_start = current_week_start + timedelta(days=7)
+
+        # Kontext tooltipu bodů grafu (viz on_bmi_plan_hover)
+        self.bmi_plan_hover_context = {
+            "monday0": monday0,
+            "start_d": start_d,
+            "horizon_weeks": horizon_weeks,
+            "active_exercises": list(active_exercises),
+            "planned_weekly": dict(planned_weekly),
+            "daily_totals_by_ex": daily_totals_by_ex,
+        }
+
+        smooth_key = (
+            "plan",
+            self.data_revision,
+            monday0,
+            horizon_weeks,
+            tuple(active_exercises),
+            tuple(sorted(planned_weekly.items())),
+        )
+        self.bmi_plan_canvas.render_chart(
+            smooth_key,
+            lambda fig: self.draw_bmi_plan_chart(fig, monday0, horizon_weeks, start_d, end_d, xs_days, ys_days, smooth_key),
+        )
+
+    def draw_bmi_plan_chart(self, fig, monday0, horizon_weeks, start_d, end_d, xs_days, ys_days, smooth_key):
+        """
+        Sestaví graf plnění plánu do `fig` (bez widgetů a živých dat, lze volat mimo GUI vlákno).
+
+        Vrátí rozložení osy a body grafu pro tooltip (viz on_bmi_plan_hover), bez bodů None.
+        """
+        import matplotlib.dates as mdates
+        import numpy as _np
+
         fig.clear()
         ax = fig.add_subplot(111)
         ax.set_facecolor("#121212")
@@ -4542,317 +8586,47 @@ class FitnessTrackerApp(QMainWindow):
                 alpha=0.10,
                 zorder=0,
             )
-    
-        if True:
-            from collections import defaultdict
-            import numpy as _np
-            from scipy.interpolate import PchipInterpolator
-    
-            daily_totals_by_ex: dict[str, dict[str, float]] = {}
-            for exercise_id in active_exercises:
-                m: dict[str, float] = defaultdict(float)
-                for ds, perday in (workouts or {}).items():
-                    recs = perday.get(exercise_id)
-                    if isinstance(recs, list):
-                        for r in recs:
-                            try:
-                                m[ds] += float(r.get("value", 0) or 0.0)
-                            except Exception:
-                                pass
-                    elif isinstance(recs, dict):
-                        try:
-                            m[ds] += float(recs.get("value", 0) or 0.0)
-                        except Exception:
-                            pass
-                daily_totals_by_ex[exercise_id] = m
-    
-            horizon_days = max(1, int(horizon_weeks) * 7)
-            xs_days: list[datetime.date] = []
-            ys_days: list[float] = []
-    
-            start_d = monday0
-            end_d = monday0 + timedelta(days=horizon_days - 1)
-    
-            current_week_start = start_d
-            while current_week_start <= end_d:
-                current_week_end = min(current_week_start + timedelta(days=6), end_d)
-                running_by_ex = {ex: 0.0 for ex in active_exercises}
-    
-                d = current_week_start
-                while d <= current_week_end:
-                    ds = d.strftime("%Y-%m-%d")
-                    for ex in active_exercises:
-                        running_by_ex[ex] += daily_totals_by_ex.get(ex, {}).get(ds, 0.0)
-    
-                    day_percent_sum = 0.0
-                    day_percent_count = 0
-                    for ex in active_exercises:
-                        plan_week = float(planned_weekly.get(ex, 0.0) or 0.0)
-                        if plan_week <= 0.0:
-                            percent = 0.0
-                        else:
-                            percent = (running_by_ex[ex] / plan_week) * 100.0
-                        percent = max(0.0, min(200.0, percent))
-                        day_percent_sum += percent
-                        day_percent_count += 1
-    
-                    avg_percent = (day_percent_sum / day_percent_count) if day_percent_count else 0.0
-                    xs_days.append(d)
-                    ys_days.append(avg_percent)
-    
-                    d += timedelta(days=1)
-                current_week_start = current_week_start + timedelta(days=7)
-    
-            if xs_days and len(xs_days) > 1:
-                xs_nums = mdates.date2num(xs_days)
-                ys_nums = _np.array(ys_days)
-    
-                x_smooth = _np.linspace(xs_nums.min(), xs_nums.max(), len(xs_nums) * 5)
-                try:
-                    interpolator = PchipInterpolator(xs_nums, ys_nums)
-                    y_smooth = interpolator(x_smooth)
-                    ax.plot(x_smooth, y_smooth, color="#14919b", linewidth=2, alpha=0.8, label="Průběh plnění")
-                except Exception:
-                    ax.plot(xs_nums, ys_nums, color="#14919b", linewidth=2, alpha=0.8, label="Průběh plnění")
-    
-                sc = ax.scatter(xs_nums, ys_nums, color="#00e5ff", s=15, zorder=3)
-    
-                try:
-                    sc.set_pickradius(10)
-                except Exception:
-                    pass
-    
-                week_starts = [monday0 + timedelta(days=7*i) for i in range(horizon_weeks + 1)]
-                for ws in week_starts:
-                    if ws > end_d:
-                        break
-                    ax.axvline(x=mdates.date2num(ws), color="#555555", linestyle="-", linewidth=1.5, alpha=0.8)
-    
-                ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-                ax.xaxis.set_major_formatter(mdates.DateFormatter("%d.%m."))
-                ax.grid(True, which="major", axis="x", color="#2d2d2d", linestyle=":", alpha=0.3)
-                plt.setp(ax.get_xticklabels(), rotation=90, ha="center", fontsize=8)
-    
-                _hover_state = {"miss": 0}
-    
-                def _ensure_hover_label():
-                    if hasattr(self, "_bmi_hover_label") and self._bmi_hover_label is not None:
-                        return self._bmi_hover_label
-                    try:
-                        from PySide6.QtWidgets import QLabel
-                        from PySide6.QtCore import Qt
-                    except Exception:
-                        return None
-    
-                    lbl = QLabel(None)
-                    lbl.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-                    lbl.setTextFormat(Qt.PlainText)
-                    lbl.setWordWrap(True)
-                    lbl.setStyleSheet(
-                        "QLabel {"
-                        " background-color: #1e1e1e;"
-                        " color: #ffffff;"
-                        " border: 1px solid #14919b;"
-                        " border-radius: 6px;"
-                        " padding: 6px;"
-                        "}"
-                    )
-                    try:
-                        lbl.setAttribute(Qt.WA_ShowWithoutActivating, True)
-                    except Exception:
-                        pass
-                    try:
-                        lbl.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-                    except Exception:
-                        pass
-                    try:
-                        lbl.setFocusPolicy(Qt.NoFocus)
-                    except Exception:
-                        pass
-    
-                    self._bmi_hover_label = lbl
-                    return lbl
-    
-                def _build_tooltip(date_obj, percent_val):
-                    cz_days = ["Po", "Út", "St", "Čt", "Pá", "So", "Ne"]
-                    try:
-                        day_name = cz_days[date_obj.weekday()]
-                    except Exception:
-                        day_name = ""
-                    lines = []
-                    lines.append(f"{day_name} {date_obj.strftime('%d.%m.%Y')}")
-                    lines.append(f"Plnění: {float(percent_val):.1f} %")
-    
-                    plan_week_num = None
-                    day_in_week = None
-                    ws = None
-                    we = None
-                    try:
-                        delta = (date_obj - monday0).days
-                        if delta >= 0:
-                            plan_week_num = (delta // 7) + 1
-                            day_in_week = (delta % 7) + 1
-                            ws = monday0 + timedelta(days=7 * (plan_week_num - 1))
-                            we = ws + timedelta(days=6)
-                    except Exception:
-                        pass
-    
-                    if plan_week_num is not None and day_in_week is not None:
-                        lines.append(f"Týden plánu: {plan_week_num}/{int(horizon_weeks) if horizon_weeks else 0}  |  Den v týdnu: {day_in_week}/7")
-                    if ws is not None and we is not None:
-                        lines.append(f"Rozsah týdne: {ws.strftime('%d.%m.%Y')} – {we.strftime('%d.%m.%Y')}")
-    
-                    if date_obj == today:
-                        today_str = date_obj.strftime("%Y-%m-%d")
-    
-                        lines.append("")
-                        lines.append("Dnes zbývá do denní potřeby:")
-                        for ex_id in active_exercises:
-                            plan_week = float(planned_weekly.get(ex_id, 0.0) or 0.0)
-                            daily_need = math.ceil(plan_week / 7) if plan_week > 0 else 0
-                            done_today = float(daily_totals_by_ex.get(ex_id, {}).get(today_str, 0.0) or 0.0)
-                            remaining_today = daily_need - done_today
-                            if remaining_today < 0:
-                                remaining_today = 0
-                            cfg = self.get_exercise_config(ex_id)
-                            try:
-                                rem_disp = int(math.ceil(remaining_today))
-                            except Exception:
-                                rem_disp = remaining_today
-                            lines.append(f"{cfg.get('icon','')} {cfg.get('name','')}: {rem_disp}")
-    
-                        if ws is not None:
-                            lines.append("")
-                            lines.append("Tento týden zbývá do týdenního plánu:")
-                            for ex_id in active_exercises:
-                                plan_week = float(planned_weekly.get(ex_id, 0.0) or 0.0)
-                                done_week = 0.0
-                                try:
-                                    d_it = ws
-                                    while d_it <= date_obj:
-                                        ds_it = d_it.strftime("%Y-%m-%d")
-                                        done_week += float(daily_totals_by_ex.get(ex_id, {}).get(ds_it, 0.0) or 0.0)
-                                        d_it += timedelta(days=1)
-                                except Exception:
-                                    done_week = 0.0
-                                remaining_week = plan_week - done_week
-                                if remaining_week < 0:
-                                    remaining_week = 0
-                                cfg = self.get_exercise_config(ex_id)
-                                try:
-                                    remw_disp = int(math.ceil(remaining_week))
-                                except Exception:
-                                    remw_disp = remaining_week
-                                lines.append(f"{cfg.get('icon','')} {cfg.get('name','')}: {remw_disp}")
-    
-                    return "\n".join(lines)
-    
-                def hover(event):
-                    lbl = _ensure_hover_label()
-    
-                    if event.inaxes == ax:
-                        cont, ind = sc.contains(event)
-                        if cont and lbl is not None:
-                            _hover_state["miss"] = 0
-                            i0 = ind["ind"][0]
-                            pos = sc.get_offsets()[i0]
-                            date_num = pos[0]
-                            val = pos[1]
-    
-                            d_only = None
-                            try:
-                                d_only = mdates.num2date(date_num).date()
-                            except Exception:
-                                d_only = None
-    
-                            if d_only is not None:
-                                tt = _build_tooltip(d_only, val)
-                                try:
-                                    lbl.setText(tt)
-                                    lbl.adjustSize()
-                                    from PySide6.QtGui import QCursor, QGuiApplication
-                                    from PySide6.QtCore import QPoint
-    
-                                    cur = QCursor.pos()
-                                    x = int(cur.x() + 16)
-                                    y = int(cur.y() + 16)
-    
-                                    # ✅ (4.7.1) clamp tooltip do viditelné části obrazovky
-                                    try:
-                                        scr = None
-                                        try:
-                                            scr = QGuiApplication.screenAt(cur)
-                                        except Exception:
-                                            scr = None
-                                        if scr is None:
-                                            try:
-                                                scr = QGuiApplication.primaryScreen()
-                                            except Exception:
-                                                scr = None
-                                        if scr is not None:
-                                            geom = scr.availableGeometry()
-                                            pad = 6
-                                            w = int(lbl.width())
-                                            h = int(lbl.height())
-    
-                                            if x + w > geom.right() - pad:
-                                                x = int(geom.right() - pad - w)
-                                            if x < geom.left() + pad:
-                                                x = int(geom.left() + pad)
-    
-                                            if y + h > geom.bottom() - pad:
-                                                y = int(cur.y() - 16 - h)
-                                            if y < geom.top() + pad:
-                                                y = int(geom.top() + pad)
-                                    except Exception:
-                                        pass
-    
-                                    lbl.move(QPoint(x, y))
-                                    lbl.show()
-                                    lbl.raise_()
-                                except Exception:
-                                    pass
-                            fig.canvas.draw_idle()
-                        else:
-                            _hover_state["miss"] += 1
-                            if _hover_state["miss"] >= 8:
-                                try:
-                                    if lbl is not None:
-                                        lbl.hide()
-                                except Exception:
-                                    pass
-                    else:
-                        _hover_state["miss"] += 1
-                        if _hover_state["miss"] >= 8:
-                            try:
-                                if lbl is not None:
-                                    lbl.hide()
-                            except Exception:
-                                pass
-    
-                # ✅ FIX flickeru: odpoj starý handler a teprve pak připoj nový
-                try:
-                    if hasattr(self, "_bmi_hover_cid") and self._bmi_hover_cid is not None:
-                        try:
-                            fig.canvas.mpl_disconnect(self._bmi_hover_cid)
-                        except Exception:
-                            pass
-                        self._bmi_hover_cid = None
-                except Exception:
-                    pass
-    
-                try:
-                    self._bmi_hover_cid = fig.canvas.mpl_connect("motion_notify_event", hover)
-                except Exception:
-                    self._bmi_hover_cid = None
-    
+
+        points = None
+        if xs_days and len(xs_days) > 1:
+            xs_nums = mdates.date2num(xs_days)
+            ys_nums = _np.array(ys_days)
+
+            # 5 vzorků na den, nejvýš rozpočet vrcholů podle šířky grafu
+            smooth_count = min(
+                len(xs_nums) * 5,
+                int(SeriesDownsampler.axes_pixels(fig) * SeriesDownsampler.VERTICES_PER_PIXEL),
+            )
+            x_smooth = _np.linspace(xs_nums.min(), xs_nums.max(), max(smooth_count, len(xs_nums)))
+            try:
+                _, y_smooth = CurveSmoothing.monotone_cubic(
+                    xs_nums, ys_nums, x_new=x_smooth, ends="pchip", cache_key=smooth_key
+                )
+                ax.plot(x_smooth, y_smooth, color="#14919b", linewidth=2, alpha=0.8, label="Průběh plnění")
+            except Exception:
+                ax.plot(xs_nums, ys_nums, color="#14919b", linewidth=2, alpha=0.8, label="Průběh plnění")
+
+            ax.scatter(xs_nums, ys_nums, color="#00e5ff", s=15, zorder=3)
+            points = (xs_nums, ys_nums)
+
+            week_starts = [monday0 + timedelta(days=7*i) for i in range(horizon_weeks + 1)]
+            for ws in week_starts:
+                if ws > end_d:
+                    break
+                ax.axvline(x=mdates.date2num(ws), color="#555555", linestyle="-", linewidth=1.5, alpha=0.8)
+
+            ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
+            ax.xaxis.set_major_formatter(mdates.DateFormatter("%d.%m."))
+            ax.grid(True, which="major", axis="x", color="#2d2d2d", linestyle=":", alpha=0.3)
+            plt.setp(ax.get_xticklabels(), rotation=90, ha="center", fontsize=8)
+
         ax.axhline(y=100.0, color="#32CD32", linestyle="--", linewidth=1, alpha=0.5, label="Cíl 100 %")
         ax.set_title("Denní průběh plnění plánu (v rámci týdnů)")
         ax.set_ylabel("Plnění [%]")
         if xs_days:
             ax.set_xlim(left=mdates.date2num(start_d), right=mdates.date2num(end_d))
     
-        ax.set_ylim(bottom=0, top=max(110, max(ys_days) + 10) if "ys_days" in locals() and ys_days else 120)
+        ax.set_ylim(bottom=0, top=max(110, max(ys_days) + 10) if ys_days else 120)
     
         try:
             _step = 100.0 / 7.0
@@ -4878,7 +8652,231 @@ class FitnessTrackerApp(QMainWindow):
         ax.legend(loc="upper left", fontsize=8, facecolor="#1e1e1e", edgecolor="#3d3d3d", labelcolor="#e0e0e0")
     
         fig.tight_layout()
-        self.bmi_plan_canvas.draw()
+        if points is None:
+            return None
+        return {"axes": tuple(ax.get_position().bounds), "xlim": ax.get_xlim(), "ylim": ax.get_ylim(), "points": points}
+
+    def _ensure_bmi_hover_label(self):
+        if hasattr(self, "_bmi_hover_label") and self._bmi_hover_label is not None:
+            return self._bmi_hover_label
+        try:
+            from PySide6.QtWidgets import QLabel
+            from PySide6.QtCore import Qt
+        except Exception:
+            return None
+
+        lbl = QLabel(None)
+        lbl.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        lbl.setTextFormat(Qt.PlainText)
+        lbl.setWordWrap(True)
+        lbl.setStyleSheet(
+            "QLabel {"
+            " background-color: #1e1e1e;"
+            " color: #ffffff;"
+            " border: 1px solid #14919b;"
+            " border-radius: 6px;"
+            " padding: 6px;"
+            "}"
+        )
+        try:
+            lbl.setAttribute(Qt.WA_ShowWithoutActivating, True)
+        except Exception:
+            pass
+        try:
+            lbl.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+        except Exception:
+            pass
+        try:
+            lbl.setFocusPolicy(Qt.NoFocus)
+        except Exception:
+            pass
+
+        self._bmi_hover_label = lbl
+        return lbl
+
+    def bmi_plan_tooltip(self, ctx, date_obj, percent_val):
+        """Text tooltipu bodu grafu plnění plánu."""
+        import math
+
+        monday0 = ctx["monday0"]
+        horizon_weeks = ctx["horizon_weeks"]
+        active_exercises = ctx["active_exercises"]
+        planned_weekly = ctx["planned_weekly"]
+        today = datetime.now().date()
+
+        def _day_total(ex_id, day):
+            totals = ctx["daily_totals_by_ex"].get(ex_id)
+            i = (day - ctx["start_d"]).days
+            return float(totals[i]) if totals is not None and 0 <= i < len(totals) else 0.0
+
+        cz_days = ["Po", "Út", "St", "Čt", "Pá", "So", "Ne"]
+        try:
+            day_name = cz_days[date_obj.weekday()]
+        except Exception:
+            day_name = ""
+        lines = []
+        lines.append(f"{day_name} {date_obj.strftime('%d.%m.%Y')}")
+        lines.append(f"Plnění: {float(percent_val):.1f} %")
+
+        plan_week_num = None
+        day_in_week = None
+        ws = None
+        we = None
+        try:
+            delta = (date_obj - monday0).days
+            if delta >= 0:
+                plan_week_num = (delta // 7) + 1
+                day_in_week = (delta % 7) + 1
+                ws = monday0 + timedelta(days=7 * (plan_week_num - 1))
+                we = ws + timedelta(days=6)
+        except Exception:
+            pass
+
+        if plan_week_num is not None and day_in_week is not None:
+            lines.append(f"Týden plánu: {plan_week_num}/{int(horizon_weeks) if horizon_weeks else 0}  |  Den v týdnu: {day_in_week}/7")
+        if ws is not None and we is not None:
+            lines.append(f"Rozsah týdne: {ws.strftime('%d.%m.%Y')} – {we.strftime('%d.%m.%Y')}")
+
+        if date_obj == today:
+            lines.append("")
+            lines.append("Dnes zbývá do denní potřeby:")
+            for ex_id in active_exercises:
+                plan_week = float(planned_weekly.get(ex_id, 0.0) or 0.0)
+                daily_need = math.ceil(plan_week / 7) if plan_week > 0 else 0
+                done_today = _day_total(ex_id, date_obj)
+                remaining_today = daily_need - done_today
+                if remaining_today < 0:
+                    remaining_today = 0
+                cfg = self.get_exercise_config(ex_id)
+                try:
+                    rem_disp = int(math.ceil(remaining_today))
+                except Exception:
+                    rem_disp = remaining_today
+                lines.append(f"{cfg.get('icon','')} {cfg.get('name','')}: {rem_disp}")
+
+            if ws is not None:
+                lines.append("")
+                lines.append("Tento týden zbývá do týdenního plánu:")
+                for ex_id in active_exercises:
+                    plan_week = float(planned_weekly.get(ex_id, 0.0) or 0.0)
+                    done_week = 0.0
+                    try:
+                        d_it = ws
+                        while d_it <= date_obj:
+                            done_week += _day_total(ex_id, d_it)
+                            d_it += timedelta(days=1)
+                    except Exception:
+                        done_week = 0.0
+                    remaining_week = plan_week - done_week
+                    if remaining_week < 0:
+                        remaining_week = 0
+                    cfg = self.get_exercise_config(ex_id)
+                    try:
+                        remw_disp = int(math.ceil(remaining_week))
+                    except Exception:
+                        remw_disp = remaining_week
+                    lines.append(f"{cfg.get('icon','')} {cfg.get('name','')}: {remw_disp}")
+
+        return "\n".join(lines)
+
+    def bmi_plan_point_at(self, event):
+        """(datum, plnění) bodu grafu plánu pod kurzorem, jinak None.
+
+        Počítá se z rozložení os vráceného draw_bmi_plan_chart, takže funguje
+        stejně pro graf vykreslený přímo i pro obrázek z vlákna na pozadí.
+        """
+        import numpy as np
+        import matplotlib.dates as mdates
+
+        info = getattr(self.bmi_plan_canvas, "chart_info", None)
+        if not info or event.x is None or event.y is None:
+            return None
+        width, height = self.bmi_plan_fig.bbox.width, self.bmi_plan_fig.bbox.height
+        left, bottom, ax_w, ax_h = info["axes"]
+        (x0, x1), (y0, y1) = info["xlim"], info["ylim"]
+        if width <= 0 or height <= 0 or x1 == x0 or y1 == y0:
+            return None
+        # Jen uvnitř osy (jako event.inaxes)
+        fx, fy = event.x / width, event.y / height
+        if not (left <= fx <= left + ax_w and bottom <= fy <= bottom + ax_h):
+            return None
+
+        xs, ys = info["points"]
+        px = (left + (xs - x0) / (x1 - x0) * ax_w) * width
+        py = (bottom + (ys - y0) / (y1 - y0) * ax_h) * height
+        dist = (px - event.x) ** 2 + (py - event.y) ** 2
+        i = int(np.argmin(dist))
+        radius = 10 * self.bmi_plan_fig.dpi / 72.0
+        if dist[i] > radius * radius:
+            return None
+        return mdates.num2date(xs[i]).date(), float(ys[i])
+
+    def on_bmi_plan_hover(self, event):
+        """Tooltip bodu grafu plnění plánu (skryje se až po několika pohybech mimo body)."""
+        lbl = self._ensure_bmi_hover_label()
+        ctx = getattr(self, "bmi_plan_hover_context", None)
+        hit = None
+        try:
+            hit = self.bmi_plan_point_at(event) if ctx else None
+        except Exception:
+            hit = None
+
+        if hit is None or lbl is None:
+            self._bmi_hover_miss = getattr(self, "_bmi_hover_miss", 0) + 1
+            if self._bmi_hover_miss >= 8:
+                try:
+                    if lbl is not None:
+                        lbl.hide()
+                except Exception:
+                    pass
+            return
+
+        self._bmi_hover_miss = 0
+        try:
+            lbl.setText(self.bmi_plan_tooltip(ctx, *hit))
+            lbl.adjustSize()
+            from PySide6.QtGui import QCursor, QGuiApplication
+            from PySide6.QtCore import QPoint
+
+            cur = QCursor.pos()
+            x = int(cur.x() + 16)
+            y = int(cur.y() + 16)
+
+            # ✅ (4.7.1) clamp tooltip do viditelné části obrazovky
+            try:
+                scr = None
+                try:
+                    scr = QGuiApplication.screenAt(cur)
+                except Exception:
+                    scr = None
+                if scr is None:
+                    try:
+                        scr = QGuiApplication.primaryScreen()
+                    except Exception:
+                        scr = None
+                if scr is not None:
+                    geom = scr.availableGeometry()
+                    pad = 6
+                    w = int(lbl.width())
+                    h = int(lbl.height())
+
+                    if x + w > geom.right() - pad:
+                        x = int(geom.right() - pad - w)
+                    if x < geom.left() + pad:
+                        x = int(geom.left() + pad)
+
+                    if y + h > geom.bottom() - pad:
+                        y = int(cur.y() - 16 - h)
+                    if y < geom.top() + pad:
+                        y = int(geom.top() + pad)
+            except Exception:
+                pass
+
+            lbl.move(QPoint(x, y))
+            lbl.show()
+            lbl.raise_()
+        except Exception:
+            pass
         
     def refresh_add_tab_goals(self):
         """Aktualizuje přehled cílů (labels) v záložce Přidat výkon podle vybraného data."""
@@ -4990,54 +8988,28 @@ class FitnessTrackerApp(QMainWindow):
     def expand_today_in_exercise_tree(self, exercise_type):
         """Rozbalí v seznamu záznamů dnešní den (pokud v tree existuje) pro dané cvičení."""
         try:
-            tree = self.findChild(QTreeWidget, f"tree_{exercise_type}")
-            if not tree:
+            tree = self.findChild(QTreeView, f"tree_{exercise_type}")
+            model = self.exercise_tree_models.get(exercise_type)
+            if not tree or model is None:
                 return
 
             today_str = datetime.now().strftime("%Y-%m-%d")
+            day = model.day_node(today_str)
+            if day is None:
+                return
 
-            for i in range(tree.topLevelItemCount()):
-                month_item = tree.topLevelItem(i)
-                if not month_item:
-                    continue
-
-                for j in range(month_item.childCount()):
-                    child_item = month_item.child(j)
-                    if not child_item:
-                        continue
-
-                    # Varianta A: měsíc -> den
-                    payload = child_item.data(3, Qt.UserRole)
-                    if isinstance(payload, dict) and payload.get("type") == "day" and payload.get("date") == today_str:
-                        month_item.setExpanded(True)
-                        child_item.setExpanded(True)
-                        try:
-                            tree.setCurrentItem(child_item)
-                            tree.scrollToItem(child_item)
-                        except Exception:
-                            pass
-                        return
-
-                    # Varianta B: měsíc -> týden -> den
-                    for k in range(child_item.childCount()):
-                        day_item = child_item.child(k)
-                        if not day_item:
-                            continue
-
-                        payload = day_item.data(3, Qt.UserRole)
-                        if isinstance(payload, dict) and payload.get("type") == "day" and payload.get("date") == today_str:
-                            month_item.setExpanded(True)
-                            try:
-                                child_item.setExpanded(True)
-                            except Exception:
-                                pass
-                            day_item.setExpanded(True)
-                            try:
-                                tree.setCurrentItem(day_item)
-                                tree.scrollToItem(day_item)
-                            except Exception:
-                                pass
-                            return
+            # měsíc -> týden -> den
+            node = day.parent
+            while node is not None and node is not model.root:
+                tree.expand(model.index_of(node))
+                node = node.parent
+            day_index = model.index_of(day)
+            tree.expand(day_index)
+            try:
+                tree.setCurrentIndex(day_index)
+                tree.scrollTo(day_index)
+            except Exception:
+                pass
         except Exception as e:
             print(f"Chyba při rozbalení dne v seznamu záznamů: {e}")
 
@@ -5061,31 +9033,52 @@ class FitnessTrackerApp(QMainWindow):
             except Exception:
                 pass
 
-            # **OPRAVENO: Dynamicky najít cvičení podle názvu v záložce**
-            for exercise_id in self.get_active_exercises():
-                config = self.get_exercise_config(exercise_id)
-                if config['icon'] in tab_name and config['name'] in tab_name:
+            exercise_id = self.exercise_for_tab(index)
+            if exercise_id:
+                if exercise_id in self.stale_exercise_views:
+                    # Změny z doby, kdy byla záložka skrytá (vč. grafu)
+                    self.render_exercise_views(exercise_id)
+                else:
                     self.update_exercise_tab(exercise_id)
                     self.refresh_exercise_calendar(exercise_id)
 
-                    # Nově: při přepnutí na záložku vždy rozbal dnešní den (pokud existuje)
-                    self.expand_today_in_exercise_tree(exercise_id)
-                    break
+                # Nově: při přepnutí na záložku vždy rozbal dnešní den (pokud existuje)
+                self.expand_today_in_exercise_tree(exercise_id)
         except Exception as e:
             print(f"Chyba při přepnutí záložky: {e}")
 
     def auto_refresh(self):
-        """Automatický refresh aktuální záložky"""
+        """Automatický refresh aktuální záložky – jen pokud se od posledního vykreslení něco změnilo."""
         try:
-            current_tab = self.tabs.currentIndex()
-            tab_name = self.tabs.tabText(current_tab)
-            
-            # **OPRAVENO: Dynamicky najít cvičení podle názvu v záložce**
-            for exercise_id in self.get_active_exercises():
-                config = self.get_exercise_config(exercise_id)
-                if config['icon'] in tab_name and config['name'] in tab_name:
-                    self.update_exercise_tab(exercise_id)
-                    break
+            # Přechod přes půlnoc: mění se „dnes“, cíle dne i budoucí dny v kalendáři
+            today = datetime.now().date()
+            day_rolled_over = today != self.last_refresh_day
+            if day_rolled_over:
+                self.last_refresh_day = today
+                try:
+                    self.refresh_add_tab_goals()
+                except Exception as e:
+                    print(f"Chyba při aktualizaci cílů po změně dne: {e}")
+
+            exercise_id = self.exercise_for_tab(self.tabs.currentIndex())
+            if day_rolled_over:
+                # Skryté záložky (graf s dneškem apod.) se dokreslí až při zobrazení
+                self.stale_exercise_views.update(ex for ex in self.exercise_tab_pages if ex != exercise_id)
+            if not exercise_id:
+                return
+            if exercise_id in self.stale_exercise_views:
+                self.render_exercise_views(exercise_id)
+                return
+
+            selector = self.exercise_year_selectors.get(exercise_id)
+            if not selector or not selector.currentText():
+                return
+            stamp = self.exercise_tab_stamp(exercise_id, int(selector.currentText()))
+            if not day_rolled_over and self.exercise_tab_rendered.get(exercise_id) == stamp:
+                return
+            self.update_exercise_tab(exercise_id)
+            if day_rolled_over:
+                self.refresh_exercise_calendar(exercise_id)
         except Exception as e:
             print(f"Chyba při automatické aktualizaci: {e}")
 
@@ -5107,15 +9100,30 @@ class FitnessTrackerApp(QMainWindow):
         current_year = datetime.now().year
         years = set([current_year])
         
-        for date_str in self.data['workouts'].keys():
-            year = int(date_str.split('-')[0])
-            years.add(year)
+        # Roky jen z klíčů (u dat po rocích i nenačtené, bez čtení shardů)
+        for year in YearPartitionedDict.years(self.data['workouts']):
+            years.add(int(year))
         
         if 'year_settings' in self.data:
-            for year_str in self.data['year_settings'].keys():
+            for year_str in YearPartitionedDict.years(self.data['year_settings']):
                 years.add(int(year_str))
         
         return sorted(years, reverse=True)
+
+    def refresh_years_list(self):
+        """Naplní seznam roků v nastavení (počty dnů všech roků jedním průchodem)."""
+        if not hasattr(self, "years_list"):
+            return
+        counts = YearPartitionedDict.day_counts(self.data.get("workouts", {}))
+        self.years_list.clear()
+        for y in self.get_available_years():
+            item = QListWidgetItem(f"📆 Rok {y} ({counts.get(str(y), 0)} dnů s cvičením)")
+            item.setData(Qt.UserRole, y)
+            self.years_list.addItem(item)
+
+    def count_workout_days(self, year):
+        """Počet dnů s cvičením v roce (nenačtený rok ze souhrnu v indexu)."""
+        return YearPartitionedDict.count_in_year(self.data.get('workouts', {}), year)
     
     def delete_year_data(self, year):
         """Smaže všechna data pro daný rok"""
@@ -5131,10 +9139,7 @@ class FitnessTrackerApp(QMainWindow):
         no_btn.setText("Ne, zrušit")
         
         if msg.exec() == QMessageBox.Yes:
-            dates_to_delete = []
-            for date_str in self.data['workouts'].keys():
-                if int(date_str.split('-')[0]) == year:
-                    dates_to_delete.append(date_str)
+            dates_to_delete = YearPartitionedDict.keys_in_year(self.data['workouts'], year)
             
             for date_str in dates_to_delete:
                 del self.data['workouts'][date_str]
@@ -5143,20 +9148,22 @@ class FitnessTrackerApp(QMainWindow):
             if year_str in self.data['year_settings']:
                 del self.data['year_settings'][year_str]
             
+            self.invalidate_goal_schedules()
+            self.invalidate_workout_indexes()
             self.save_data()
             self.update_all_year_selectors()
             self.tabs.setCurrentIndex(0)
             
             self.show_message("Smazáno", f"Všechna data pro rok {year} byla smazána.")
             
-            for exercise in ['kliky', 'dřepy', 'skrčky']:
+            for exercise in ['kliky', 'drepy', 'skrcky']:
                 self.update_exercise_tab(exercise)
     
     def update_all_year_selectors(self):
         """Aktualizuje všechny year selectory"""
         available_years = self.get_available_years()
         
-        for exercise in ['kliky', 'dřepy', 'skrčky']:
+        for exercise in ['kliky', 'drepy', 'skrcky']:
             if exercise in self.exercise_year_selectors:
                 selector = self.exercise_year_selectors[exercise]
                 current_text = selector.currentText()
@@ -5170,15 +9177,7 @@ class FitnessTrackerApp(QMainWindow):
                 else:
                     selector.setCurrentText(str(datetime.now().year))
         
-        if hasattr(self, 'years_list'):
-            current_text = ""
-            self.years_list.clear()
-            for y in available_years:
-                year_workouts = sum(1 for date_str in self.data['workouts'].keys() 
-                                  if int(date_str.split('-')[0]) == y)
-                item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-                item.setData(Qt.UserRole, y)
-                self.years_list.addItem(item)
+        self.refresh_years_list()
     
     def create_about_tab(self):
         """Záložka O aplikaci s kompletním helpem a manuálem (rozšířená, podrobnější verze)"""
@@ -5637,6 +9636,11 @@ class FitnessTrackerApp(QMainWindow):
         btn_import.setObjectName("btn_import_data")
         btn_import.clicked.connect(self.import_data)
         data_layout.addWidget(btn_import)
+
+        btn_restore = QPushButton("♻️ Obnovit zálohu")
+        btn_restore.setObjectName("btn_restore_backup")
+        btn_restore.clicked.connect(self.restore_backup)
+        data_layout.addWidget(btn_restore)
     
         data_group.setLayout(data_layout)
         layout.addWidget(data_group)
@@ -5644,13 +9648,7 @@ class FitnessTrackerApp(QMainWindow):
         # ==== Naplnění seznamů a AUTO-VÝBĚR AKTUÁLNÍHO ROKU ====
         self.refresh_exercises_list()
     
-        self.years_list.clear()
-        for y in self.get_available_years():
-            year_workouts = sum(1 for ds in self.data.get('workouts', {}).keys()
-                                if int(ds.split('-')[0]) == y)
-            item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-            item.setData(Qt.UserRole, y)
-            self.years_list.addItem(item)
+        self.refresh_years_list()
     
         # Auto-výběr: aktuální rok
         current_year = datetime.now().year
@@ -5744,12 +9742,13 @@ class FitnessTrackerApp(QMainWindow):
             for date_str in dates_to_delete:
                 del self.data['workouts'][date_str]
             
+            self.invalidate_workout_indexes()
             self.save_data()
             self.update_all_year_selectors()
             
             self.show_message("Vynulováno", f"Všechny záznamy pro rok {year} byly smazány.\nNastavení roku bylo zachováno.")
             
-            for exercise in ['kliky', 'dřepy', 'skrčky']:
+            for exercise in ['kliky', 'drepy', 'skrcky']:
                 self.update_exercise_tab(exercise)
                 self.refresh_exercise_calendar(exercise)
             
@@ -5757,13 +9756,7 @@ class FitnessTrackerApp(QMainWindow):
             self.refresh_add_tab_goals()
             
             # Refresh seznamu roků
-            self.years_list.clear()
-            for y in self.get_available_years():
-                year_workouts = sum(1 for date_str in self.data['workouts'].keys() 
-                                  if int(date_str.split('-')[0]) == y)
-                item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-                item.setData(Qt.UserRole, y)
-                self.years_list.addItem(item)
+            self.refresh_years_list()
 
     def load_year_settings_to_ui(self, year):
         """Načte nastavení daného roku do UI (per-exercise data, cíle, přírůstky) a označí rok v seznamu."""
@@ -5845,33 +9838,13 @@ class FitnessTrackerApp(QMainWindow):
                 ys["weekly_increment"][ex_id] = self.increment_spins[ex_id].value()
     
         # Uložit
-        self.save_data()
+        self.invalidate_goal_schedules()
+        self.record_change("year_settings", year_str)
     
         # ===== OKAMŽITÉ PROMÍTNUTÍ ZMĚN DO UI =====
         try:
-            # 1) Přehledy (DEN/TÝDEN/MĚSÍC/ZBYTEK) pro každé cvičení
-            for ex in active_exercises:
-                # Zvolený rok z comboboxu cvičení (pokud existuje), jinak aktuální
-                selected_year = datetime.now().year
-                if ex in self.exercise_year_selectors and self.exercise_year_selectors[ex].currentText():
-                    selected_year = int(self.exercise_year_selectors[ex].currentText())
-                self.update_detailed_overview(ex, selected_year)
-    
-            # 2) Kalendáře
-            for ex in active_exercises:
-                self.refresh_exercise_calendar(ex)
-    
-            # 3) Grafy – zachovat aktuální mód
-            for ex in active_exercises:
-                mode = self.chart_modes.get(ex, "weekly")
-                self.update_performance_chart(ex, mode)
-    
-            # 4) Statistiky pod kalendářem
-            for ex in active_exercises:
-                selected_year = datetime.now().year
-                if ex in self.exercise_year_selectors and self.exercise_year_selectors[ex].currentText():
-                    selected_year = int(self.exercise_year_selectors[ex].currentText())
-                self.update_year_statistics(ex, selected_year)
+            # Přehledy, stromy, kalendáře (vč. statistik) a grafy záložek, které zobrazují tento rok
+            self.notify_data_changed("settings", None, f"{year_str}-01-01", f"{year_str}-12-31")
     
             self.show_message("Uloženo", f"Nastavení pro rok {self.current_settings_year} bylo uloženo a okamžitě aplikováno.", QMessageBox.Information)
         except Exception as e:
@@ -6001,6 +9974,7 @@ class FitnessTrackerApp(QMainWindow):
             return
         
         # **Společné kroky pro všechny módy**
+        self.invalidate_goal_schedules()
         self.save_data()
         self.update_all_year_selectors()
         
@@ -6009,18 +9983,13 @@ class FitnessTrackerApp(QMainWindow):
             if exercise in self.exercise_year_selectors:
                 self.exercise_year_selectors[exercise].setCurrentText(str(year))
         
-        # Refresh všeho
-        for exercise in self.get_active_exercises():
-            self.update_exercise_tab(exercise)
-            self.refresh_exercise_calendar(exercise)
-            if exercise in self.chart_modes:
-                current_mode = self.chart_modes[exercise]
-                self.update_performance_chart(exercise, current_mode)
+        # Refresh všeho (skryté záložky se vykreslí až při zobrazení)
+        self.notify_data_changed("settings", None, f"{year}-01-01", f"{year}-12-31")
         
         # Refresh v nastavení
         self.years_list.clear()
         for y in self.get_available_years():
-            year_workouts = sum(1 for date_str in self.data["workouts"].keys() if int(date_str.split("-")[0]) == y)
+            year_workouts = self.count_workout_days(y)
             item = QListWidgetItem(f"📅 Rok {y} ({year_workouts} dní s cvičením)")
             item.setData(Qt.UserRole, y)
             self.years_list.addItem(item)
@@ -6040,15 +10009,9 @@ class FitnessTrackerApp(QMainWindow):
         year = selected_items[0].data(Qt.UserRole)
         self.delete_year_data(year)
         
-        self.years_list.clear()
+        self.refresh_years_list()
         available_years = self.get_available_years()
-        for y in available_years:
-            year_workouts = sum(1 for date_str in self.data['workouts'].keys() 
-                              if int(date_str.split('-')[0]) == y)
-            item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-            item.setData(Qt.UserRole, y)
-            self.years_list.addItem(item)
-        
+
         if available_years:
             self.load_year_settings_to_ui(available_years[0])
     
@@ -6163,7 +10126,7 @@ class FitnessTrackerApp(QMainWindow):
 
         # Matplotlib figure
         fig = Figure(figsize=(12, 4), facecolor='#1e1e1e')
-        canvas = FigureCanvas(fig)
+        canvas = CachedChartCanvas(fig, self.chart_rasterizer)
         canvas.setStyleSheet("background-color: #1e1e1e;")
         canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # NOVÉ
         chart_layout.addWidget(canvas)
@@ -6180,6 +10143,7 @@ class FitnessTrackerApp(QMainWindow):
         self.chart_canvases[exercisetype] = canvas
         self.chart_figures[exercisetype] = fig
         self.chart_modes[exercisetype] = "daily"
+        canvas.mpl_connect("resize_event", lambda _event, ex=exercisetype: self.on_performance_chart_resized(ex))
 
         chart_group.setLayout(chart_layout)
         parent_layout.addWidget(chart_group)
@@ -6220,10 +10184,20 @@ class FitnessTrackerApp(QMainWindow):
         except Exception as e:
             print(f"on_calendar_day_clicked error: {e}")
 
+    def on_performance_chart_resized(self, exercise_type: str) -> None:
+        """Po změně šířky grafu výkonu ho překreslí, jen pokud se změní úroveň detailu sloupců."""
+        mode = self.chart_modes.get(exercise_type, "daily")
+        state = getattr(self, "chart_artists", {}).get(exercise_type, {}).get(mode)
+        if not state or "lod" not in state:
+            return
+        fig = self.chart_figures[exercise_type]
+        lod = SeriesDownsampler.bucket_size(state["days"], SeriesDownsampler.axes_pixels(fig, state["adjust"]))
+        if lod != state["lod"]:
+            self.update_performance_chart(exercise_type, mode)
+
     def update_performance_chart(self, exercise_type: str, mode: str) -> None:
         """Aktualizuje graf výkonu pro daný typ cvičení a režim (daily/weekly/monthly/yearly)."""
         from datetime import datetime, timedelta
-        import matplotlib.dates as mdates
     
         # Ověření figure/canvas struktur
         if not hasattr(self, "chart_figures") or exercise_type not in self.chart_figures:
@@ -6263,22 +10237,6 @@ class FitnessTrackerApp(QMainWindow):
                 except Exception:
                     pass
     
-        fig = self.chart_figures[exercise_type]
-        canvas = self.chart_canvases[exercise_type]
-        fig.clear()
-        ax = fig.add_subplot(111)
-        fig.patch.set_facecolor("#121212")
-        ax.set_facecolor("#1e1e1e")
-    
-        # Tmavé osy
-        ax.tick_params(axis="x", colors="#e0e0e0")
-        ax.tick_params(axis="y", colors="#e0e0e0")
-        ax.xaxis.label.set_color("#e0e0e0")
-        ax.yaxis.label.set_color("#e0e0e0")
-        ax.title.set_color("#e0e0e0")
-        for spine in ax.spines.values():
-            spine.set_color("#e0e0e0")
-    
         today = datetime.now().date()
     
         # Rok pro dané cvičení (per-exercise combobox)
@@ -6325,9 +10283,7 @@ class FitnessTrackerApp(QMainWindow):
         #                          DAILY MODE
         # =================================================================
         if mode == "daily":
-            from PySide6.QtWidgets import QTreeWidget
             from PySide6.QtCore import Qt
-            import numpy as np
     
             # 1) Zkusit vybraný den ze stromu / kalendáře
             day_date = None
@@ -6343,13 +10299,13 @@ class FitnessTrackerApp(QMainWindow):
                 pass
     
             try:
-                tree = self.findChild(QTreeWidget, f"tree_{exercise_type}")
-                if day_date is None and tree:
-                    for it in tree.selectedItems():
-                        payload = it.data(3, Qt.UserRole)
+                tree = self.findChild(QTreeView, f"tree_{exercise_type}")
+                if day_date is None and tree and tree.selectionModel():
+                    for it in tree.selectionModel().selectedIndexes():
+                        payload = it.data(Qt.UserRole)
                         if isinstance(payload, dict) and "record_id" in payload:
                             continue  # tohle je řádek výkonu, ne den
-                        txt = it.text(0) if it is not None else ""
+                        txt = it.siblingAtColumn(0).data() or ""
                         ds = txt.split(" ", 1)[1] if " " in txt else txt
                         if len(ds) == 10 and ds[4] == "-" and ds[7] == "-":
                             day_date = datetime.strptime(ds, "%Y-%m-%d").date()
@@ -6362,17 +10318,12 @@ class FitnessTrackerApp(QMainWindow):
                 if selected_year == today.year:
                     day_date = today
                 else:
+                    workouts = self.data.get("workouts", {}) or {}
                     days_with_data: list[str] = []
-                    for ds, perday in (self.data.get("workouts", {}) or {}).items():
+                    for ds in YearPartitionedDict.keys_in_year(workouts, selected_year):
                         if not isinstance(ds, str) or len(ds) < 10:
                             continue
-                        try:
-                            y = int(ds[:4])
-                        except Exception:
-                            continue
-                        if y != selected_year:
-                            continue
-                        if exercise_type in perday:
+                        if exercise_type in workouts[ds]:
                             days_with_data.append(ds)
                     if days_with_data:
                         last_ds = sorted(days_with_data)[-1]
@@ -6421,258 +10372,61 @@ class FitnessTrackerApp(QMainWindow):
                 dt = _ts_to_dt(r.get("timestamp", f"{day_str} 12:00"))
                 running += float(r.get("value", 0) or 0)
                 times.append(dt)
-                cumul.append(running)
-    
-            # === kotva na začátek dne (00:00 -> 0) a plochý úsek do prvního záznamu ===
-            if times:
-                start_of_day = datetime(day_date.year, day_date.month, day_date.day, 0, 0, 0)
-                first_t = times[0]
-                if first_t > start_of_day:
-                    t_before = max(start_of_day, first_t - timedelta(seconds=1))
-                    times = [start_of_day, t_before] + times
-                    cumul = [0.0, 0.0] + cumul
-    
-            # Denní cíl
-            daily_goal = self.calculate_goal(exercise_type, day_str)
-            if not isinstance(daily_goal, (int, float)):
-                daily_goal = float(daily_goal) if daily_goal else 0.0
-    
-            # (4.4.5) Podkladové pásy po 1/7 v rámci 0–100 % denního cíle (červená → žlutá)
-            if daily_goal and daily_goal > 0:
-                def _hex_to_rgb(_hx: str):
-                    _hx = (_hx or "").lstrip("#")
-                    if len(_hx) != 6:
-                        return (0, 0, 0)
-                    return (int(_hx[0:2], 16), int(_hx[2:4], 16), int(_hx[4:6], 16))
-    
-                def _rgb_to_hex(_rgb):
-                    return "#{:02x}{:02x}{:02x}".format(int(_rgb[0]), int(_rgb[1]), int(_rgb[2]))
-    
-                def _lerp(a: float, b: float, t: float) -> float:
-                    return a + (b - a) * t
-    
-                red = _hex_to_rgb("#8B0000")
-                yellow = _hex_to_rgb("#FFD700")
-    
-                for i in range(7):
-                    y0 = daily_goal * (i / 7.0)
-                    y1 = daily_goal * ((i + 1) / 7.0)
-                    t = (i + 0.5) / 7.0
-                    col = (
-                        _lerp(red[0], yellow[0], t),
-                        _lerp(red[1], yellow[1], t),
-                        _lerp(red[2], yellow[2], t),
-                    )
-                    ax.axhspan(
-                        y0,
-                        y1,
-                        facecolor=_rgb_to_hex(col),
-                        alpha=0.10,
-                        zorder=0,
-                    )
-    
-            # --- Monotónní kubická Hermitova interpolace (Fritsch–Carlson) ---
-            def smooth_monotone_curve_x(xs_num: list[float], ys_vals: list[float], points_per_segment: int = 30):
-                """Hladká křivka Y(X) bez smyček; shape-preserving, monotónní v X."""
-                import numpy as _np
-    
-                n = len(xs_num)
-                if n < 3:
-                    return _np.array(xs_num, dtype=float), _np.array(ys_vals, dtype=float)
-    
-                x = _np.asarray(xs_num, dtype=float)
-                y = _np.asarray(ys_vals, dtype=float)
-    
-                # Deduplikace shodných X (ponechá poslední Y)
-                xx = [x[0]]
-                yy = [y[0]]
-                for i in range(1, len(x)):
-                    if x[i] == xx[-1]:
-                        yy[-1] = y[i]
-                    else:
-                        xx.append(x[i])
-                        yy.append(y[i])
-                x = _np.asarray(xx, dtype=float)
-                y = _np.asarray(yy, dtype=float)
-                n = len(x)
-                if n < 3:
-                    return x, y
-    
-                h = _np.diff(x)
-                d = _np.diff(y) / h
-    
-                m = _np.empty(n, dtype=float)
-                m[0] = d[0]
-                m[-1] = d[-1]
-                for i in range(1, n - 1):
-                    if d[i - 1] == 0.0 or d[i] == 0.0 or (d[i - 1] > 0 and d[i] < 0) or (d[i - 1] < 0 and d[i] > 0):
-                        m[i] = 0.0
-                    else:
-                        w1 = 2.0 * h[i] + h[i - 1]
-                        w2 = h[i] + 2.0 * h[i - 1]
-                        m[i] = (w1 + w2) / (w1 / d[i - 1] + w2 / d[i])
-    
-                for i in range(n - 1):
-                    if d[i] == 0.0:
-                        m[i] = 0.0
-                        m[i + 1] = 0.0
-                    else:
-                        a = m[i] / d[i]
-                        b = m[i + 1] / d[i]
-                        if a < 0.0:
-                            m[i] = 0.0
-                            a = 0.0
-                        if b < 0.0:
-                            m[i + 1] = 0.0
-                            b = 0.0
-                        s = a * a + b * b
-                        if s > 9.0:
-                            t = 3.0 / _np.sqrt(s)
-                            m[i] = t * a * d[i]
-                            m[i + 1] = t * b * d[i]
-    
-                xs_out = []
-                ys_out = []
-                for i in range(n - 1):
-                    xi, xi1 = x[i], x[i + 1]
-                    hi = xi1 - xi
-                    yi, yi1 = y[i], y[i + 1]
-                    mi, mi1 = m[i], m[i + 1]
-                    ts = _np.linspace(0.0, 1.0, points_per_segment, endpoint=(i == n - 2))
-                    for t in ts:
-                        t2 = t * t
-                        t3 = t2 * t
-                        h00 = 2 * t3 - 3 * t2 + 1
-                        h10 = t3 - 2 * t2 + t
-                        h01 = -2 * t3 + 3 * t2
-                        h11 = t3 - t2
-                        xs_out.append(xi + t * hi)
-                        ys_out.append(h00 * yi + h10 * hi * mi + h01 * yi1 + h11 * hi * mi1)
-    
-                return _np.array(xs_out, dtype=float), _np.array(ys_out, dtype=float)
-    
-            if not times:
-                ax.text(
-                    0.5,
-                    0.5,
-                    "Žádné záznamy v tomto dni",
-                    ha="center",
-                    va="center",
-                    transform=ax.transAxes,
-                    fontsize=14,
-                    color="#a0a0a0",
-                )
-            else:
-                xs_raw = [mdates.date2num(dt) for dt in times]
-                xs_smooth, cumul_smooth = smooth_monotone_curve_x(xs_raw, cumul, points_per_segment=30)
-                times_smooth = [mdates.num2date(x) for x in xs_smooth]
-    
-                ax.plot(
-                    times_smooth,
-                    cumul_smooth,
-                    label="Kumulativně (den)",
-                    linewidth=2.0,
-                    color="#0d7377",
-                )
-                ax.scatter(times, cumul, color="#0d7377", s=30, zorder=5)
-    
-                if daily_goal > 0:
-                    ax.axhline(
-                        daily_goal,
-                        linestyle="--",
-                        linewidth=1.8,
-                        color="#FFD700",
-                        label="Denní cíl",
-                    )
-    
-                ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-                ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
-                ax.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
-    
-                start_view = datetime(day_date.year, day_date.month, day_date.day, 0, 0)
-                end_view = datetime(day_date.year, day_date.month, day_date.day, 23, 59, 59)
-                ax.set_xlim(start_view, end_view)
+                cumul.append(running)
     
-            dw = _CZ_WEEKDAY[day_date.weekday()]
-            ax.set_title(f"Denní vývoj - {exercise_type.capitalize()} ({dw} {day_date.strftime('%Y-%m-%d')})")
-            ax.set_xlabel("Čas")
-            ax.set_ylabel("Hodnota")
+            # === kotva na začátek dne (00:00 -> 0) a plochý úsek do prvního záznamu ===
+            if times:
+                start_of_day = datetime(day_date.year, day_date.month, day_date.day, 0, 0, 0)
+                first_t = times[0]
+                if first_t > start_of_day:
+                    t_before = max(start_of_day, first_t - timedelta(seconds=1))
+                    times = [start_of_day, t_before] + times
+                    cumul = [0.0, 0.0] + cumul
     
-            handles, labels = ax.get_legend_handles_labels()
-            if handles:
-                leg = ax.legend(
-                    handles,
-                    labels,
-                    loc="upper right",
-                    fontsize=9,
-                    facecolor="#2d2d2d",
-                    edgecolor="#3d3d3d",
-                )
-                for t in leg.get_texts():
-                    t.set_color("#e0e0e0")
+            # Denní cíl
+            daily_goal = self.calculate_goal(exercise_type, day_str)
+            if not isinstance(daily_goal, (int, float)):
+                daily_goal = float(daily_goal) if daily_goal else 0.0
     
-            # 4.4.7a: symetrické okraje vlevo/vpravo
-            fig.subplots_adjust(left=0.03, right=0.97, top=0.962, bottom=0.035)
-            canvas.draw()
+            # Hladká monotónní křivka dne (sdílená interpolace, cache podle revize dat)
+            data_revision = max(self.exercise_revisions.get(exercise_type, 0), self.all_exercises_revision)
+            dw = _CZ_WEEKDAY[day_date.weekday()]
+            self.show_performance_chart(exercise_type, mode, {
+                "kind": "daily",
+                "key": (selected_year, day_str, bool(times), daily_goal),
+                "times": times,
+                "cumul": cumul,
+                "daily_goal": daily_goal,
+                "day_date": day_date,
+                "smooth_key": ("daily", exercise_type, day_str, data_revision),
+                "title": f"Denní vývoj - {exercise_type.capitalize()} ({dw} {day_date.strftime('%Y-%m-%d')})",
+            })
             return
     
         # =================================================================
         #                 WEEKLY / MONTHLY / YEARLY (BEZE ZMĚNY)
         # =================================================================
+        def _empty_chart(key, message: str, adjust: dict) -> None:
+            _set_total(0.0)
+            self.show_performance_chart(exercise_type, mode, {
+                "kind": "empty", "key": key, "message": message, "adjust": adjust,
+            })
+
         workouts = self.data.get("workouts", {})
         if not workouts:
-            _set_total(0.0)
-            ax.text(
-                0.5,
-                0.5,
-                "Žádná data",
-                ha="center",
-                va="center",
-                transform=ax.transAxes,
-                fontsize=14,
-                color="#a0a0a0",
-            )
-            fig.subplots_adjust(left=0.03, right=0.97, top=0.962, bottom=0.12)
-            canvas.draw()
+            _empty_chart(("no_data",), "Žádná data", dict(left=0.03, right=0.97, top=0.962, bottom=0.12))
             return
     
-        # Akumulace denních hodnot pro daný rok + cvičení
-        from datetime import date as _date  # typová nápověda
-        daily_values: dict[_date, float] = {}
-        for date_str, perday in workouts.items():
-            if not isinstance(date_str, str) or len(date_str) < 10:
-                continue
-            try:
-                dt = datetime.strptime(date_str[:10], "%Y-%m-%d").date()
-            except Exception:
-                continue
-            if dt.year != selected_year:
-                continue
-            if exercise_type not in perday:
-                continue
-            records = perday[exercise_type]
-            if isinstance(records, list):
-                total = sum(float(r.get("value", 0) or 0) for r in records)
-            elif isinstance(records, dict):
-                total = float(records.get("value", 0) or 0)
-            else:
-                continue
-            daily_values[dt] = daily_values.get(dt, 0.0) + total
+        # Existují v daném roce pro cvičení nějaké dny se záznamem?
+        year_days, _year_sums = self.workout_store.day_totals_by_day(
+            exercise_type,
+            datetime(selected_year, 1, 1).date(),
+            datetime(selected_year, 12, 31).date(),
+        )
     
-        if not daily_values:
-            _set_total(0.0)
-            ax.text(
-                0.5,
-                0.5,
-                "Žádná data pro zvolený rok",
-                ha="center",
-                va="center",
-                transform=ax.transAxes,
-                fontsize=14,
-                color="#a0a0a0",
-            )
-            fig.subplots_adjust(left=0.03, right=0.97, top=0.962, bottom=0.12)
-            canvas.draw()
+        if not len(year_days):
+            _empty_chart(("no_year_data", selected_year), "Žádná data pro zvolený rok",
+                         dict(left=0.03, right=0.97, top=0.962, bottom=0.12))
             return
     
         # Rozsah podle režimu
@@ -6704,38 +10458,16 @@ class FitnessTrackerApp(QMainWindow):
             xlabel_format = "%d.%m."
     
         if range_end < range_start:
-            _set_total(0.0)
-            ax.text(
-                0.5,
-                0.5,
-                "Žádná data k zobrazení",
-                ha="center",
-                va="center",
-                transform=ax.transAxes,
-                fontsize=14,
-                color="#a0a0a0",
-            )
-            fig.subplots_adjust(left=0.03, right=0.97, top=0.962, bottom=0.035)
-            canvas.draw()
+            _empty_chart(("no_range", selected_year, range_start, range_end), "Žádná data k zobrazení",
+                         dict(left=0.03, right=0.97, top=0.962, bottom=0.035))
             return
     
         dates = [range_start + timedelta(days=i) for i in range((range_end - range_start).days + 1)]
-        performed: list[float] = []
-        goals: list[float] = []
-        for d in dates:
-            ds = d.strftime("%Y-%m-%d")
-            v = 0.0
-            if ds in workouts and exercise_type in workouts[ds]:
-                recs = workouts[ds][exercise_type]
-                if isinstance(recs, list):
-                    v = sum(float(r.get("value", 0) or 0) for r in recs)
-                elif isinstance(recs, dict):
-                    v = float(recs.get("value", 0) or 0)
-            g = self.calculate_goal(exercise_type, ds)
-            if not isinstance(g, (int, float)):
-                g = float(g) if g else 0.0
-            performed.append(v)
-            goals.append(g)
+        # Výkon i cíle jako řezy polí (rozsah leží vždy v rámci zvoleného roku)
+        performed: list[float] = self.workout_store.daily_totals(exercise_type, range_start, range_end).tolist()
+        _sched = self.get_goal_schedule(exercise_type, selected_year)
+        _a = (range_start - _sched.first_day).days
+        goals: list[float] = _sched.goals[_a:_a + len(dates)].tolist()
     
         # suma pro týden/měsíc/rok podle aktuálního rozsahu
         try:
@@ -6801,10 +10533,283 @@ class FitnessTrackerApp(QMainWindow):
                     _lerp(_GRN_LIGHT[2], _GRN_DARK[2], t),
                 )
                 bar_colors.append(_rgb_to_hex(col))
+
+        # Titulek
+        if mode == "weekly":
+            title = f"Týden {range_end.isocalendar().week}"
+        elif mode == "monthly":
+            title = f"{_CZ_MONTH[range_start.month]} {range_start.year}"
+        else:
+            title = f"Rok {selected_year}"
+
+        self.show_performance_chart(exercise_type, mode, {
+            "kind": "bars",
+            "key": (selected_year, range_start, range_end, start_date),
+            "dates": dates,
+            "performed": performed,
+            "goals": goals,
+            "bar_colors": bar_colors,
+            "start_date": start_date,
+            "xlabel_format": xlabel_format,
+            "title": title,
+        })
+
+    def show_performance_chart(self, exercise_type: str, mode: str, spec: dict) -> None:
+        """Zobrazí graf výkonu podle `spec` – ve vlákně na pozadí (ChartRasterizer), nebo přímo s opakovaným použitím os."""
+        canvas = self.chart_canvases[exercise_type]
+        if self.chart_rasterizer is not None:
+            revision = max(self.exercise_revisions.get(exercise_type, 0), self.all_exercises_revision)
+            key = ("performance", exercise_type, mode, spec["key"], revision, datetime.now().date())
+            canvas.render_chart(key, lambda fig: self.draw_performance_chart(fig, mode, spec, {}))
+            return
+
+        # Osy a artisty si graf pamatuje po režimech (přepnutí režimu = jen viditelnost)
+        if not hasattr(self, "chart_artists"):
+            self.chart_artists = {}
+        states = self.chart_artists.setdefault(exercise_type, {})
+        for _mode, _state in states.items():
+            _state["ax"].set_visible(_mode == mode)
+        self.draw_performance_chart(self.chart_figures[exercise_type], mode, spec, states)
+        canvas.draw_idle()
+
+    def draw_performance_chart(self, fig, mode: str, spec: dict, states: dict) -> None:
+        """
+        Sestaví graf výkonu do `fig` (bez widgetů a živých dat, lze volat mimo GUI vlákno).
+
+        states = osy a artisty po režimech; při stejném rozložení (režim, rok,
+        rozsah/den, cíl) se jen přepíšou data, jinak se osy režimu postaví znovu.
+        Ve vlákně na pozadí je states prázdný (nová Figure).
+        """
+        from datetime import datetime, timedelta
+        import matplotlib.dates as mdates
+        import numpy as np
+
+        fig.patch.set_facecolor("#121212")
+
+        def _reuse(key) -> dict | None:
+            state = states.get(mode)
+            if state is None or state["key"] != key:
+                return None
+            fig.subplots_adjust(**state["adjust"])
+            return state
+
+        def _new_axes(key, adjust: dict):
+            old = states.pop(mode, None)
+            if old is not None:
+                old["ax"].remove()
+            ax = fig.add_subplot(111, label=mode)
+            ax.set_facecolor("#1e1e1e")
+
+            # Tmavé osy
+            ax.tick_params(axis="x", colors="#e0e0e0")
+            ax.tick_params(axis="y", colors="#e0e0e0")
+            ax.xaxis.label.set_color("#e0e0e0")
+            ax.yaxis.label.set_color("#e0e0e0")
+            ax.title.set_color("#e0e0e0")
+            for spine in ax.spines.values():
+                spine.set_color("#e0e0e0")
+
+            state = {"ax": ax, "key": key, "adjust": adjust}
+            states[mode] = state
+            return ax, state
+
+        if spec["kind"] == "empty":
+            if _reuse(spec["key"]) is None:
+                ax, _state = _new_axes(spec["key"], spec["adjust"])
+                ax.text(
+                    0.5,
+                    0.5,
+                    spec["message"],
+                    ha="center",
+                    va="center",
+                    transform=ax.transAxes,
+                    fontsize=14,
+                    color="#a0a0a0",
+                )
+            fig.subplots_adjust(**spec["adjust"])
+            return
+
+        if spec["kind"] == "daily":
+            times, cumul = spec["times"], spec["cumul"]
+            daily_goal, day_date = spec["daily_goal"], spec["day_date"]
+            smooth_key = spec["smooth_key"]
+            daily_adjust = dict(left=0.03, right=0.97, top=0.962, bottom=0.035)
+            smooth_pps = SeriesDownsampler.points_per_segment(
+                len(times), SeriesDownsampler.axes_pixels(fig, daily_adjust), 30
+            )
+
+            state = _reuse(spec["key"])
+            if state is not None:
+                # Stejný den a cíl: jen nová křivka, body a rozsah osy Y
+                if times:
+                    xs_raw = mdates.date2num(times)
+                    xs_smooth, cumul_smooth = CurveSmoothing.monotone_cubic(
+                        xs_raw, cumul, points_per_segment=smooth_pps, cache_key=smooth_key
+                    )
+                    state["curve"].set_data(xs_smooth, cumul_smooth)
+                    state["points"].set_offsets(np.column_stack([xs_raw, cumul]))
+                    state["ax"].relim()
+                    state["ax"].autoscale_view()
+                return
+
+            ax, state = _new_axes(spec["key"], daily_adjust)
+
+            # (4.4.5) Podkladové pásy po 1/7 v rámci 0–100 % denního cíle (červená → žlutá)
+            if daily_goal and daily_goal > 0:
+                def _hex_to_rgb(_hx: str):
+                    _hx = (_hx or "").lstrip("#")
+                    if len(_hx) != 6:
+                        return (0, 0, 0)
+                    return (int(_hx[0:2], 16), int(_hx[2:4], 16), int(_hx[4:6], 16))
+    
+                def _rgb_to_hex(_rgb):
+                    return "#{:02x}{:02x}{:02x}".format(int(_rgb[0]), int(_rgb[1]), int(_rgb[2]))
+    
+                def _lerp(a: float, b: float, t: float) -> float:
+                    return a + (b - a) * t
+    
+                red = _hex_to_rgb("#8B0000")
+                yellow = _hex_to_rgb("#FFD700")
+    
+                for i in range(7):
+                    y0 = daily_goal * (i / 7.0)
+                    y1 = daily_goal * ((i + 1) / 7.0)
+                    t = (i + 0.5) / 7.0
+                    col = (
+                        _lerp(red[0], yellow[0], t),
+                        _lerp(red[1], yellow[1], t),
+                        _lerp(red[2], yellow[2], t),
+                    )
+                    ax.axhspan(
+                        y0,
+                        y1,
+                        facecolor=_rgb_to_hex(col),
+                        alpha=0.10,
+                        zorder=0,
+                    )
+    
+            if not times:
+                ax.text(
+                    0.5,
+                    0.5,
+                    "Žádné záznamy v tomto dni",
+                    ha="center",
+                    va="center",
+                    transform=ax.transAxes,
+                    fontsize=14,
+                    color="#a0a0a0",
+                )
+            else:
+                xs_raw = mdates.date2num(times)
+                xs_smooth, cumul_smooth = CurveSmoothing.monotone_cubic(
+                    xs_raw, cumul, points_per_segment=smooth_pps, cache_key=smooth_key
+                )
+    
+                (state["curve"],) = ax.plot(
+                    xs_smooth,
+                    cumul_smooth,
+                    label="Kumulativně (den)",
+                    linewidth=2.0,
+                    color="#0d7377",
+                )
+                state["points"] = ax.scatter(times, cumul, color="#0d7377", s=30, zorder=5)
+    
+                if daily_goal > 0:
+                    ax.axhline(
+                        daily_goal,
+                        linestyle="--",
+                        linewidth=1.8,
+                        color="#FFD700",
+                        label="Denní cíl",
+                    )
+    
+                ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+                ax.xaxis.set_major_locator(mdates.HourLocator(interval=2))
+                ax.xaxis.set_minor_locator(mdates.HourLocator(interval=1))
+    
+                start_view = datetime(day_date.year, day_date.month, day_date.day, 0, 0)
+                end_view = datetime(day_date.year, day_date.month, day_date.day, 23, 59, 59)
+                ax.set_xlim(start_view, end_view)
+    
+            ax.set_title(spec["title"])
+            ax.set_xlabel("Čas")
+            ax.set_ylabel("Hodnota")
+    
+            handles, labels = ax.get_legend_handles_labels()
+            if handles:
+                leg = ax.legend(
+                    handles,
+                    labels,
+                    loc="upper right",
+                    fontsize=9,
+                    facecolor="#2d2d2d",
+                    edgecolor="#3d3d3d",
+                )
+                for t in leg.get_texts():
+                    t.set_color("#e0e0e0")
     
+            # 4.4.7a: symetrické okraje vlevo/vpravo
+            fig.subplots_adjust(**daily_adjust)
+            return
+
+        dates, performed, goals = spec["dates"], spec["performed"], spec["goals"]
+        bar_colors, start_date = spec["bar_colors"], spec["start_date"]
+        xlabel_format = spec["xlabel_format"]
+        bars_adjust = dict(left=0.03, right=0.97, top=0.962, bottom=(0.065 if mode == "monthly" else 0.035))
+
+        # Úroveň detailu: na úzkém grafu se sousední dny seskupí (sloupec = nejvyšší den
+        # skupiny s jeho barvou, cílová čára = minima a maxima skupin)
+        lod = SeriesDownsampler.bucket_size(len(dates), SeriesDownsampler.axes_pixels(fig, bars_adjust))
         bar_w = 0.8 if mode == "weekly" else 0.6
-        ax.bar(dates, performed, width=bar_w, label="Výkon", color=bar_colors, alpha=0.85)
-        ax.plot(dates, goals, label="Cíl", color="#FFD700", linewidth=2, marker="o", markersize=3)
+        bar_dates, bar_heights, bar_cols, bar_widths = dates, performed, bar_colors, bar_w
+        goal_dates, goal_values = dates, goals
+        if lod > 1:
+            picks = SeriesDownsampler.bucket_argmax(performed, lod)
+            bar_dates = []
+            bar_widths = []
+            for first in range(0, len(dates), lod):
+                size = min(lod, len(dates) - first)
+                bar_dates.append(datetime.combine(dates[first], datetime.min.time()) + timedelta(days=(size - 1) / 2))
+                bar_widths.append(bar_w * size)
+            bar_heights = [performed[i] for i in picks]
+            bar_cols = [bar_colors[i] for i in picks]
+            goal_picks = SeriesDownsampler.min_max_indices(goals, lod)
+            goal_dates = [dates[i] for i in goal_picks]
+            goal_values = [goals[i] for i in goal_picks]
+
+        bars_key = spec["key"] + (lod,)
+        state = _reuse(bars_key)
+        if state is not None:
+            # Stejný rozsah: jen výšky/barvy sloupců, cílová čára a rozsah osy Y
+            for rect, v, c in zip(state["bars"], bar_heights, bar_cols):
+                rect.set_height(v)
+                rect.set_facecolor(c)
+            if lod > 1:
+                state["goal_line"].set_data(goal_dates, goal_values)
+            else:
+                state["goal_line"].set_ydata(goals)
+            ax = state["ax"]
+            # Značka „Výkon“ v legendě nese barvu prvního sloupce
+            leg = ax.get_legend()
+            if leg is not None and bar_cols:
+                for handle, text in zip(leg.legend_handles, leg.get_texts()):
+                    if text.get_text() == "Výkon":
+                        handle.set_facecolor(bar_cols[0])
+            # Sloupce stojí na nule -> datové meze Y přímo (relim by procházel každý sloupec)
+            ax.dataLim.intervaly = (min(0.0, min(performed), min(goals)), max(0.0, max(performed), max(goals)))
+            ax.autoscale_view(scalex=False)
+            if state.get("start_text") is not None:
+                y0, y1 = ax.get_ylim()
+                state["start_text"].set_y(y1 - (y1 - y0) * 0.03)
+            return
+
+        ax, state = _new_axes(bars_key, bars_adjust)
+        state["lod"] = lod
+        state["days"] = len(dates)
+        state["bars"] = ax.bar(bar_dates, bar_heights, width=bar_widths, label="Výkon", color=bar_cols, alpha=0.85)
+        (state["goal_line"],) = ax.plot(
+            goal_dates, goal_values, label="Cíl", color="#FFD700", linewidth=2, marker="o", markersize=3
+        )
     
         # Svislá čára začátku cvičení + text uvnitř grafu
         if start_date >= dates[0] and start_date <= dates[-1]:
@@ -6819,7 +10824,7 @@ class FitnessTrackerApp(QMainWindow):
             try:
                 y0, y1 = ax.get_ylim()
                 y_text = y1 - (y1 - y0) * 0.03
-                ax.text(
+                state["start_text"] = ax.text(
                     start_date,
                     y_text,
                     f"Start {start_date.strftime('%d.%m.')}",
@@ -6851,14 +10856,7 @@ class FitnessTrackerApp(QMainWindow):
             )
     
         # Titulek
-        if mode == "weekly":
-            week_no = range_end.isocalendar().week
-            ax.set_title(f"Týden {week_no}", fontsize=14)
-        elif mode == "monthly":
-            month_name = _CZ_MONTH[range_start.month]
-            ax.set_title(f"{month_name} {range_start.year}", fontsize=14)
-        else:
-            ax.set_title(f"Rok {selected_year}", fontsize=14)
+        ax.set_title(spec["title"], fontsize=14)
     
         # Legenda do pravého horního rohu
         handles, labels = ax.get_legend_handles_labels()
@@ -6875,8 +10873,7 @@ class FitnessTrackerApp(QMainWindow):
                 t.set_color("#e0e0e0")
     
         # 4.4.7a: symetrické okraje vlevo/vpravo
-        fig.subplots_adjust(left=0.03, right=0.97, top=0.962, bottom=(0.065 if mode == "monthly" else 0.035))
-        canvas.draw()
+        fig.subplots_adjust(**bars_adjust)
 
     def create_exercise_tab(self, exercise_type, icon):
         """Vytvoří záložku pro konkrétní cvičení - BEZ přidávání (jen layout a tabulka záznamů)."""
@@ -6903,14 +10900,9 @@ class FitnessTrackerApp(QMainWindow):
         year_selector.setMinimumWidth(80)
 
         # Naplnění roků
-        years = set()
+        # Roky jen z klíčů (u dat po rocích bez načítání starších roků)
         today = datetime.now().date()
-        for k in self.data.get("workouts", {}).keys():
-            try:
-                d = datetime.strptime(k[:10], "%Y-%m-%d").date()
-                years.add(d.year)
-            except Exception:
-                pass
+        years = {int(y) for y in YearPartitionedDict.years(self.data.get("workouts", {})) if y != "0000"}
         if not years:
             years = {today.year}
         years = sorted(years)
@@ -6975,11 +10967,17 @@ class FitnessTrackerApp(QMainWindow):
         left_layout.addLayout(bulk_actions_layout)
 
         # ==================== TABULKA ZÁZNAMŮ ====================
-        tree = QTreeWidget()
+        tree = QTreeView()
         tree.setObjectName(f"tree_{exercise_type}")
-        tree.setColumnCount(4)
-        tree.setHeaderLabels(["📅 Den", "⏱️ Čas", "💪 Hodnota", "Poznámka"])
-        tree.setSelectionMode(QTreeWidget.ExtendedSelection)
+        tree_model = RecordTreeModel(
+            exercise_type, lambda: self.data.get("workouts", {}), self.calculate_goal, tree.font(), tree
+        )
+        tree.setModel(tree_model)
+        self.exercise_tree_models[exercise_type] = tree_model
+        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        tree.setSelectionBehavior(QAbstractItemView.SelectItems)
+        tree.setAlternatingRowColors(False)
+        tree.setUniformRowHeights(True)
         tree.setSortingEnabled(False)
 
         header = tree.header()
@@ -7053,6 +11051,7 @@ class FitnessTrackerApp(QMainWindow):
         if not hasattr(self, "exercise_calendar_widgets"):
             self.exercise_calendar_widgets = {}
         self.exercise_calendar_widgets[exercise_type] = calendar_inner_layout
+        self.exercise_calendar_heatmaps.pop(exercise_type, None)
         calendar_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         calendar_layout.addWidget(calendar_widget)
 
@@ -7119,14 +11118,14 @@ class FitnessTrackerApp(QMainWindow):
     
     def on_exercise_tree_context_menu(self, pos, tree, exercise_type):
         """Zobrazí kontextové menu pro záznamy ve stromu cvičení."""
-        item = tree.itemAt(pos)
-        if not item:
+        index = tree.indexAt(pos)
+        if not index.isValid():
             return
 
         menu = QMenu(self)
         
         # Načti metadata pro identifikaci
-        payload = item.data(3, Qt.UserRole)
+        payload = index.data(Qt.UserRole)
         
         # Zjistíme typ
         item_type = "unknown"
@@ -7162,10 +11161,10 @@ class FitnessTrackerApp(QMainWindow):
                             else:
                                 # Fallback pro velmi staré záznamy bez id: zkus podle času+hodnoty
                                 try:
-                                    target_val = float(item.text(1))
+                                    target_val = float(index.siblingAtColumn(1).data())
                                 except Exception:
                                     target_val = None
-                                time_only = (item.text(2) or "").strip()
+                                time_only = (index.siblingAtColumn(2).data() or "").strip()
                                 removed = False
                                 for _i, _r in enumerate(recs):
                                     if not isinstance(_r, dict):
@@ -7195,16 +11194,8 @@ class FitnessTrackerApp(QMainWindow):
                                 del self.data["workouts"][date_str][exercise_type]
                             if not self.data["workouts"][date_str]:
                                 del self.data["workouts"][date_str]
-                                
-                            self.save_data()
-                            self.update_exercise_tab(exercise_type)
-                            self.refresh_exercise_calendar(exercise_type)
-                            if exercise_type in self.chart_modes:
-                                self.update_performance_chart(exercise_type, self.chart_modes[exercise_type])
-                            self.refresh_add_tab_goals()
-                            self.apply_add_tab_goals_gradient()
-                            self.recompute_bmi_plan()
-                            self.apply_weekly_plan_gradient()
+                            self.mark_workout_day_changed(exercise_type, date_str)
+                            self.notify_data_changed("workouts", exercise_type, date_str)
                             self.show_message("Smazáno", "Záznam byl odstraněn.")
         
         elif item_type == "day":
@@ -7217,7 +11208,7 @@ class FitnessTrackerApp(QMainWindow):
                 date_str = payload.get("date")
                 if not date_str: 
                     # Fallback parsing z textu, kdyby payload chyběl
-                    txt = item.text(0)
+                    txt = index.siblingAtColumn(0).data() or ""
                     date_str = txt.split(" ", 1)[1] if " " in txt else txt
 
                 reply = QMessageBox.question(
@@ -7229,15 +11220,8 @@ class FitnessTrackerApp(QMainWindow):
                         del self.data["workouts"][date_str][exercise_type]
                         if not self.data["workouts"][date_str]:
                             del self.data["workouts"][date_str]
-                            
-                        self.save_data()
-                        self.update_exercise_tab(exercise_type)
-                        self.refresh_exercise_calendar(exercise_type)
-                        if exercise_type in self.chart_modes:
-                            self.update_performance_chart(exercise_type, self.chart_modes[exercise_type])
-                        self.refresh_add_tab_goals()
-                        self.apply_add_tab_goals_gradient()
-                        self.apply_weekly_plan_gradient()
+                        self.mark_workout_day_changed(exercise_type, date_str)
+                        self.notify_data_changed("workouts", exercise_type, date_str)
                         self.show_message("Smazáno", "Záznamy dne byly odstraněny.")
                         
         else:
@@ -7302,12 +11286,12 @@ class FitnessTrackerApp(QMainWindow):
 
     def show_tree_context_menu(self, position, exercise_type):
         """Zobrazí kontextové menu pro tree položky"""
-        tree = self.findChild(QTreeWidget, f"tree_{exercise_type}")
+        tree = self.findChild(QTreeView, f"tree_{exercise_type}")
         if not tree:
             return
         
-        item = tree.itemAt(position)
-        if not item:
+        item = tree.indexAt(position).siblingAtColumn(0)
+        if not item.isValid():
             return
         
         from PySide6.QtWidgets import QMenu
@@ -7316,7 +11300,8 @@ class FitnessTrackerApp(QMainWindow):
         menu = QMenu()
         
         # Zjisti, zda je to parent (den) nebo child (záznam)
-        is_parent = item.parent() is None
+        data = item.data(Qt.UserRole)
+        is_parent = not (isinstance(data, dict) and data.get("type") == "record")
         
         if is_parent:
             # Menu pro den - pouze smazat
@@ -7326,7 +11311,6 @@ class FitnessTrackerApp(QMainWindow):
         else:
             # Menu pro záznam - edit a smazat
             edit_action = QAction("✏️ Upravit záznam", self)
-            data = item.data(3, Qt.UserRole)
             if data:
                 edit_action.triggered.connect(lambda: self.edit_workout(data['exercise'], data['date'], data['record_id']))
             menu.addAction(edit_action)
@@ -7340,9 +11324,9 @@ class FitnessTrackerApp(QMainWindow):
         menu.exec(tree.viewport().mapToGlobal(position))
 
     def delete_day_records(self, exercise_type, day_item):
-        """Smaže všechny záznamy pro daný den"""
+        """Smaže všechny záznamy pro daný den (day_item = QModelIndex řádku dne)"""
         # Získej datum z textu
-        date_text = day_item.text(0)
+        date_text = day_item.siblingAtColumn(0).data() or ""
         # Odstranění ikony a získání data
         date_str = date_text.split(' ', 1)[1] if ' ' in date_text else date_text
         
@@ -7363,20 +11347,14 @@ class FitnessTrackerApp(QMainWindow):
                 
                 if not self.data['workouts'][date_str]:
                     del self.data['workouts'][date_str]
-                
-                self.save_data()
-                self.update_exercise_tab(exercise_type)
-                self.refresh_exercise_calendar(exercise_type)
-                self.refresh_add_tab_goals()
-                self.apply_add_tab_goals_gradient()
-                self.recompute_bmi_plan()
-                self.apply_weekly_plan_gradient()
+                self.mark_workout_day_changed(exercise_type, date_str)
+                self.notify_data_changed("workouts", exercise_type, date_str)
                 
                 self.show_message("Smazáno", f"Všechny záznamy pro {date_str} byly smazány")
 
     def delete_single_record(self, exercise_type, record_item):
-        """Smaže jeden záznam"""
-        data = record_item.data(3, Qt.UserRole)
+        """Smaže jeden záznam (record_item = QModelIndex řádku záznamu)"""
+        data = record_item.data(Qt.UserRole)
         if not data:
             return
         
@@ -7406,46 +11384,31 @@ class FitnessTrackerApp(QMainWindow):
                     
                     if not self.data['workouts'][date_str]:
                         del self.data['workouts'][date_str]
-                
-                self.save_data()
-                self.update_exercise_tab(exercise_type)
-                self.refresh_exercise_calendar(exercise_type)
-                self.refresh_add_tab_goals()
+                self.mark_workout_day_changed(exercise_type, date_str)
+                self.notify_data_changed("workouts", exercise_type, date_str)
                 
                 self.show_message("Smazáno", "Záznam byl smazán")
 
     def delete_selected_records(self, exercise_type):
-        """Smaže vybrané záznamy v levém přehledu (QTreeWidget)."""
-        tree = self.findChild(QTreeWidget, f"tree_{exercise_type}")
-        if not tree:
+        """Smaže vybrané záznamy v levém přehledu (QTreeView nad RecordTreeModel)."""
+        tree = self.findChild(QTreeView, f"tree_{exercise_type}")
+        model = self.exercise_tree_models.get(exercise_type)
+        if not tree or model is None:
             self.show_message("Chyba", "Strom záznamů nebyl nalezen.", QMessageBox.Warning)
             return
     
-        selected_items = tree.selectedItems()
-        if not selected_items:
+        # Výběr je po buňkách -> jeden řádek (uzel) jen jednou
+        selected_rows = {}
+        for index in tree.selectionModel().selectedIndexes():
+            selected_rows.setdefault(id(index.internalPointer()), index.siblingAtColumn(0))
+        if not selected_rows:
             self.show_message("Informace", "Nejprve vyber záznam(y) ke smazání.", QMessageBox.Information)
             return
     
-        # Pomocná funkce pro sběr ID z itemu (a jeho dětí)
+        # Záznamy vybraného řádku: záznam sám, u dne všechny jeho záznamy (i nerozbalené)
         to_delete = []  # list[(date_str, record_id)]
-        
-        def collect_records(item):
-            payload = item.data(3, Qt.UserRole)
-            if isinstance(payload, dict):
-                itype = payload.get("type")
-                if itype == "record":
-                    to_delete.append((payload["date"], payload["record_id"]))
-                elif itype == "day" or itype == "month":
-                    # Je to kontejner, projdi děti
-                    for i in range(item.childCount()):
-                        collect_records(item.child(i))
-            else:
-                # Fallback kdyby payload chyběl, zkus děti
-                for i in range(item.childCount()):
-                    collect_records(item.child(i))
-
-        for item in selected_items:
-            collect_records(item)
+        for index in selected_rows.values():
+            to_delete.extend(model.record_keys(index))
     
         # Dedup
         to_delete = list({(d, r) for (d, r) in to_delete})
@@ -7480,15 +11443,12 @@ class FitnessTrackerApp(QMainWindow):
                         del self.data["workouts"][date_str][exercise_type]
                         if not self.data["workouts"][date_str]:
                             del self.data["workouts"][date_str]
-    
-        self.save_data()
-    
-        # Refresh UI
-        self.update_exercise_tab(exercise_type)
-        self.refresh_exercise_calendar(exercise_type)
-        if exercise_type in self.chart_modes:
-            self.update_performance_chart(exercise_type, self.chart_modes[exercise_type])
-        self.refresh_add_tab_goals()
+        changed_dates = sorted({d for (d, _r) in to_delete})
+        for date_str in changed_dates:
+            self.mark_workout_day_changed(exercise_type, date_str)
+
+        # Jedno oznámení za celé smazání (rozsah přes všechny dotčené dny)
+        self.notify_data_changed("workouts", exercise_type, changed_dates[0], changed_dates[-1])
     
         self.show_message("Smazáno", f"{len(to_delete)} záznamů bylo smazáno.")
 
@@ -7509,11 +11469,14 @@ class FitnessTrackerApp(QMainWindow):
         except Exception as e:
             print(f"Chyba při aktualizaci záložky {exercise_type}: {e}")
 
-    def calculate_goal(self, exercise_type, date_str):
-        """Vypočítá cíl pro dané datum s respektem k per-cvičení startu."""
+    def get_goal_schedule(self, exercise_type, year):
+        """Vrátí (a případně sestaví) rozpis denních cílů cvičení pro daný rok."""
+        key = (exercise_type, year)
+        schedule = self.goal_schedules.get(key)
+        if schedule is not None:
+            return schedule
+
         try:
-            date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            year = date.year
             settings = self.get_year_settings(year)
     
             # Fallback klíčů s/bez diakritiky
@@ -7523,7 +11486,9 @@ class FitnessTrackerApp(QMainWindow):
                 if old_key in settings['base_goals']:
                     exercise_type = old_key
                 else:
-                    return 50
+                    schedule = GoalSchedule(year, constant=50)
+                    self.goal_schedules[key] = schedule
+                    return schedule
     
             base_goal = settings['base_goals'][exercise_type]
             weekly_increment = settings['weekly_increment'][exercise_type]
@@ -7540,24 +11505,38 @@ class FitnessTrackerApp(QMainWindow):
                 else:
                     start_str = settings.get("start_date", f"{year}-01-01")
             start_date = datetime.strptime(start_str, "%Y-%m-%d").date()
-    
-            if date < start_date:
-                return 0
-    
-            # Logika: první „zlomený“ týden → base_goal, pak každý další týden + increment
-            days_diff = (date - start_date).days
-            first_week_days = 7 - start_date.weekday()
-            if days_diff < first_week_days:
-                return base_goal
-    
-            days_after_first = days_diff - first_week_days
-            full_weeks = days_after_first // 7
-            return base_goal + (full_weeks + 1) * weekly_increment
-    
+
+            schedule = GoalSchedule(year, start_date, base_goal, weekly_increment)
+        except Exception as e:
+            print(f"Chyba v rozpisu cílů pro {exercise_type}, {year}: {e}")
+            schedule = GoalSchedule(year, constant=50)
+
+        self.goal_schedules[key] = schedule
+        return schedule
+
+    def invalidate_goal_schedules(self):
+        """Zahodí rozpisy cílů (změna year_settings / startů cvičení)."""
+        self.goal_schedules.clear()
+        self.balance_index.invalidate()
+        self.invalidate_calendar_tooltips()
+        self.invalidate_exercise_trees()
+
+    def calculate_goal(self, exercise_type, date_str):
+        """Vypočítá cíl pro dané datum s respektem k per-cvičení startu."""
+        try:
+            date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            return self.get_goal_schedule(exercise_type, date.year).goal_at(date)
         except Exception as e:
             print(f"Chyba v calculate_goal pro {exercise_type}, {date_str}: {e}")
             return 50
 
+    def calculate_goal_sum(self, exercise_type, from_date, to_date):
+        """Součet denních cílů za from_date..to_date (včetně, přes roky)."""
+        total = 0
+        for year in range(from_date.year, to_date.year + 1):
+            total += self.get_goal_schedule(exercise_type, year).sum_range(from_date, to_date)
+        return total
+
     def get_goal_calculation_text(self, exercise_type, date_str):
         """Vrátí text s vysvětlením výpočtu"""
         target_date = datetime.strptime(date_str, '%Y-%m-%d')
@@ -7580,46 +11559,18 @@ class FitnessTrackerApp(QMainWindow):
     
     def calculate_yearly_goal(self, exercise_type, year):
         """Vypočítá celkový roční cíl"""
-        start_date = datetime(year, 1, 1)
-        end_date = datetime(year, 12, 31)
-        
-        total_goal = 0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            daily_goal = self.calculate_goal(exercise_type, date_str)
-            total_goal += daily_goal
-            current_date += timedelta(days=1)
-        
-        return total_goal
+        return self.get_goal_schedule(exercise_type, year).total()
     
     def calculate_yearly_progress(self, exercise_type, year):
         """Vypočítá aktuální progress"""
         total_goal = self.calculate_yearly_goal(exercise_type, year)
+        total_performed = self.workout_store.range_sum(
+            exercise_type, datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
+        )
         
-        total_performed = 0
-        for date_str, workouts in self.data['workouts'].items():
-            workout_year = int(date_str.split('-')[0])
-            if workout_year == year and exercise_type in workouts:
-                records = workouts[exercise_type]
-                
-                if isinstance(records, list):
-                    total_performed += sum(r['value'] for r in records)
-                elif isinstance(records, dict):
-                    total_performed += records.get('value', 0)
-        
-        today = datetime.now()
+        today = datetime.now().date()
         if year == today.year:
-            goal_to_date = 0
-            start_date = datetime(year, 1, 1)
-            current_date = start_date
-            
-            while current_date <= today:
-                date_str = current_date.strftime('%Y-%m-%d')
-                daily_goal = self.calculate_goal(exercise_type, date_str)
-                goal_to_date += daily_goal
-                current_date += timedelta(days=1)
+            goal_to_date = self.get_goal_schedule(exercise_type, year).sum_range(datetime(year, 1, 1).date(), today)
         elif year < today.year:
             goal_to_date = total_goal
         else:
@@ -7662,13 +11613,8 @@ class FitnessTrackerApp(QMainWindow):
                         self.data['workouts'][date_str][exercise_type] = [r for r in records if r['id'] != record_id]
                     elif isinstance(records, dict):
                         del self.data['workouts'][date_str][exercise_type]
-                    
-                    self.save_data()
-                    self.update_exercise_tab(exercise_type)
-                    self.refresh_exercise_calendar(exercise_type)
-                    self.refresh_add_tab_goals()
-                    if exercise_type in self.chart_modes:
-                        self.update_performance_chart(exercise_type, self.chart_modes[exercise_type])
+                    self.mark_workout_day_changed(exercise_type, date_str)
+                    self.notify_data_changed("workouts", exercise_type, date_str)
                     
                     self.show_message("Smazáno", "Záznam byl odstraněn.")
                 return
@@ -7686,17 +11632,8 @@ class FitnessTrackerApp(QMainWindow):
             except:
                 # Fallback kdyby byl timestamp poškozený
                 target_record['timestamp'] = f"{date_str} {new_time_str}"
-            
-            self.save_data()
-            
-            # Refresh UI
-            self.update_exercise_tab(exercise_type)
-            self.refresh_exercise_calendar(exercise_type)
-            self.refresh_add_tab_goals()
-            
-            # Refresh grafu
-            if exercise_type in self.chart_modes:
-                self.update_performance_chart(exercise_type, self.chart_modes[exercise_type])
+            self.mark_workout_day_changed(exercise_type, date_str)
+            self.notify_data_changed("workouts", exercise_type, date_str)
             
             self.show_message("Upraveno", f"Záznam upraven na: {new_value} ks ({new_time_str})")
 
@@ -7732,7 +11669,7 @@ class FitnessTrackerApp(QMainWindow):
     def update_exercise_tab(self, exercise_type):
         """
         Aktualizuje statistiky a strom záznamů daného cvičení.
-        Struktura: Měsíc (YYYY-MM) -> Týden (ISO) -> Den (YYYY-MM-DD) -> Záznamy.
+        Struktura: Měsíc (YYYY-MM) -> Týden (ISO) -> Den (YYYY-MM-DD) -> Záznamy (RecordTreeModel).
         """
         try:
             if exercise_type not in self.exercise_year_selectors:
@@ -7746,340 +11683,67 @@ class FitnessTrackerApp(QMainWindow):
             # Přehledové boxy / progress bar apod.
             self.update_detailed_overview(exercise_type, selected_year)
 
-            tree = self.findChild(QTreeWidget, f"tree_{exercise_type}")
-            if not tree:
+            tree = self.findChild(QTreeView, f"tree_{exercise_type}")
+            model = self.exercise_tree_models.get(exercise_type)
+            if not tree or model is None:
                 return
 
-            # --- UCHOVÁNÍ VÝBĚRU + ROZBALENÍ (unikátní klíče, aby se netloukly týdny) ---
-            preserved = set()             # {(date_str, record_id)}
-            expanded_items = set()
-
-            iterator = QTreeWidgetItemIterator(tree)
-            while iterator.value():
-                item = iterator.value()
-
-                if item.isExpanded():
-                    payload = item.data(3, Qt.UserRole)
-                    if isinstance(payload, dict):
-                        t = payload.get("type")
-                        if t == "month":
-                            expanded_items.add(("month", payload.get("key")))
-                        elif t == "week":
-                            expanded_items.add(("week", payload.get("month_key"), payload.get("week")))
-                        elif t == "day":
-                            expanded_items.add(("day", payload.get("date")))
-                        else:
-                            expanded_items.add(("text", item.text(0)))
-                    else:
-                        expanded_items.add(("text", item.text(0)))
-
-                if item.isSelected():
-                    payload = item.data(3, Qt.UserRole)
-                    if isinstance(payload, dict) and "date" in payload and "record_id" in payload:
-                        preserved.add((payload["date"], payload["record_id"]))
-
-                iterator += 1
-
-            first_population = (tree.property("_ever_populated") is not True)
-
-            tree.blockSignals(True)
-            tree.clear()
-
-            # Multi-select a výkon
-            tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
-            tree.setSelectionBehavior(QAbstractItemView.SelectItems)
-            tree.setAlternatingRowColors(False)
-            tree.setUniformRowHeights(True)
-
-            # --- Data po dnech (jen zvolený rok) ---
-            days_data: dict[str, list[dict]] = {}
-            for ds, perday in self.data.get("workouts", {}).items():
-                year_here = int(ds.split("-")[0]) if "-" in ds else None
-                if year_here != selected_year:
-                    continue
-                if exercise_type in perday:
-                    recs = perday[exercise_type]
-                    if isinstance(recs, list):
-                        days_data.setdefault(ds, []).extend(recs)
-                    elif isinstance(recs, dict):
-                        days_data.setdefault(ds, []).append(recs)
-
-            # Dny: nejnovější datum první
-            sorted_dates = sorted(days_data.keys(), reverse=True)
-
-            # Seskupení do měsíců
-            from collections import defaultdict
-            months_map = defaultdict(list)
-            for d in sorted_dates:
-                month_key = d[:7]  # YYYY-MM
-                months_map[month_key].append(d)
-
-            sorted_months = sorted(months_map.keys(), reverse=True)
-
-            # Připrav fonty
-            try:
-                from PySide6.QtGui import QFont
-                child_val_font = QFont()
-                child_val_font.setBold(True)
-                child_time_font = QFont("Menlo")
-                base_size = tree.font().pointSize() if tree.font().pointSize() > 0 else 11
-                child_time_font.setPointSize(max(base_size - 1, 9))
-
-                month_font = QFont()
-                month_font.setBold(True)
-                month_font.setPointSize(base_size + 1)
-
-                week_font = QFont()
-                week_font.setBold(True)
-            except Exception:
-                child_val_font = None
-                child_time_font = None
-                month_font = None
-                week_font = None
-
-            # Pomocná funkce barvy (přesně dle zadání)
-            def _pct_color(p: int) -> QColor:
-                if p >= 200:
-                    return QColor("#006400")
-                elif p > 100:
-                    intensity = min((p / 100.0) - 1.0, 1.0)
-                    green_val = int(144 + (100 - 144) * intensity)
-                    return QColor(0, green_val, 0)
-                elif p == 100:
-                    return QColor("#FFD700")
-                elif p >= 50:
-                    intensity = (1.0 - (p / 100.0)) * 2.0
-                    val = int(107 + (255 - 107) * (1.0 - intensity))
-                    return QColor(255, val, val)
-                else:
-                    return QColor("#8B0000")
-
-            current_month_str = datetime.now().strftime("%Y-%m")
-            today_str = datetime.now().strftime("%Y-%m-%d")
-
-            cz_months = {
-                "01": "Leden", "02": "Únor", "03": "Březen", "04": "Duben", "05": "Květen", "06": "Červen",
-                "07": "Červenec", "08": "Srpen", "09": "Září", "10": "Říjen", "11": "Listopad", "12": "Prosinec"
-            }
-
-            for m_key in sorted_months:
-                y_str, m_str = m_key.split("-")
-                m_name = cz_months.get(m_str, m_str)
-                month_label = f"{m_name} {y_str}"
-
-                # (1) měsíční suma (suma hodnot)
-                month_total_value = 0
-                for date_str in months_map[m_key]:
-                    records = days_data.get(date_str, [])
-                    try:
-                        month_total_value += sum(r.get("value", 0) for r in records)
-                    except Exception:
-                        pass
-
-                month_item = QTreeWidgetItem(tree)
-                month_item.setText(0, month_label)
-                month_item.setText(1, f"Σ {month_total_value}")
-                month_item.setData(3, Qt.UserRole, {"type": "month", "key": m_key})
-
-                if month_font:
-                    month_item.setFont(0, month_font)
-                    month_item.setFont(1, month_font)
-
-                # (2) barevné odlišení řádků pro měsíce
-                month_bg = QColor(36, 52, 71)  # odlišené od týdnů
-                for c in range(tree.columnCount()):
-                    month_item.setBackground(c, month_bg)
-
-                month_item.setTextAlignment(1, Qt.AlignCenter)
-
-                is_current = (m_key == current_month_str)
-                if first_population:
-                    month_item.setExpanded(is_current)
-                else:
-                    if ("month", m_key) in expanded_items:
-                        month_item.setExpanded(True)
-
-                # (2) týdenní seskupení uvnitř měsíce
-                week_map: dict[int, list[str]] = {}
-                week_order: list[int] = []
-                for date_str in months_map[m_key]:
-                    try:
-                        ddt = datetime.strptime(date_str, "%Y-%m-%d").date()
-                        wno = int(ddt.isocalendar().week)
-                    except Exception:
-                        continue
-                    if wno not in week_map:
-                        week_map[wno] = []
-                        week_order.append(wno)
-                    week_map[wno].append(date_str)
-
-                for wno in week_order:
-                    # (1) týdenní suma (suma hodnot za týden)
-                    week_total_value = 0
-                    for date_str in week_map.get(wno, []):
-                        records = days_data.get(date_str, [])
-                        try:
-                            week_total_value += sum(r.get("value", 0) for r in records)
-                        except Exception:
-                            pass
-
-                    week_item = QTreeWidgetItem(month_item)
-                    week_item.setText(0, f"📆 Týden {wno}")
-                    week_item.setText(1, f"Σ {week_total_value}")
-                    week_item.setTextAlignment(1, Qt.AlignCenter)
-                    week_item.setData(3, Qt.UserRole, {"type": "week", "month_key": m_key, "week": wno})
-
-                    if week_font:
-                        week_item.setFont(0, week_font)
-                        week_item.setFont(1, week_font)
+            # Strom se znovu načítá jen při změně roku nebo po hromadné změně dat;
+            # změny jednotlivých dnů už do modelu promítl mark_workout_day_changed
+            if model.stale or model.year != selected_year:
+                self.reload_exercise_tree(tree, model, selected_year)
 
-                    # (2) barevné odlišení řádků pro týdny
-                    week_bg = QColor(43, 43, 43)  # odlišené od měsíců
-                    for c in range(tree.columnCount()):
-                        week_item.setBackground(c, week_bg)
-
-                    contains_today = (today_str in week_map.get(wno, []))
-                    if first_population:
-                        week_item.setExpanded(contains_today and (m_key == current_month_str))
-                    else:
-                        if ("week", m_key, wno) in expanded_items:
-                            week_item.setExpanded(True)
-
-                    for date_str in week_map[wno]:
-                        records = days_data[date_str]
-
-                        total_day_value = sum(r.get("value", 0) for r in records)
-                        record_count = len(records)
-                        goal = self.calculate_goal(exercise_type, date_str)
-                        if not isinstance(goal, int):
-                            goal = int(goal) if goal else 0
-                        percent = (total_day_value / goal * 100) if goal > 0 else 0
-
-                        # Barva podle logiky
-                        color_status = _pct_color(int(percent))
-
-                        if percent >= 100:
-                            status_icon = "✅"
-                        elif percent >= 50:
-                            status_icon = "⏳"
-                        else:
-                            status_icon = "❌"
-
-                        day_item = QTreeWidgetItem(week_item)
-                        day_item.setText(0, f"{status_icon} {date_str}")
-                        day_item.setText(1, f"{total_day_value} ({record_count}×)")
-                        day_item.setText(2, f"{percent:.0f}%")
-
-                        day_item.setData(3, Qt.UserRole, {"type": "day", "date": date_str})
-
-                        # Standardní barvy pro sloupce 0 (datum) a 1 (hodnota)
-                        day_item.setForeground(0, QColor(255, 255, 255))
-                        day_item.setForeground(1, QColor(200, 200, 200))
-
-                        # Kontrastní text pro barevný sloupec (2)
-                        is_light = False
-                        if percent == 100:
-                            is_light = True  # Gold
-                        elif 50 <= percent < 100:
-                            is_light = True  # Light red/pink
-                        text_col = QColor(0, 0, 0) if is_light else QColor(255, 255, 255)
-
-                        day_item.setBackground(2, color_status)
-                        day_item.setForeground(2, text_col)
-
-                        day_item.setTextAlignment(1, Qt.AlignCenter)
-                        day_item.setTextAlignment(2, Qt.AlignCenter)
-
-                        if first_population:
-                            day_item.setExpanded(date_str == today_str)
-                            if date_str == today_str:
-                                # při prvním naplnění rozbal i rodiče, aby byl dnešek opravdu vidět
-                                try:
-                                    week_item.setExpanded(True)
-                                    month_item.setExpanded(True)
-                                except Exception:
-                                    pass
-                        else:
-                            if ("day", date_str) in expanded_items:
-                                day_item.setExpanded(True)
-
-                        # --- ZÁZNAMY ---
-                        def _time_key(rec: dict) -> str:
-                            ts = rec.get("timestamp", "")
-                            if " " in ts:
-                                return ts.split(" ", 1)[1]
-                            return ts
-
-                        records_sorted_asc = sorted(records, key=_time_key)
-                        cumulative_pairs = []
-                        running_total = 0
-                        for rec in records_sorted_asc:
-                            running_total += rec.get("value", 0)
-                            cumulative_pairs.append((rec, running_total))
-
-                        for idx, (record, running_total) in enumerate(reversed(cumulative_pairs)):
-                            value = record.get("value", 0)
-                            timestamp = record.get("timestamp", "N/A")
-                            time_only = timestamp.split(" ")[1] if " " in timestamp else timestamp
-                            record_id = record.get("id", "")
-
-                            if goal > 0:
-                                rec_cum_pct = int(round((running_total / goal) * 100))
-                                pct_text = f"{rec_cum_pct} %"
-                            else:
-                                rec_cum_pct = None
-                                pct_text = "—"
-
-                            rec_item = QTreeWidgetItem(day_item)
-                            rec_item.setText(0, pct_text)
-                            rec_item.setText(1, str(value))
-                            rec_item.setText(2, time_only)
-                            rec_item.setText(3, record_id)
-
-                            rec_item.setData(3, Qt.UserRole, {
-                                "type": "record",
-                                "date": date_str,
-                                "record_id": record_id,
-                                "exercise": exercise_type,
-                            })
-
-                            rec_item.setTextAlignment(0, Qt.AlignCenter)
-                            rec_item.setTextAlignment(1, Qt.AlignCenter)
-                            rec_item.setTextAlignment(2, Qt.AlignCenter)
-
-                            if rec_cum_pct is None:
-                                rec_item.setForeground(0, QColor(200, 200, 200))
-                            else:
-                                # Barva TEXTU procent u záznamu (pozadí ne)
-                                rec_item.setForeground(0, _pct_color(rec_cum_pct))
-
-                            rec_item.setForeground(1, QColor(240, 240, 240))
-                            rec_item.setForeground(2, QColor(180, 180, 180))
-
-                            if child_val_font:
-                                rec_item.setFont(1, child_val_font)
-                            if child_time_font:
-                                rec_item.setFont(2, child_time_font)
-
-                            if idx % 2 == 1:
-                                shade = QColor(255, 255, 255, 14)
-                                rec_item.setBackground(0, shade)
-                                rec_item.setBackground(1, shade)
-                                rec_item.setBackground(2, shade)
-
-                            if (date_str, record_id) in preserved:
-                                rec_item.setSelected(True)
-
-            if first_population:
-                tree.setProperty("_ever_populated", True)
-
-            tree.blockSignals(False)
+            self.exercise_tab_rendered[exercise_type] = self.exercise_tab_stamp(exercise_type, selected_year)
 
         except Exception as e:
             print(f"Chyba při update_exercise_tab pro {exercise_type}: {e}")
             import traceback
             traceback.print_exc()
 
+    def reload_exercise_tree(self, tree, model, year):
+        """Reset modelu stromu pro rok; obnoví rozbalení a výběr záznamů (při prvním načtení rozbalí dnešek)."""
+        today_str = datetime.now().strftime("%Y-%m-%d")
+        first_population = not model.ever_populated
+
+        expanded = [] if first_population else model.expansion_keys(tree)
+        selected = set()
+        for index in tree.selectionModel().selectedIndexes() if tree.selectionModel() else []:
+            payload = model.payload(index)
+            if isinstance(payload, dict) and payload.get("type") == "record":
+                selected.add((payload["date"], payload["record_id"]))
+
+        model.reload(year)
+
+        if first_population:
+            model.ever_populated = True
+            month = model.find_child(model.root, today_str[:7], fetch=False)
+            if month is not None:
+                tree.expand(model.index_of(month))
+            day = model.day_node(today_str) if month is not None else None
+            if day is not None:
+                tree.expand(model.index_of(day.parent))
+                tree.expand(model.index_of(day))
+        else:
+            # Rodiče jsou v seznamu před potomky (procházení od kořene)
+            for kind, key in expanded:
+                if kind == "month":
+                    node = model.find_child(model.root, key, fetch=False)
+                elif kind == "week":
+                    month = model.find_child(model.root, key[0], fetch=False)
+                    node = model.find_child(month, key, fetch=False) if month else None
+                else:
+                    node = model.day_node(key, fetch=False)
+                if node is not None:
+                    tree.expand(model.index_of(node))
+
+        if selected and tree.selectionModel():
+            from PySide6.QtCore import QItemSelectionModel
+
+            for date_str, record_id in selected:
+                node = model.record_node(date_str, record_id)
+                if node is not None:
+                    tree.selectionModel().select(model.index_of(node), QItemSelectionModel.Select)
+
     def update_detailed_overview(self, exercise_type, selected_year):
         """Aktualizuje detailní přehled: Den, Týden, Měsíc, Zbytek roku (pro aktuální rok) nebo Roční souhrn (pro jiné roky)."""
         try:
@@ -8097,13 +11761,7 @@ class FitnessTrackerApp(QMainWindow):
     
             # ===== DNES =====
             day_goal = self.calculate_goal(exercise_type, current_date_str)
-            day_performed = 0
-            if current_date_str in self.data["workouts"] and exercise_type in self.data["workouts"][current_date_str]:
-                records = self.data["workouts"][current_date_str][exercise_type]
-                if isinstance(records, list):
-                    day_performed = sum(r["value"] for r in records)
-                elif isinstance(records, dict):
-                    day_performed = records.get("value", 0)
+            day_performed = self.workout_store.day_total(exercise_type, current_date)
     
             day_diff = day_performed - (day_goal if isinstance(day_goal, int) else 0)
             day_status = f"(+{day_diff})" if day_diff >= 0 else str(day_diff)
@@ -8136,18 +11794,8 @@ class FitnessTrackerApp(QMainWindow):
             if week_end > today:
                 week_end = today
     
-            week_goal = 0
-            week_performed = 0
-            d = week_start
-            while d <= week_end:
-                ds = d.strftime("%Y-%m-%d")
-                g = self.calculate_goal(exercise_type, ds)
-                if isinstance(g, int):
-                    week_goal += g
-                if ds in self.data["workouts"] and exercise_type in self.data["workouts"][ds]:
-                    recs = self.data["workouts"][ds][exercise_type]
-                    week_performed += sum(r["value"] for r in (recs if isinstance(recs, list) else [recs]))
-                d += timedelta(days=1)
+            week_goal = self.calculate_goal_sum(exercise_type, week_start, week_end)
+            week_performed = self.workout_store.range_sum(exercise_type, week_start, week_end)
     
             week_diff = week_performed - week_goal
             lbl_week = self.findChild(QLabel, f"week_section_{exercise_type}")
@@ -8164,18 +11812,8 @@ class FitnessTrackerApp(QMainWindow):
             if month_end > today:
                 month_end = today
     
-            month_goal = 0
-            month_performed = 0
-            d = month_start
-            while d <= month_end:
-                ds = d.strftime("%Y-%m-%d")
-                g = self.calculate_goal(exercise_type, ds)
-                if isinstance(g, int):
-                    month_goal += g
-                if ds in self.data["workouts"] and exercise_type in self.data["workouts"][ds]:
-                    recs = self.data["workouts"][ds][exercise_type]
-                    month_performed += sum(r["value"] for r in (recs if isinstance(recs, list) else [recs]))
-                d += timedelta(days=1)
+            month_goal = self.calculate_goal_sum(exercise_type, month_start, month_end)
+            month_performed = self.workout_store.range_sum(exercise_type, month_start, month_end)
     
             month_diff = month_performed - month_goal
             lbl_month = self.findChild(QLabel, f"month_section_{exercise_type}")
@@ -8185,13 +11823,7 @@ class FitnessTrackerApp(QMainWindow):
     
             # ===== ZBYTEK ROKU =====
             year_end = datetime(selected_year, 12, 31).date()
-            cur = max(today, ex_start)
-            rest_goal = 0
-            while cur <= year_end:
-                g = self.calculate_goal(exercise_type, cur.strftime("%Y-%m-%d"))
-                if isinstance(g, int):
-                    rest_goal -= g
-                cur += timedelta(days=1)
+            rest_goal = -self.calculate_goal_sum(exercise_type, max(today, ex_start), year_end)
             rest_goal += day_performed
     
             lbl_rest = self.findChild(QLabel, f"year_rest_section_{exercise_type}")
@@ -8292,34 +11924,11 @@ class FitnessTrackerApp(QMainWindow):
                 year_end = today
             
             # Spočítat celkové statistiky
-            total_performed = 0
-            total_goal = 0
-            days_with_workout = 0
-            
             current = max(settings_start_date, datetime(selected_year, 1, 1).date())
-            while current <= year_end:
-                date_str = current.strftime("%Y-%m-%d")
-                
-                # Cíl
-                goal = self.calculate_goal(exercise_type, date_str)
-                if isinstance(goal, int):
-                    total_goal += goal
-                
-                # Výkon
-                if date_str in self.data["workouts"] and exercise_type in self.data["workouts"][date_str]:
-                    records = self.data["workouts"][date_str][exercise_type]
-                    if isinstance(records, list):
-                        perf = sum(r["value"] for r in records)
-                        if perf > 0:
-                            days_with_workout += 1
-                        total_performed += perf
-                    elif isinstance(records, dict):
-                        perf = records.get("value", 0)
-                        if perf > 0:
-                            days_with_workout += 1
-                        total_performed += perf
-                
-                current += timedelta(days=1)
+            total_goal = self.calculate_goal_sum(exercise_type, current, year_end)
+            total_performed = self.workout_store.range_sum(exercise_type, current, year_end)
+            _days, day_sums = self.workout_store.day_totals_by_day(exercise_type, current, year_end)
+            days_with_workout = int((day_sums > 0).sum())
             
             # Vypočítat průměr
             total_days = (year_end - settings_start_date).days + 1
@@ -8392,25 +12001,39 @@ class FitnessTrackerApp(QMainWindow):
 
 
     def refresh_exercise_calendar(self, exercise_type):
-        """Vytvoří roční kalendář"""
+        """
+        Aktualizuje roční kalendář (heatmapu).
+
+        Widget se vytváří jednou pro záložku; při změně dat se jen přepočítá
+        pole barev a překreslí, tooltipy se počítají až při najetí myší.
+        """
         try:
             if exercise_type not in self.exercise_calendar_widgets:
                 return
-            
-            calendar_layout = self.exercise_calendar_widgets[exercise_type]
-            
-            # OPRAVA: Vyčisti všechny children včetně layoutů
-            while calendar_layout.count():
-                child = calendar_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-                elif child.layout():
-                    # Vyčisti vnořený layout
-                    while child.layout().count():
-                        sub_child = child.layout().takeAt(0)
-                        if sub_child.widget():
-                            sub_child.widget().deleteLater()
-            
+
+            heatmap = self.exercise_calendar_heatmaps.get(exercise_type)
+            if heatmap is None:
+                calendar_layout = self.exercise_calendar_widgets[exercise_type]
+
+                # OPRAVA: Vyčisti všechny children včetně layoutů
+                while calendar_layout.count():
+                    child = calendar_layout.takeAt(0)
+                    if child.widget():
+                        child.widget().deleteLater()
+                    elif child.layout():
+                        # Vyčisti vnořený layout
+                        while child.layout().count():
+                            sub_child = child.layout().takeAt(0)
+                            if sub_child.widget():
+                                sub_child.widget().deleteLater()
+
+                heatmap = YearHeatmapWidget()
+                heatmap.day_clicked = lambda _ds, _ex=exercise_type: self.on_calendar_day_clicked(_ex, _ds)
+                heatmap.tooltip_provider = lambda _ds, _ex=exercise_type: self.calendar_day_tooltip(_ex, _ds)
+                calendar_layout.addWidget(heatmap)
+                calendar_layout.addStretch()
+                self.exercise_calendar_heatmaps[exercise_type] = heatmap
+
             if exercise_type not in self.exercise_year_selectors:
                 return
             
@@ -8419,29 +12042,69 @@ class FitnessTrackerApp(QMainWindow):
                 return
             
             selected_year = int(selector.currentText())
-            
-            months = ['Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen',
-                      'Červenec', 'Srpen', 'Září', 'Říjen', 'Listopad', 'Prosinec']
-            
-            months_grid = QGridLayout()
-            months_grid.setSpacing(10)
-            months_grid.setContentsMargins(5, 5, 5, 5)
-            
-            for month_num in range(1, 13):
-                month_widget = self.create_month_calendar_for_exercise(selected_year, month_num, months[month_num-1], exercise_type)
-                row = (month_num - 1) // 4
-                col = (month_num - 1) % 4
-                months_grid.addWidget(month_widget, row, col)
-            
-            calendar_layout.addLayout(months_grid)
-            calendar_layout.addStretch()
-            
+
+            self.update_exercise_calendar_heatmap(exercise_type, selected_year)
             self.update_year_statistics(exercise_type, selected_year)
         except Exception as e:
             print(f"Chyba při refresh_exercise_calendar pro {exercise_type}: {e}")
             import traceback
             traceback.print_exc()
 
+    def update_exercise_calendar_heatmap(self, exercise_type, year):
+        """Přepočítá barvy dnů roku a předá je heatmapě (překreslí se jen při změně)."""
+        heatmap = self.exercise_calendar_heatmaps.get(exercise_type)
+        if heatmap is None:
+            return False
+        today = datetime.now().date()
+        start_date = self.get_exercise_start_date(exercise_type, year)
+        first_day = datetime(year, 1, 1).date()
+        days = (datetime(year, 12, 31).date() - first_day).days + 1
+
+        colors = []
+        text_colors = []
+        text_cache = {}
+        for i in range(days):
+            date = first_day + timedelta(days=i)
+            color = self.get_day_color(date.strftime('%Y-%m-%d'), date, today, start_date, exercise_type)
+            if color not in text_cache:
+                text_cache[color] = self._calendar_text_color_for_bg_hex(color)
+            colors.append(color)
+            text_colors.append(text_cache[color])
+
+        today_index = (today - first_day).days if today.year == year else -1
+        return heatmap.set_days(year, colors, text_colors, today_index)
+
+    def calendar_day_tooltip(self, exercise_type, date_str):
+        """
+        HTML tooltip jednoho dne kalendáře – počítá se až při najetí myší
+        a pamatuje se do další změny dat cvičení (nebo do změny dne).
+        """
+        today = datetime.now().date()
+        cache = self.calendar_tooltip_cache.setdefault(exercise_type, {})
+        cached = cache.get(date_str)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        start_date = self.get_exercise_start_date(exercise_type, date.year)
+        color = self.get_day_color(date_str, date, today, start_date, exercise_type)
+        tooltip_text = self.get_day_tooltip(date_str, date, today, start_date, exercise_type)
+        html = self._calendar_tooltip_with_contrast(tooltip_text, color)
+        cache[date_str] = (today, html)
+        return html
+
+    def invalidate_exercise_trees(self):
+        """Stromy záznamů se při příští aktualizaci záložky načtou znovu (hromadná změna / cíle)."""
+        for model in self.exercise_tree_models.values():
+            model.stale = True
+
+    def invalidate_calendar_tooltips(self, exercise_type=None):
+        """Zahodí zapamatované tooltipy kalendáře (jednoho nebo všech cvičení)."""
+        if exercise_type is None:
+            self.calendar_tooltip_cache.clear()
+        else:
+            self.calendar_tooltip_cache.pop(exercise_type, None)
+
     def _calendar_text_color_for_bg_hex(self, bg_hex: str) -> str:
         """
         Vrátí vhodnou barvu textu podle světlosti barvy pozadí (hex).
@@ -8467,176 +12130,140 @@ class FitnessTrackerApp(QMainWindow):
             # V nouzi ponech světlý text (dark theme)
             return "#f0f0f0"
 
-    def create_month_calendar_for_exercise(self, year, month, month_name, exercise_type):
-        """Vytvoří kalendář měsíce s GRADIENTNÍMI BARVAMI - VĚTŠÍ"""
-        group = QGroupBox(f"{month_name}")
-        group.setStyleSheet("""
-            QGroupBox { 
-                font-size: 16px;
-                font-weight: bold;
-                background-color: #1e1e1e;
-                border: 2px solid #0d7377;
-                border-radius: 5px;
-                padding-top: 18px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                subcontrol-position: top center;
-                padding: 3px 8px;
-            }
-        """)
-        layout = QGridLayout()
-        layout.setSpacing(6)
-        
-        first_day = datetime(year, month, 1)
-        first_weekday = (first_day.weekday())  # 0=Mon
-        last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        days_in_month = last_day.day
-        today = datetime.now().date()
-        
-        start_date = self.get_exercise_start_date(exercise_type, year)
-        
-        row = 1
-        col = first_weekday
-        for day in range(1, days_in_month + 1):
-            date = datetime(year, month, day)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            day_label = QLabel(str(day))
-            day_label.setAlignment(Qt.AlignCenter)
-            day_label.setMinimumSize(42, 36)
-            day_label.setFrameStyle(QFrame.Box)
-            
-            color, tooltip_text = self.get_day_color_gradient(date_str, date.date(), today, start_date, exercise_type)
-            border_style = "border: 2px solid #87CEEB;" if date.date() == today else "border: 1px solid #3d3d3d;"
-            text_color = self._calendar_text_color_for_bg_hex(color)
-            day_label.setStyleSheet(f"background-color: {color}; color: {text_color}; font-weight: bold; {border_style} font-size: 16px;")
-            day_label.setToolTip(self._calendar_tooltip_with_contrast(tooltip_text, color))
-    
-            # <<< JEDINÉ DOPLNĚNÍ: klik na den -> přepni graf na 'Den' pro tento den
-            try:
-                day_label.setCursor(Qt.PointingHandCursor)
-                day_label.mousePressEvent = (
-                    lambda ev, _ds=date_str, _ex=exercise_type:
-                        self.on_calendar_day_clicked(_ex, _ds) if ev.button() == Qt.LeftButton else None
-                )
-            except Exception:
-                pass
-            
-            layout.addWidget(day_label, row, col)
-            col += 1
-            if col > 6:
-                col = 0
-                row += 1
-        
-        group.setLayout(layout)
-        return group
-
     def get_day_color_gradient(self, date_str, date, today, start_date, exercise_type):
         """Vrátí gradientní barvu podle výkonu a tooltip"""
-        if date < start_date:
-            return '#000000', "Před začátkem cvičení"
-        
-        # OPRAVA: Budoucnost - spočítej skluz
-        if date > today:
-            goal = self.calculate_goal(exercise_type, date_str)
-            
-            if not isinstance(goal, int):
-                goal = int(goal) if goal else 0
-            
-            # OPRAVA: Výpočet skluzu do konce roku i pro budoucnost
-            year = date.year
-            end_of_year = datetime(year, 12, 31).date()
-            total_diff = self.calculate_total_difference_to_date(exercise_type, date, end_of_year)
-            
-            if total_diff > 0:
-                total_status = f"\n📊 Celkový náskok k 31.12.: +{total_diff}"
-            elif total_diff < 0:
-                total_status = f"\n📊 Celkový skluz k 31.12.: {total_diff}"
-            else:
-                total_status = f"\n📊 Celkový stav k 31.12.: Přesně"
-            
-            return '#8B0000', f"Budoucí den\nCíl: {goal}{total_status}"
-        
+        return (
+            self.get_day_color(date_str, date, today, start_date, exercise_type),
+            self.get_day_tooltip(date_str, date, today, start_date, exercise_type),
+        )
+
+    def _day_goal_and_records(self, date_str, exercise_type):
+        """(cíl jako int, záznamy dne nebo None, pokud cvičení ten den nemá klíč)."""
         goal = self.calculate_goal(exercise_type, date_str)
-        
         if not isinstance(goal, int):
             goal = int(goal) if goal else 0
-        
-        if date_str in self.data['workouts']:
-            workout = self.data['workouts'][date_str]
-            if exercise_type in workout:
-                records = workout[exercise_type]
-                
-                if isinstance(records, list):
-                    value = sum(r['value'] for r in records)
-                    count = len(records)
-                elif isinstance(records, dict):
-                    value = records.get('value', 0)
-                    count = 1
-                else:
-                    value = 0
-                    count = 0
-                
-                difference = value - goal
-                
-                if difference >= goal:
-                    color = '#006400'
-                    status = "Velký náskok"
-                elif difference > 0:
-                    intensity = min(difference / goal, 1.0) if goal > 0 else 0
-                    green_val = int(144 + (100 - 144) * intensity)
-                    color = f'#{0:02x}{green_val:02x}{0:02x}'
-                    status = f"Náskok +{difference}"
-                elif difference == 0:
-                    color = '#FFD700'
-                    status = "Přesně podle plánu"
-                elif difference >= -goal * 0.5:
-                    intensity = abs(difference) / (goal * 0.5) if goal > 0 else 0
-                    red_val = int(107 + (255 - 107) * (1 - intensity))
-                    color = f'#ff{red_val:02x}{red_val:02x}'
-                    status = f"Skluz {difference}"
-                else:
-                    color = '#8B0000'
-                    status = f"Velký skluz {difference}"
-                
-                year = date.year
-                end_of_year = datetime(year, 12, 31).date()
-                
-                total_diff = self.calculate_total_difference_to_date(exercise_type, date, end_of_year)
-                
-                if total_diff > 0:
-                    total_status = f"\n📊 Celkový náskok k 31.12.: +{total_diff}"
-                elif total_diff < 0:
-                    total_status = f"\n📊 Celkový skluz k 31.12.: {total_diff}"
-                else:
-                    total_status = f"\n📊 Celkový stav k 31.12.: Přesně"
-                
-                tooltip = f"{date_str}\nVýkon: {value} ({count}× zápis)\nCíl: {goal}\n{status}{total_status}"
-                return color, tooltip
-        
-        year = date.year
-        end_of_year = datetime(year, 12, 31).date()
+        workout = self.data['workouts'].get(date_str)
+        if workout is not None and exercise_type in workout:
+            return goal, workout[exercise_type]
+        return goal, None
+
+    @staticmethod
+    def _day_value_count(records):
+        if isinstance(records, list):
+            return sum(r['value'] for r in records), len(records)
+        elif isinstance(records, dict):
+            return records.get('value', 0), 1
+        return 0, 0
+
+    @staticmethod
+    def _day_status_color(difference, goal):
+        """Barva a popis stavu dne podle rozdílu výkon - cíl."""
+        if difference >= goal:
+            return '#006400', "Velký náskok"
+        elif difference > 0:
+            intensity = min(difference / goal, 1.0) if goal > 0 else 0
+            green_val = int(144 + (100 - 144) * intensity)
+            return f'#{0:02x}{green_val:02x}{0:02x}', f"Náskok +{difference}"
+        elif difference == 0:
+            return '#FFD700', "Přesně podle plánu"
+        elif difference >= -goal * 0.5:
+            intensity = abs(difference) / (goal * 0.5) if goal > 0 else 0
+            red_val = int(107 + (255 - 107) * (1 - intensity))
+            return f'#ff{red_val:02x}{red_val:02x}', f"Skluz {difference}"
+        return '#8B0000', f"Velký skluz {difference}"
+
+    def get_day_color(self, date_str, date, today, start_date, exercise_type):
+        """Barva dne v kalendáři – bez textu tooltipu a bez celkového náskoku/skluzu."""
+        if date < start_date:
+            return '#000000'
+        if date > today:
+            return '#8B0000'
+        goal, records = self._day_goal_and_records(date_str, exercise_type)
+        if records is None:
+            return '#555555'  # Změna barvy na šedou pro neaktivní dny
+        value, _count = self._day_value_count(records)
+        return self._day_status_color(value - goal, goal)[0]
+
+    def get_day_tooltip(self, date_str, date, today, start_date, exercise_type):
+        """Text tooltipu dne (včetně celkového náskoku/skluzu k 31.12.)."""
+        if date < start_date:
+            return "Před začátkem cvičení"
+
+        goal, records = self._day_goal_and_records(date_str, exercise_type)
+
+        # OPRAVA: Výpočet skluzu do konce roku i pro budoucnost
+        end_of_year = datetime(date.year, 12, 31).date()
         total_diff = self.calculate_total_difference_to_date(exercise_type, date, end_of_year)
-        
         if total_diff > 0:
             total_status = f"\n📊 Celkový náskok k 31.12.: +{total_diff}"
         elif total_diff < 0:
             total_status = f"\n📊 Celkový skluz k 31.12.: {total_diff}"
         else:
             total_status = f"\n📊 Celkový stav k 31.12.: Přesně"
-        
-        color = '#555555' # Změna barvy na šedou pro neaktivní dny
-        tooltip = f"{date_str}\nNecvičil\nCíl: {goal}\nSkluz: -{goal}{total_status}"
-        return color, tooltip
+
+        # OPRAVA: Budoucnost - spočítej skluz
+        if date > today:
+            return f"Budoucí den\nCíl: {goal}{total_status}"
+
+        if records is not None:
+            value, count = self._day_value_count(records)
+            status = self._day_status_color(value - goal, goal)[1]
+            return f"{date_str}\nVýkon: {value} ({count}× zápis)\nCíl: {goal}\n{status}{total_status}"
+
+        return f"{date_str}\nNecvičil\nCíl: {goal}\nSkluz: -{goal}{total_status}"
+
+    def mark_workout_day_changed(self, exercise_type, date_str):
+        """Promítne změnu záznamů jednoho dne do žurnálu a odvozených indexů."""
+        if date_str in self.data.get("workouts", {}):
+            self.record_change("workouts", date_str, exercise_type)
+        else:
+            self.record_change("workouts", date_str)
+        # Náskok/skluz k 31.12. v tooltipech se mění pro celý rok cvičení
+        self.invalidate_calendar_tooltips(exercise_type)
+        try:
+            self.workout_store.refresh_day(self.data.get("workouts", {}), date_str, exercise_type)
+            self.balance_index.update_day(exercise_type, date_str)
+        except Exception as e:
+            print(f"Chyba při aktualizaci indexu pro {exercise_type}, {date_str}: {e}")
+            self.invalidate_workout_indexes()
+        model = self.exercise_tree_models.get(exercise_type)
+        if model is not None:
+            try:
+                model.refresh_day(date_str)
+            except Exception as e:
+                print(f"Chyba při aktualizaci stromu záznamů pro {exercise_type}, {date_str}: {e}")
+                model.stale = True
+
+    def on_workout_year_loaded(self, year, _days):
+        """Dočtený rok (data po rocích): výsledky počítané bez něj neplatí; pole doplnil WorkoutStore.add_days."""
+        try:
+            self.balance_index.invalidate(year=int(year))
+        except ValueError:
+            self.balance_index.invalidate()
+        self.invalidate_calendar_tooltips()
+
+    def invalidate_workout_indexes(self):
+        """Přestaví odvozené indexy po hromadné změně záznamů."""
+        self.workout_store.rebuild(self.data.get("workouts", {}))
+        self.balance_index.invalidate()
+        self.invalidate_calendar_tooltips()
+        self.invalidate_exercise_trees()
 
     def calculate_total_difference_to_date(self, exercise_type, from_date, to_date):
         """Vypočítá celkový skluz/náskok od daného data do zadaného data"""
+        today = datetime.now().date()
+
+        # Úsek v rámci jednoho roku = rozdíl dvou prefixů
+        try:
+            diff = self.balance_index.difference(exercise_type, from_date, to_date, today)
+            if diff is not None:
+                return diff
+        except Exception as e:
+            print(f"Chyba v prefix-sum indexu pro {exercise_type}: {e}")
+
         total_performed = 0
         total_goal = 0
         
-        today = datetime.now().date()
-        
         current_date = from_date
         while current_date <= to_date:
             date_str = current_date.strftime('%Y-%m-%d')
@@ -8685,77 +12312,30 @@ class FitnessTrackerApp(QMainWindow):
             ex_start = self.get_exercise_start_date(exercise_type, selected_year)
 
             # --- Denní klasifikace do dneška (v rámci roku) ---
-            days_exact_100 = 0
-            days_over = 0
-            days_partial_missed = 0
-            days_not_exercised = 0
-            irrelevant_days = 0
-
-            # NOVĚ: kolik dní jsem fakt odcvičil (bez ohledu na relevanci cíle)
-            days_exercised = 0
-
-            relevant_days = 0
-            sum_goal_to_date = 0
-            sum_done_to_date = 0
-
-            d = year_start
-            while d <= end_calc_date:
-                if d < ex_start:
-                    irrelevant_days += 1
-                    d += timedelta(days=1)
-                    continue
-
-                ds = d.strftime("%Y-%m-%d")
-
-                # Počet odcvičených dní (bez ohledu na relevanci cíle)
-                done_any = 0
-                if ds in self.data.get("workouts", {}) and exercise_type in self.data["workouts"][ds]:
-                    recs_any = self.data["workouts"][ds][exercise_type]
-                    try:
-                        if isinstance(recs_any, list):
-                            done_any = sum(float(r.get("value", 0) or 0.0) for r in recs_any if isinstance(r, dict))
-                        elif isinstance(recs_any, dict):
-                            done_any = float(recs_any.get("value", 0) or 0.0)
-                    except Exception:
-                        done_any = 0
-                if done_any > 0 and d >= ex_start:
-                    days_exercised += 1
-
-                goal = self.calculate_goal(exercise_type, ds)
-                if not isinstance(goal, int):
-                    goal = int(goal) if goal else 0
-
-                if goal <= 0:
-                    irrelevant_days += 1
-                    d += timedelta(days=1)
-                    continue
-
-                relevant_days += 1
-                sum_goal_to_date += goal
+            # Cíle z rozpisu roku (celá čísla jako dřív), výkon ze sloupcového úložiště
+            import numpy as np
+            schedule_goals = self.get_goal_schedule(exercise_type, selected_year).goals.astype(np.int64)
+            start_idx = (ex_start - year_start).days
+            day_idx = np.arange(len(schedule_goals))
 
-                done = 0
-                if ds in self.data.get("workouts", {}) and exercise_type in self.data["workouts"][ds]:
-                    recs = self.data["workouts"][ds][exercise_type]
-                    try:
-                        done = sum(r["value"] for r in (recs if isinstance(recs, list) else [recs]))
-                    except Exception:
-                        try:
-                            done = recs.get("value", 0) if isinstance(recs, dict) else 0
-                        except Exception:
-                            done = 0
+            n = max((end_calc_date - year_start).days + 1, 0)
+            goals = schedule_goals[:n]
+            done = self.workout_store.daily_totals(exercise_type, year_start, end_calc_date)
+            active = day_idx[:n] >= start_idx
+            relevant = active & (goals > 0)
 
-                sum_done_to_date += done
+            irrelevant_days = int(n - relevant.sum())
+            # NOVĚ: kolik dní jsem fakt odcvičil (bez ohledu na relevanci cíle)
+            days_exercised = int((active & (done > 0)).sum())
 
-                if done <= 0:
-                    days_not_exercised += 1
-                elif done < goal:
-                    days_partial_missed += 1
-                elif done == goal:
-                    days_exact_100 += 1
-                else:
-                    days_over += 1
+            relevant_days = int(relevant.sum())
+            sum_goal_to_date = int(goals[relevant].sum())
+            sum_done_to_date = WorkoutStore.as_number(done[relevant].sum())
 
-                d += timedelta(days=1)
+            days_not_exercised = int((relevant & (done <= 0)).sum())
+            days_partial_missed = int((relevant & (done > 0) & (done < goals)).sum())
+            days_exact_100 = int((relevant & (done == goals)).sum())
+            days_over = int((relevant & (done > goals)).sum())
 
             avg_done_per_day = (sum_done_to_date / relevant_days) if relevant_days > 0 else 0
             avg_pct_to_date = (sum_done_to_date / sum_goal_to_date * 100) if sum_goal_to_date > 0 else 0
@@ -8764,52 +12344,23 @@ class FitnessTrackerApp(QMainWindow):
             days_since_start = (end_calc_date - ex_start).days + 1 if end_calc_date >= ex_start else 0
 
             # --- Plán do konce roku (od startu cvičení v daném roce) ---
-            planned_total_to_year_end = 0
-            d = max(year_start, ex_start)
-            while d <= year_end:
-                ds = d.strftime("%Y-%m-%d")
-                goal = self.calculate_goal(exercise_type, ds)
-                if not isinstance(goal, int):
-                    goal = int(goal) if goal else 0
-                if goal > 0:
-                    planned_total_to_year_end += goal
-                d += timedelta(days=1)
+            planned_mask = (day_idx >= start_idx) & (schedule_goals > 0)
+            planned_total_to_year_end = int(schedule_goals[planned_mask].sum())
 
             # --- Kolik zbývá do konce roku (jen aktuální rok) ---
             remaining_from_today = 0
             remaining_days = 0
             avg_needed_future = 0.0
             if selected_year == today.year:
-                today_str = today.strftime("%Y-%m-%d")
-                day_performed = 0
-                if today_str in self.data.get("workouts", {}) and exercise_type in self.data["workouts"][today_str]:
-                    recs_today = self.data["workouts"][today_str][exercise_type]
-                    try:
-                        if isinstance(recs_today, list):
-                            day_performed = sum(float(r.get("value", 0) or 0.0) for r in recs_today if isinstance(r, dict))
-                        elif isinstance(recs_today, dict):
-                            day_performed = float(recs_today.get("value", 0) or 0.0)
-                    except Exception:
-                        day_performed = 0
-
-                cur = max(today, ex_start)
-                while cur <= year_end:
-                    ds = cur.strftime("%Y-%m-%d")
-                    g = self.calculate_goal(exercise_type, ds)
-                    if not isinstance(g, int):
-                        g = int(g) if g else 0
-                    if g > 0:
-                        remaining_from_today += g
-                        remaining_days += 1
-                    cur += timedelta(days=1)
+                day_performed = self.workout_store.day_total(exercise_type, today)
+
+                rest_mask = planned_mask & (day_idx >= (today - year_start).days)
+                remaining_from_today = int(schedule_goals[rest_mask].sum())
+                remaining_days = int(rest_mask.sum())
 
                 # odečíst dnešní výkon
-                if today >= ex_start:
-                    g_today = self.calculate_goal(exercise_type, today_str)
-                    if not isinstance(g_today, int):
-                        g_today = int(g_today) if g_today else 0
-                    if g_today > 0:
-                        remaining_from_today -= day_performed
+                if today >= ex_start and schedule_goals[(today - year_start).days] > 0:
+                    remaining_from_today -= day_performed
 
                 if remaining_from_today < 0:
                     remaining_from_today = 0
@@ -8854,8 +12405,10 @@ class FitnessTrackerApp(QMainWindow):
         
         if filename:
             try:
+                self.flush_data()
                 export_data = {
                     'version': VERSION,
+                    'schema_version': SCHEMA_VERSION,
                     'export_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                     'year_settings': self.data['year_settings'],
                     'workouts': self.data['workouts'],
@@ -8879,7 +12432,7 @@ class FitnessTrackerApp(QMainWindow):
                 self.show_message("Chyba", f"Export selhal: {e}", QMessageBox.Critical)
 
     def import_data(self):
-        """Import cvičení z JSON souboru"""
+        """Import cvičení z JSON souboru (čtení na pozadí, sloučení bez duplicit, jedno uložení)"""
         filename, _ = QFileDialog.getOpenFileName(
             self,
             "Importovat cvičení",
@@ -8889,20 +12442,28 @@ class FitnessTrackerApp(QMainWindow):
         
         if filename:
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    imported_data = json.load(f)
-                
+                self.flush_data()
+                importer = self.run_import_worker(filename)
+                cancelled, error, imported = importer.cancelled, importer.error, importer.result
+                importer.deleteLater()
+                if cancelled:
+                    return
+                if error:
+                    self.show_message("Chyba", f"Import selhal: {error}", QMessageBox.Critical)
+                    return
+
                 # Ověř strukturu
-                if 'year_settings' not in imported_data or 'workouts' not in imported_data:
+                if imported is None:
                     self.show_message("Chyba", "Neplatný formát souboru!", QMessageBox.Critical)
                     return
+                document = imported["document"]
                 
                 # Dialog pro výběr režimu
                 msg = QMessageBox(self)
                 msg.setWindowTitle("Režim importu")
                 msg.setText(
                     "Jak chceš importovat data?\n\n"
-                    "Sloučit: Přidá nová data k existujícím\n"
+                    "Sloučit: Přidá nová data k existujícím (stejné záznamy se přeskočí)\n"
                     "Přepsat: Smaže všechna současná data a nahradí je importovanými"
                 )
                 msg.setIcon(QMessageBox.Question)
@@ -8932,93 +12493,48 @@ class FitnessTrackerApp(QMainWindow):
                     no_btn = confirm.button(QMessageBox.No)
                     no_btn.setText("Ne, zrušit")
                     
-                    if confirm.exec() == QMessageBox.Yes:
-                        self.data['year_settings'] = imported_data['year_settings']
-                        self.data['workouts'] = imported_data['workouts']
-                        if 'app_state' in imported_data:
-                            self.data['app_state'] = imported_data['app_state']
-                        
-                        self.save_data()
-                        self.update_all_year_selectors()
-                        
-                        # OPRAVA: Refresh všech záložek místo quit
-                        for exercise in ['kliky', 'dřepy', 'skrčky']:
-                            self.update_exercise_tab(exercise)
-                            self.refresh_exercise_calendar(exercise)
-                        
-                        self.refresh_add_tab_goals()
-                        
-                        # Refresh seznamu roků v nastavení
-                        self.years_list.clear()
-                        for y in self.get_available_years():
-                            year_workouts = sum(1 for date_str in self.data['workouts'].keys() 
-                                              if int(date_str.split('-')[0]) == y)
-                            item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-                            item.setData(Qt.UserRole, y)
-                            self.years_list.addItem(item)
-                        
-                        self.show_message(
-                            "Import dokončen",
-                            "Data byla přepsána importovanými daty.\n\n"
-                            "Aplikace byla obnovena s novými daty."
-                        )
+                    if confirm.exec() != QMessageBox.Yes:
                         return
+
+                    workouts = {}
+                    _days, new_records, duplicates = WorkoutImporter.merge(workouts, imported["workouts"])
+                    self.data['year_settings'] = document['year_settings']
+                    self.data['workouts'] = workouts
+                    if 'app_state' in document:
+                        self.data['app_state'] = document['app_state']
+                    self.commit_bulk_change()
+
+                    self.show_message(
+                        "Import dokončen",
+                        "Data byla přepsána importovanými daty.\n\n"
+                        f"Záznamy: {new_records}\n"
+                        f"Duplicitní záznamy v souboru: {duplicates}\n"
+                        f"Neplatné položky: {imported['invalid']}"
+                    )
+                    return
                 
                 elif msg.clickedButton() == merge_btn:
-                    # Sloučit
-                    merged_years = []
-                    merged_workouts = 0
-                    
                     # Sloučit year_settings
-                    for year, settings in imported_data['year_settings'].items():
+                    merged_years = []
+                    for year, settings in document['year_settings'].items():
                         if year not in self.data['year_settings']:
                             self.data['year_settings'][year] = settings
                             merged_years.append(year)
                     
-                    # Sloučit workouts
-                    for date_str, workouts in imported_data['workouts'].items():
-                        if date_str not in self.data['workouts']:
-                            self.data['workouts'][date_str] = workouts
-                            merged_workouts += 1
-                        else:
-                            # Sloučit záznamy pro stejný den
-                            for exercise, records in workouts.items():
-                                if exercise not in self.data['workouts'][date_str]:
-                                    self.data['workouts'][date_str][exercise] = records
-                                else:
-                                    # Přidej záznamy
-                                    if isinstance(records, list):
-                                        if isinstance(self.data['workouts'][date_str][exercise], list):
-                                            self.data['workouts'][date_str][exercise].extend(records)
-                                        else:
-                                            self.data['workouts'][date_str][exercise] = [
-                                                self.data['workouts'][date_str][exercise],
-                                                *records
-                                            ]
-                    
-                    self.save_data()
-                    self.update_all_year_selectors()
-                    
-                    for exercise in ['kliky', 'dřepy', 'skrčky']:
-                        self.update_exercise_tab(exercise)
-                        self.refresh_exercise_calendar(exercise)
-                    
-                    self.refresh_add_tab_goals()
-                    
-                    # Refresh seznamu roků v nastavení
-                    self.years_list.clear()
-                    for y in self.get_available_years():
-                        year_workouts = sum(1 for date_str in self.data['workouts'].keys() 
-                                          if int(date_str.split('-')[0]) == y)
-                        item = QListWidgetItem(f"📆 Rok {y} ({year_workouts} dnů s cvičením)")
-                        item.setData(Qt.UserRole, y)
-                        self.years_list.addItem(item)
+                    # Sloučit workouts (podle id, záznamy bez id podle obsahu)
+                    new_days, new_records, duplicates = WorkoutImporter.merge(
+                        self.data['workouts'], imported["workouts"]
+                    )
+                    self.commit_bulk_change()
                     
                     self.show_message(
                         "Import dokončen",
                         f"Data byla sloučena!\n\n"
                         f"Nové roky: {', '.join(merged_years) if merged_years else 'žádné'}\n"
-                        f"Nové dny: {merged_workouts}"
+                        f"Nové dny: {new_days}\n"
+                        f"Nové záznamy: {new_records}\n"
+                        f"Přeskočené duplicity: {duplicates}\n"
+                        f"Neplatné položky: {imported['invalid']}"
                     )
             
             except Exception as e:
@@ -9026,6 +12542,107 @@ class FitnessTrackerApp(QMainWindow):
                 import traceback
                 traceback.print_exc()
 
+    def run_import_worker(self, filename):
+        """Přečte soubor importu ve vlákně na pozadí s průběhem a možností zrušit; vrátí WorkoutImporter."""
+        from PySide6.QtCore import QEventLoop  # lokální import
+        from PySide6.QtWidgets import QProgressDialog
+
+        importer = WorkoutImporter(filename, self)
+        dialog = QProgressDialog("Načítám importovaná data…", "Zrušit", 0, 100, self)
+        dialog.setWindowTitle("Import dat")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        importer.progress.connect(dialog.setValue)
+        dialog.canceled.connect(importer.cancel)
+
+        loop = QEventLoop(self)
+        importer.finished.connect(loop.quit)
+        importer.start()
+        loop.exec()
+        dialog.close()
+        dialog.deleteLater()
+        return importer
+
+    def commit_bulk_change(self):
+        """Po hromadné změně dat (import, obnova zálohy): jedno uložení (jedna transakce) a jedno překreslení."""
+        self.invalidate_goal_schedules()
+        self.invalidate_workout_indexes()
+        self.save_data()
+        self.flush_data()
+        # Model historie vážení se resetuje hned, ne až odloženě při prvním dotazu view
+        if hasattr(self, "bmi_history_model"):
+            self.bmi_history_model.reload()
+        self.update_all_year_selectors()
+        self.notify_data_changed("all")
+
+    def restore_backup(self):
+        """Obnoví data do stavu vybrané zálohy (BackupStore); současný stav se předtím zazálohuje."""
+        import tempfile
+
+        try:
+            self.flush_data()
+            self.wait_for_backups()
+            snapshot_ids = list(reversed(self.backups.snapshots()))
+            if not snapshot_ids:
+                self.show_message("Obnovit zálohu", "Zatím neexistuje žádná záloha.")
+                return
+
+            labels = []
+            for snapshot_id in snapshot_ids:
+                manifest = self.backups.read_manifest(snapshot_id) or {}
+                created = datetime.strptime(snapshot_id[:15], "%Y%m%d-%H%M%S").strftime("%d.%m.%Y %H:%M:%S")
+                reason = manifest.get("reason") or ""
+                labels.append(f"{created} – {reason}" if reason else created)
+
+            label, ok = QInputDialog.getItem(
+                self, "Obnovit zálohu", "Obnovit data ke stavu ze zálohy:", labels, 0, False
+            )
+            if not ok:
+                return
+            snapshot_id = snapshot_ids[labels.index(label)]
+
+            confirm = QMessageBox(self)
+            confirm.setWindowTitle("Potvrzení obnovy")
+            confirm.setText(
+                f"Současná data budou nahrazena stavem ze zálohy {label}.\n\n"
+                "Současný stav se předtím uloží jako nová záloha. Pokračovat?"
+            )
+            confirm.setIcon(QMessageBox.Warning)
+            confirm.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+            confirm.button(QMessageBox.Yes).setText("Ano, obnovit")
+            confirm.button(QMessageBox.No).setText("Ne, zrušit")
+            if confirm.exec() != QMessageBox.Yes:
+                return
+
+            self.backup_data_file("před obnovou zálohy")
+            with tempfile.TemporaryDirectory() as tmp:
+                self.backups.restore(snapshot_id, tmp)
+                restored = self.storage.load_copy(tmp)
+            if not isinstance(restored, dict) or "workouts" not in restored:
+                self.show_message("Chyba", "Záloha neobsahuje platná data!", QMessageBox.Critical)
+                return
+            DataMigrator.upgrade(restored)
+
+            for key in list(self.data.keys()):
+                if key not in restored:
+                    del self.data[key]
+            self.data.update(restored)
+            self.ensure_app_state()
+            self.ensure_body_metrics()
+
+            self.commit_bulk_change()
+            for refresh in ("refresh_bmi_history", "update_bmi_current_display", "update_bmi_charts"):
+                if hasattr(self, refresh):
+                    getattr(self, refresh)()
+
+            self.show_message("Obnova dokončena", f"Data byla obnovena ze zálohy {label}.")
+        except Exception as e:
+            self.show_message("Chyba", f"Obnova zálohy selhala: {e}", QMessageBox.Critical)
+            import traceback
+            traceback.print_exc()
+
 from PySide6.QtGui import QIcon
 
 def main():
@@ -0,0 +1,70 @@
+import fitness_tracker as ft
+
+
+def _lines(count, start=0):
+    return b"".join(b'{"id": "%08d", "value": %d, "timestamp": "2024-01-01 12:00:00"},\n' % (i, i % 97)
+                    for i in range(start, start + count))
+
+
+def test_split_reassembles_and_realigns_after_insert():
+    raw = _lines(20_000)
+    chunks = ft.BackupStore.split(raw)
+
+    assert b"".join(chunks) == raw
+    assert all(len(c) <= ft.BackupStore.MAX_CHUNK for c in chunks)
+    assert all(len(c) >= ft.BackupStore.MIN_CHUNK for c in chunks[:-1])
+
+    # Vložení uprostřed změní jen blok nebo dva, hranice se pak znovu srovnají
+    middle = len(raw) // 2
+    middle = raw.index(b"\n", middle) + 1
+    edited = raw[:middle] + _lines(3, 900_000) + raw[middle:]
+    new_chunks = ft.BackupStore.split(edited)
+    assert len(set(new_chunks) - set(chunks)) <= 2
+
+
+def test_split_cuts_long_lines():
+    raw = b"x" * (ft.BackupStore.MAX_CHUNK * 2 + 10)
+    chunks = ft.BackupStore.split(raw)
+    assert [len(c) for c in chunks] == [ft.BackupStore.MAX_CHUNK, ft.BackupStore.MAX_CHUNK, 10]
+
+
+def test_backup_and_restore_roundtrip(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    main = data_dir / "fitness_data.json"
+    journal = data_dir / "fitness_data.journal"
+    main.write_bytes(_lines(5000))
+    journal.write_bytes(b"")
+    store = ft.BackupStore(tmp_path / "backup")
+
+    store.backup([main, journal, data_dir / "chybi.json"], "první")
+    assert store.flush()
+    first = store.snapshots()
+    assert len(first) == 1
+
+    # Beze změny se nová záloha nevytvoří
+    store.backup([main, journal], "beze změny")
+    assert store.flush()
+    assert store.snapshots() == first
+
+    original = main.read_bytes()
+    main.write_bytes(original + _lines(10, 5000))
+    store.backup([main, journal], "druhá")
+    assert store.flush()
+    snapshots = store.snapshots()
+    assert len(snapshots) == 2
+    assert store.read_manifest(snapshots[-1])["reason"] == "druhá"
+
+    restored = store.restore(first[0], tmp_path / "restored")
+    assert sorted(p.name for p in restored) == ["fitness_data.journal", "fitness_data.json"]
+    assert (tmp_path / "restored" / "fitness_data.json").read_bytes() == original
+    assert store.restore(snapshots[-1], tmp_path / "latest")[0].read_bytes() == main.read_bytes()
+
+
+def test_retained_keeps_last_and_newest_per_bucket():
+    recent = ["20240102-09%02d00-000000" % minute for minute in range(12)]
+    older = ["20240101-100000-000000", "20240101-101500-000000"]
+
+    keep = ft.BackupStore.retained(recent + older)
+
+    assert keep == set(recent[2:]) | {"20240101-101500-000000"}
@@ -0,0 +1,74 @@
+import numpy as np
+
+import fitness_tracker as ft
+
+
+def test_catmull_rom_passes_through_points():
+    xs = [0.0, 1.0, 2.0, 4.0]
+    ys = [0.0, 2.0, 1.0, 3.0]
+
+    sx, sy = ft.CurveSmoothing.catmull_rom(xs, ys, points_per_segment=10)
+
+    assert len(sx) == 3 * 10
+    # Každý úsek začíná ve svém bodě, poslední končí v koncovém
+    assert np.allclose(sx[::10], xs[:-1]) and np.allclose(sy[::10], ys[:-1])
+    assert (sx[-1], sy[-1]) == (4.0, 3.0)
+
+
+def test_catmull_rom_returns_short_series_unchanged():
+    sx, sy = ft.CurveSmoothing.catmull_rom([1.0, 2.0], [3.0, 4.0])
+    assert sx.tolist() == [1.0, 2.0] and sy.tolist() == [3.0, 4.0]
+
+
+def test_monotone_cubic_has_no_overshoot():
+    xs = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    ys = [0.0, 0.0, 10.0, 10.0, 10.5, 30.0]
+
+    sx, sy = ft.CurveSmoothing.monotone_cubic(xs, ys, points_per_segment=25)
+
+    assert np.all(np.diff(sx) > 0)
+    assert np.all(np.diff(sy) >= -1e-9)
+    assert sy.min() >= 0.0 and sy.max() <= 30.0
+    assert np.allclose(sy[::25], ys[:-1])
+    # Rovný úsek zůstane rovný
+    assert np.allclose(sy[:25], 0.0)
+
+
+def test_monotone_cubic_merges_duplicate_x_and_caches():
+    xs = [0.0, 1.0, 1.0, 2.0, 3.0]
+    ys = [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    values = ft.CurveSmoothing.monotone_cubic(xs, ys, x_new=[1.0, 3.0])[1]
+    assert np.allclose(values, [2.0, 4.0])
+
+    key = ("test", id(xs))
+    first = ft.CurveSmoothing.monotone_cubic(xs, ys, cache_key=key)
+    assert ft.CurveSmoothing.monotone_cubic([9.0], [9.0], cache_key=key) is first
+
+
+def test_bucket_size_and_points_per_segment_follow_pixels():
+    assert ft.SeriesDownsampler.bucket_size(365, 1000) == 1
+    assert ft.SeriesDownsampler.bucket_size(365, 100) == 8
+    assert ft.SeriesDownsampler.points_per_segment(11, 100, 30) == 20
+    assert ft.SeriesDownsampler.points_per_segment(1, 100, 30) == 30
+
+
+def test_bucket_indices_keep_extremes():
+    values = [1, 5, 2, 0, 9, 3, 4]
+
+    assert ft.SeriesDownsampler.bucket_argmax(values, 3).tolist() == [1, 4, 6]
+    assert ft.SeriesDownsampler.min_max_indices(values, 3).tolist() == [0, 1, 3, 4, 6]
+
+
+def test_lttb_keeps_ends_and_peak():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 50.0
+
+    picked = ft.SeriesDownsampler.lttb(x, y, 20)
+
+    assert len(picked) == 20
+    assert picked[0] == 0 and picked[-1] == 999
+    assert 500 in picked
+    assert np.all(np.diff(picked) > 0)
+    assert ft.SeriesDownsampler.lttb(x[:10], y[:10], 20).tolist() == list(range(10))
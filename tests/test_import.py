@@ -0,0 +1,99 @@
+import io
+
+import pytest
+
+import fitness_tracker as ft
+
+
+class SmallBlockReader(ft.JsonStreamReader):
+    CHUNK = 5
+
+
+def _read_document(raw, chunk):
+    SmallBlockReader.CHUNK = chunk
+    reader = SmallBlockReader(io.BytesIO(raw))
+    return {key: reader.value() for key in reader.members()}
+
+
+def test_stream_reader_reads_values_split_across_blocks():
+    document = {
+        "čísla": [1.5e3, -2, 12345678901234567890, 0.000001, True, False, None],
+        "text": "Dřepy \"v uvozovkách\" 😀 \\ konec",
+        "vnořené": {"a": {"b": []}, "c": {}},
+    }
+    for raw in (ft.json.dumps(document, ensure_ascii=False).encode("utf-8"), ft.json.dumps(document).encode()):
+        # Hranice bloku padne postupně na každé místo (i doprostřed UTF-8 znaku a \u escape)
+        for chunk in range(1, 24):
+            assert _read_document(raw, chunk) == document
+
+
+def test_stream_reader_raises_on_malformed_value_without_reading_rest():
+    raw = b'{"a": [1, x, 2], "b": "' + b"y" * 200_000 + b'"}'
+    SmallBlockReader.CHUNK = 1024
+    reader = SmallBlockReader(io.BytesIO(raw))
+    with pytest.raises(ft.json.JSONDecodeError):
+        for _key in reader.members():
+            reader.value()
+    assert reader.bytes_read <= 1024
+
+
+def test_parse_migrates_legacy_export(tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text(ft.json.dumps({
+        "year_settings": {"2024": {"base_goals": {"dřepy": 20}, "weekly_increment": {"dřepy": 5}}},
+        "workouts": {
+            "2024-01-01": {"dřepy": 15, "kliky": {"value": 10, "timestamp": "2024-01-01 08:00:00"}},
+            "2024-01-02": {"kliky": [{"value": "deset"}, {"value": 12, "id": "k2"}]},
+            "neplatné datum": {"kliky": 5},
+        },
+    }, ensure_ascii=False), encoding="utf-8")
+
+    result = ft.WorkoutImporter(path).parse()
+
+    assert result["records"] == 3
+    assert result["invalid"] == 2
+    assert result["workouts"] == {
+        "2024-01-01": {
+            "drepy": [{"value": 15, "timestamp": "2024-01-01 12:00:00"}],
+            "kliky": [{"value": 10, "timestamp": "2024-01-01 08:00:00"}],
+        },
+        "2024-01-02": {"kliky": [{"value": 12, "id": "k2", "timestamp": "2024-01-02 12:00:00"}]},
+    }
+    assert result["document"]["year_settings"]["2024"]["base_goals"] == {"drepy": 20}
+    assert result["document"]["schema_version"] == ft.SCHEMA_VERSION
+
+
+def test_parse_rejects_document_without_workouts(tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text('{"year_settings": {}}', encoding="utf-8")
+    assert ft.WorkoutImporter(path).parse() is None
+
+
+def _legacy(value, day="2024-01-01"):
+    return {"value": value, "timestamp": f"{day} 12:00:00"}
+
+
+def test_merge_skips_known_ids_and_existing_legacy_records():
+    workouts = {"2024-01-01": {"kliky": [{"id": "a", **_legacy(10)}, {"id": "b", **_legacy(20)}]}}
+    imported = {
+        "2024-01-01": {"kliky": [{"id": "a", **_legacy(99)}, _legacy(20), _legacy(30)]},
+        "2024-01-02": {"drepy": [{"id": "c", **_legacy(5, "2024-01-02")}]},
+    }
+
+    assert ft.WorkoutImporter.merge(workouts, imported) == (1, 2, 2)
+    values = [r["value"] for r in workouts["2024-01-01"]["kliky"]]
+    assert values == [10, 20, 30]
+    assert all(r.get("id") for r in workouts["2024-01-01"]["kliky"])
+    assert workouts["2024-01-02"]["drepy"][0]["id"] == "c"
+
+
+def test_merge_keeps_identical_legacy_sets_from_one_file():
+    workouts = {}
+    imported = {"2024-01-01": {"kliky": [_legacy(10), _legacy(10)]}}
+
+    assert ft.WorkoutImporter.merge(workouts, ft.json.loads(ft.json.dumps(imported))) == (1, 2, 0)
+    # Opakovaný import téhož souboru nic nezdvojí, další stejná série navíc se přidá
+    assert ft.WorkoutImporter.merge(workouts, ft.json.loads(ft.json.dumps(imported))) == (0, 0, 2)
+    imported["2024-01-01"]["kliky"].append(_legacy(10))
+    assert ft.WorkoutImporter.merge(workouts, imported) == (0, 1, 2)
+    assert len(workouts["2024-01-01"]["kliky"]) == 3
@@ -0,0 +1,86 @@
+import threading
+
+import fitness_tracker as ft
+
+
+def _slow_storage(path, started, release):
+    storage = ft.JsonStorage(path)
+    write = storage.saver.writer
+
+    def slow_write(snapshot):
+        # Snapshot je pořízený už při save(), zdrží se jen zápis na disk
+        started.set()
+        release.wait(10)
+        write(snapshot)
+
+    storage.saver.writer = slow_write
+    return storage
+
+
+def test_merged_saves_keep_changes_journaled_during_write(tmp_path):
+    path = tmp_path / "fitness_data.json"
+    started, release = threading.Event(), threading.Event()
+    storage = _slow_storage(path, started, release)
+    data = {"app_state": {}}
+
+    # Dvě uložení v jednom debounce okně -> jeden zápis, dvě kompakce
+    data["app_state"]["a"] = 1
+    storage.record_change(data, ("app_state", "a"))
+    storage.save(data)
+    data["app_state"]["bbbbbbbbbbbbbbbb"] = 2
+    storage.record_change(data, ("app_state", "bbbbbbbbbbbbbbbb"))
+    storage.save(data)
+
+    # Změny zapsané do žurnálu během zápisu snapshotu (ten je ještě neobsahuje)
+    assert started.wait(10)
+    data["app_state"]["c"] = 3
+    storage.record_change(data, ("app_state", "c"))
+    data["app_state"]["d"] = 4
+    storage.record_change(data, ("app_state", "d"))
+    release.set()
+    assert storage.flush()
+    storage.close()
+
+    # Žurnál začíná celým řádkem a přehraje obě pozdější změny
+    lines = storage.journal.path.read_text(encoding="utf-8").splitlines()
+    assert [ft.json.loads(line)["path"][1] for line in lines] == ["c", "d"]
+
+    reloaded = ft.JsonStorage(path)
+    try:
+        loaded = reloaded.load()
+    finally:
+        reloaded.close()
+    assert loaded["app_state"] == {"a": 1, "bbbbbbbbbbbbbbbb": 2, "c": 3, "d": 4}
+
+
+def test_truncate_before_ignores_already_compacted_markers(tmp_path):
+    journal = ft.DataJournal(tmp_path / "j.journal")
+    journal.append({"op": "set", "path": ["app_state", "a"], "value": 1})
+    first = journal.size()
+    journal.append({"op": "set", "path": ["app_state", "long_key_b"], "value": 2})
+    second = journal.size()
+    journal.append({"op": "set", "path": ["app_state", "c"], "value": 3})
+
+    journal.truncate_before(first)
+    journal.truncate_before(second)
+    journal.truncate_before(first)
+
+    data = {}
+    assert journal.replay(data) == 1
+    assert data == {"app_state": {"c": 3}}
+
+
+def test_save_snapshots_data_at_call_time(tmp_path):
+    path = tmp_path / "fitness_data.json"
+    storage = ft.JsonStorage(path)
+    data = {"app_state": {"a": 1}, "workouts": {"2024-01-01": {"kliky": [{"value": 5}]}}}
+    storage.save(data)
+    # Úpravy po save() (před zápisem na pozadí) už do snapshotu nepatří
+    data["app_state"]["a"] = 2
+    data["workouts"]["2024-01-02"] = {}
+    assert storage.flush()
+    storage.close()
+
+    text = path.read_text(encoding="utf-8")
+    assert ft.json.loads(text) == {"app_state": {"a": 1}, "workouts": {"2024-01-01": {"kliky": [{"value": 5}]}}}
+    assert text.startswith("{\n  ")
@@ -0,0 +1,51 @@
+import fitness_tracker as ft
+
+
+def test_upgrade_legacy_document():
+    data = {
+        "settings": {"start_date": "2023-03-01", "base_goals": {"kliky": 50, "dřepy": 20},
+                     "weekly_increment": {"kliky": 10, "skrčky": 5}},
+        "app_state": {"exercise_years": {"dřepy": 2023}},
+        "workouts": {
+            "2023-03-01": {"kliky": 15, "dřepy": {"value": 10, "timestamp": "2023-03-01 08:00:00"}},
+            "2023-03-02": {"skrčky": [{"value": 5}]},
+        },
+    }
+
+    applied = ft.DataMigrator.upgrade(data)
+
+    assert applied == [label for _v, label, _d, _day in ft.DataMigrator.STEPS]
+    assert data["schema_version"] == ft.SCHEMA_VERSION
+    assert "settings" not in data
+    assert data["year_settings"]["2023"]["base_goals"] == {"kliky": 50, "drepy": 20}
+    assert data["year_settings"]["2023"]["weekly_increment"] == {"kliky": 10, "skrcky": 5}
+    assert data["app_state"]["exercise_years"] == {"drepy": 2023}
+    assert set(data["exercises"]) == {"kliky", "drepy", "skrcky"}
+
+    day = data["workouts"]["2023-03-01"]
+    assert set(day) == {"kliky", "drepy"}
+    assert day["kliky"][0]["value"] == 15 and day["kliky"][0]["timestamp"] == "2023-03-01 12:00:00"
+    assert day["drepy"][0]["timestamp"] == "2023-03-01 08:00:00"
+    records = day["kliky"] + day["drepy"] + data["workouts"]["2023-03-02"]["skrcky"]
+    assert all(r["id"] for r in records)
+    assert len({r["id"] for r in records}) == 3
+
+
+def test_upgrade_skips_current_document():
+    data = {"schema_version": ft.SCHEMA_VERSION, "workouts": {"2024-01-01": {"dřepy": 5}}}
+    assert ft.DataMigrator.upgrade(data) is None
+    # Aktuální dokument se neprochází
+    assert data["workouts"] == {"2024-01-01": {"dřepy": 5}}
+
+
+def test_upgrade_runs_only_missing_steps():
+    data = {
+        "schema_version": 3,
+        "year_settings": {},
+        "exercises": {},
+        "workouts": {"2024-01-01": {"kliky": [{"value": 5}]}},
+    }
+    # v1 (id záznamů) už proběhla -> chybějící id se nedoplní, v4 nic nemění
+    assert ft.DataMigrator.upgrade(data) == []
+    assert data["workouts"]["2024-01-01"]["kliky"] == [{"value": 5}]
+    assert data["schema_version"] == ft.SCHEMA_VERSION
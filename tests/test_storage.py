@@ -0,0 +1,124 @@
+import fitness_tracker as ft
+
+
+def _document():
+    return {
+        "version": "test",
+        "exercises": {"kliky": {"name": "Kliky"}},
+        "year_settings": {"2023": {"start": 1}, "2024": {"start": 2}},
+        "workouts": {
+            "2023-05-01": {"kliky": [{"id": "a", "value": 10, "timestamp": "2023-05-01 10:00:00"}]},
+            "2024-06-01": {"kliky": [{"id": "b", "value": 20, "timestamp": "2024-06-01 10:00:00"}]},
+        },
+    }
+
+
+def _load_sharded(directory):
+    storage = ft.ShardedJsonStorage(directory)
+    return storage, storage.load()
+
+
+def test_sharded_save_keeps_unloaded_years(tmp_path):
+    storage = ft.ShardedJsonStorage(tmp_path)
+    storage.save(_document())
+    storage.close()
+
+    storage, data = _load_sharded(tmp_path)
+    try:
+        workouts = data["workouts"]
+        assert workouts.pending == {"2023", "2024"} - {str(ft.datetime.now().year)}
+        # Změna jen v indexu: nenačtené roky na disku zůstanou
+        data["exercises"]["drepy"] = {"name": "Dřepy"}
+        storage.save(data)
+        assert storage.flush()
+    finally:
+        storage.close()
+
+    assert sorted(p.name for p in tmp_path.glob("year-*.json")) == ["year-2023.json", "year-2024.json"]
+    storage, data = _load_sharded(tmp_path)
+    try:
+        assert dict(data["workouts"]) == _document()["workouts"]
+        assert dict(data["year_settings"]) == _document()["year_settings"]
+        assert set(data["exercises"]) == {"kliky", "drepy"}
+    finally:
+        storage.close()
+
+
+def test_sharded_snapshot_ignores_later_edits_and_year_loads(tmp_path):
+    storage = ft.ShardedJsonStorage(tmp_path)
+    storage.save(_document())
+    storage.close()
+
+    storage, data = _load_sharded(tmp_path)
+    try:
+        data["workouts"]["2024-06-02"] = {"kliky": [{"id": "c", "value": 5, "timestamp": "2024-06-02 10:00:00"}]}
+        storage.record_change(data, ("workouts", "2024-06-02"))
+        storage.save(data)
+        # Načtení dalšího roku a úpravy po save() snapshot neovlivní
+        data["workouts"].load_all()
+        del data["workouts"]["2023-05-01"]
+        assert storage.flush()
+        year_2023 = ft.json.loads((tmp_path / "year-2023.json").read_text(encoding="utf-8"))
+        assert "2023-05-01" in year_2023["workouts"]
+        index = ft.json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+        assert index["years"]["2024"]["days"] == 2
+    finally:
+        storage.close()
+
+
+def test_sharded_save_removes_deleted_year(tmp_path):
+    storage = ft.ShardedJsonStorage(tmp_path)
+    storage.save(_document())
+    storage.close()
+
+    storage, data = _load_sharded(tmp_path)
+    try:
+        for name in ("workouts", "year_settings"):
+            for key in ft.YearPartitionedDict.keys_in_year(data[name], 2023):
+                del data[name][key]
+        storage.save(data)
+        assert storage.flush()
+    finally:
+        storage.close()
+
+    assert not (tmp_path / "year-2023.json").exists()
+    assert (tmp_path / "year-2024.json").exists()
+
+
+def _partitioned(shards, summaries=None):
+    loaded = []
+
+    def loader(year):
+        loaded.append(year)
+        mapping.absorb(year, shards[year])
+
+    mapping = ft.YearPartitionedDict(loader, pending=shards, summaries=summaries)
+    return mapping, loaded
+
+
+def test_year_partitioned_dict_loads_only_accessed_year():
+    shards = {"2023": {"2023-05-01": 1, "2023-05-02": 2}, "2024": {"2024-06-01": 3}}
+    mapping, loaded = _partitioned(shards, {"2023": {"days": 2}})
+
+    assert mapping
+    assert ft.YearPartitionedDict.years(mapping) == {"2023", "2024"}
+    assert ft.YearPartitionedDict.count_in_year(mapping, 2023) == 2
+    assert mapping["2024-06-01"] == 3
+    assert "2024-12-31" not in mapping
+    mapping["2024-06-02"] = 4
+    assert ft.YearPartitionedDict.keys_in_year(mapping, 2024) == ["2024-06-01", "2024-06-02"]
+    assert loaded == ["2024"]
+    assert mapping.pending == {"2023"}
+
+
+def test_year_partitioned_dict_whole_dict_operations_load_all_years():
+    shards = {"2023": {"2023-05-01": 1}, "2024": {"2024-06-01": 3}}
+    mapping, loaded = _partitioned(shards)
+    absorbed = []
+    mapping.listeners.append(lambda year, items: absorbed.append((year, dict(items))))
+
+    assert len(mapping) == 2
+    assert sorted(loaded) == ["2023", "2024"]
+    assert absorbed == [("2023", {"2023-05-01": 1}), ("2024", {"2024-06-01": 3})]
+    assert mapping == {"2023-05-01": 1, "2024-06-01": 3}
+    assert not mapping.pending